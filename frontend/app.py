@@ -11,9 +11,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 's
 
 from rag.newton_rag import EnhancedNewtonRAG
 
-@st.cache_resource
+@st.cache_resource(show_spinner="🍎 Loading Newton's knowledge...")
 def load_rag_system():
-    return EnhancedNewtonRAG()
+    # Warm up once per server process so the first question doesn't pay for it
+    rag = EnhancedNewtonRAG()
+    rag.warmup()
+    return rag
 
 def main():
     st.set_page_config(page_title="Isaac Newton AI Chatbot", page_icon="🍎", layout="wide")
@@ -21,6 +24,12 @@ def main():
     st.title("🍎 Isaac Newton AI Chatbot")
     st.write("Ask me anything about Isaac Newton's life, discoveries, and scientific work!")
     
+    # Load on page open rather than on the first question
+    try:
+        load_rag_system()
+    except Exception as e:
+        st.error(f"Newton AI is not available yet: {str(e)}")
+    
     # Initialize chat history
     if "messages" not in st.session_state:
         st.session_state.messages = []
@@ -66,48 +75,68 @@ def main():
         
         # Generate response
         with st.chat_message("assistant"):
-            with st.spinner("🤔 Newton is thinking..."):
-                try:
-                    rag = load_rag_system()
-                    result = rag.answer_question(prompt, evaluate=True)
-                    
-                    # Display answer
-                    st.markdown(result['answer'])
-                    
-                    # Display metrics and sources
-                    with st.expander("📊 View Quality Metrics & Sources"):
-                        eval_data = result.get('evaluation', {})
-                        retrieval = eval_data.get('retrieval_metrics', {})
-                        answer = eval_data.get('answer_metrics', {})
-                        
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("🎯 Retrieval Quality", f"{retrieval.get('avg_retrieval_similarity', 0):.3f}")
-                        with col2:
-                            st.metric("🔍 Answer Grounding", f"{answer.get('grounding_score', 0):.3f}")
-                        with col3:
-                            st.metric("📝 Answer Relevance", f"{answer.get('answer_relevance', 0):.3f}")
-                        
-                        # Show sources
-                        sources = result.get('sources', [])
-                        if sources:
-                            st.subheader("📚 Sources")
-                            for j, source in enumerate(sources, 1):
-                                st.markdown(f"**{j}.** {source}")
+            try:
+                rag = load_rag_system()
+                
+                # Stream answer tokens into the page as they arrive; sources and
+                # evaluation events are collected on the side
+                events = {}
+                def answer_tokens():
+                    for event in rag.answer_question_stream(prompt, evaluate=True, defer_evaluation=False):
+                        if event['event'] == 'token':
+                            yield event['data']
+                        else:
+                            events[event['event']] = event['data']
+                
+                with st.spinner("🤔 Newton is thinking..."):
+                    tokens = answer_tokens()
+                    first_token = next(tokens, "")
+                
+                def all_tokens():
+                    yield first_token
+                    yield from tokens
+                
+                answer_text = st.write_stream(all_tokens())
+                result = {
+                    'answer': answer_text,
+                    'sources': events.get('sources', {}).get('sources', []),
+                    'evaluation': events.get('evaluation', {})
+                }
+                
+                # Display metrics and sources
+                with st.expander("📊 View Quality Metrics & Sources"):
+                    eval_data = result.get('evaluation', {})
+                    retrieval = eval_data.get('retrieval_metrics', {})
+                    answer = eval_data.get('answer_metrics', {})
                     
-                    # Add to chat history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": result['answer'],
-                        "metrics": result,
-                        "sources": sources
-                    })
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("🎯 Retrieval Quality", f"{retrieval.get('avg_retrieval_similarity', 0):.3f}")
+                    with col2:
+                        st.metric("🔍 Answer Grounding", f"{answer.get('grounding_score', 0):.3f}")
+                    with col3:
+                        st.metric("📝 Answer Relevance", f"{answer.get('answer_relevance', 0):.3f}")
                     
-                except Exception as e:
-                    error_msg = f"I apologize, but I encountered an error: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
-    
+                    # Show sources
+                    sources = result.get('sources', [])
+                    if sources:
+                        st.subheader("📚 Sources")
+                        for j, source in enumerate(sources, 1):
+                            st.markdown(f"**{j}.** {source}")
+                
+                # Add to chat history
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": result['answer'],
+                    "metrics": result,
+                    "sources": sources
+                })
+                
+            except Exception as e:
+                error_msg = f"I apologize, but I encountered an error: {str(e)}"
+                st.error(error_msg)
+                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+
     # Sidebar with clear button
     with st.sidebar:
         st.markdown("### 🍎 About Newton AI")
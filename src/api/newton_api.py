@@ -1,7 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
 from typing import Optional, List, Dict
+import asyncio
+import time
+import json
 import sys
 import os
 from dotenv import load_dotenv
@@ -13,7 +20,52 @@ load_dotenv()
 # Add src to path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from rag.newton_rag import EnhancedNewtonRAG
+from rag.async_rag import AsyncNewtonRAG
+
+# RAG system, built (and warmed up) once per process
+rag_system = None
+rag_task: Optional[asyncio.Task] = None
+warmup_state = {'status': 'not_started', 'steps': {}, 'started_at': None, 'ready_seconds': None, 'error': None}
+
+async def build_rag_system() -> AsyncNewtonRAG:
+    """Load the models and run a dummy request through every stage"""
+    global rag_system
+    warmup_state.update(status='loading', started_at=time.time(), error=None)
+    try:
+        # Model loading is slow and blocking; keep it off the event loop
+        rag = await asyncio.to_thread(AsyncNewtonRAG)
+        warmup_state['status'] = 'warming'
+        await rag.warmup(warmup_state['steps'])
+    except Exception as e:
+        warmup_state.update(status='failed', error=str(e))
+        raise
+    rag_system = rag
+    warmup_state.update(status='ready', ready_seconds=round(time.time() - warmup_state['started_at'], 2))
+    return rag
+
+def start_rag_system() -> asyncio.Task:
+    global rag_task
+    # A failed start is retried by the next caller
+    if rag_task is None or (rag_task.done() and rag_task.exception() is not None):
+        rag_task = asyncio.create_task(build_rag_system())
+    return rag_task
+
+async def get_rag_system() -> AsyncNewtonRAG:
+    if rag_system is not None:
+        return rag_system
+    # Shielded so a cancelled request doesn't cancel the shared start-up
+    return await asyncio.shield(start_rag_system())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # WARMUP_ON_STARTUP=false defers loading to the first request
+    if os.getenv('WARMUP_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes'):
+        start_rag_system()
+    yield
+    if rag_task is not None and not rag_task.done():
+        rag_task.cancel()
+    if rag_system is not None:
+        await rag_system.aclose()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -21,7 +73,8 @@ app = FastAPI(
     description="Intelligent RAG-powered chatbot about Isaac Newton's life and discoveries",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for web frontend integration
@@ -33,33 +86,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG system (cached)
-rag_system = None
-
-def get_rag_system():
-    global rag_system
-    if rag_system is None:
-        rag_system = EnhancedNewtonRAG()
-    return rag_system
-
 # Request/Response Models
 class ChatRequest(BaseModel):
     question: str
     evaluate: bool = True
+    # Retrieval depth: candidates fetched from the vector store and docs kept after reranking
+    limit: Optional[int] = Field(default=None, ge=1, le=100)
+    top_k: Optional[int] = Field(default=None, ge=1, le=20)
+    # Skip or shrink reranking when vector scores are decisive (None = server default)
+    adaptive: Optional[bool] = None
+    # 'dense', 'hybrid' (BM25 + vectors) or 'lexical' (BM25 only, no embedding call)
+    retrieval_mode: Optional[str] = Field(default=None, pattern="^(dense|hybrid|lexical)$")
+    # Return the per-stage latency breakdown (milliseconds) with the answer
+    include_timings: bool = False
+    # Evaluate in the background and return an evaluation_id to poll
+    # (None = EVALUATION_MODE, 'deferred' by default)
+    defer_evaluation: Optional[bool] = None
     
     class Config:
         schema_extra = {
             "example": {
                 "question": "What did Isaac Newton contribute to calculus?",
-                "evaluate": True
+                "evaluate": True,
+                "adaptive": True
             }
         }
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[str]
+    # Every page the answer's chunks came from, including merged near duplicates
+    source_urls: List[str] = []
     num_docs_used: int
     evaluation: Optional[Dict] = None
+    cache: Optional[Dict] = None
+    retrieval: Optional[Dict] = None
+    timings: Optional[Dict[str, float]] = None
+    # Set when the evaluation was deferred; poll GET /evaluations/{evaluation_id}
+    evaluation_id: Optional[str] = None
+
+class ChatBatchRequest(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=int(os.getenv('BATCH_MAX_QUESTIONS', '50')))
+    evaluate: bool = True
+    limit: Optional[int] = Field(default=None, ge=1, le=100)
+    top_k: Optional[int] = Field(default=None, ge=1, le=20)
+    adaptive: Optional[bool] = None
+    retrieval_mode: Optional[str] = Field(default=None, pattern="^(dense|hybrid|lexical)$")
+    # Generations in flight at once (None = BATCH_MAX_CONCURRENCY)
+    max_concurrency: Optional[int] = Field(default=None, ge=1, le=64)
+    include_timings: bool = False
+    defer_evaluation: Optional[bool] = None
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]
+    total_ms: float
 
 class HealthResponse(BaseModel):
     status: str
@@ -67,6 +147,20 @@ class HealthResponse(BaseModel):
     system_info: Dict
 
 # API Endpoints
+def chat_response(result: Dict, request) -> ChatResponse:
+    """Shape an engine result for /chat and /chat/batch"""
+    return ChatResponse(
+        answer=result['answer'],
+        sources=result['sources'],
+        source_urls=result.get('source_urls', []),
+        num_docs_used=result['num_docs_used'],
+        evaluation=result.get('evaluation') if request.evaluate else None,
+        cache=result.get('cache'),
+        retrieval=result.get('retrieval'),
+        timings=result.get('timings') if request.include_timings else None,
+        evaluation_id=result.get('evaluation_id')
+    )
+
 @app.get("/", response_model=Dict)
 async def root():
     """Welcome message and API info"""
@@ -75,28 +169,37 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
-        "chat_endpoint": "/chat"
+        "ready": "/ready",
+        "chat_endpoint": "/chat",
+        "stream_endpoint": "/chat/stream",
+        "batch_endpoint": "/chat/batch",
+        "evaluations": "/evaluations/{evaluation_id}",
+        "metrics": "/metrics"
     }
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    try:
-        # Test RAG system initialization
-        rag = get_rag_system()
-        return HealthResponse(
-            status="healthy",
-            message="Newton AI API is running perfectly",
-            system_info={
-                "rag_system": "initialized",
-                "vector_store": "qdrant_cloud",
-                "knowledge_chunks": "515",
-                "embedding_model": "text-embedding-3-small",
-                "llm_model": "gpt-4o-mini"
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"System unhealthy: {str(e)}")
+    """Liveness check; answers immediately and never loads the models (see /ready)"""
+    return HealthResponse(
+        status="healthy",
+        message="Newton AI API is running perfectly",
+        system_info={
+            "rag_system": warmup_state['status'],
+            "vector_store": "qdrant_cloud",
+            "knowledge_chunks": "515",
+            "embedding_model": "text-embedding-3-small",
+            "llm_model": "gpt-4o-mini"
+        }
+    )
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once models are loaded and warmed up, 503 with progress until then"""
+    ready = rag_system is not None
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, **warmup_state}
+    )
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_newton(request: ChatRequest):
@@ -108,26 +211,130 @@ async def chat_with_newton(request: ChatRequest):
     """
     try:
         # Get RAG system
-        rag = get_rag_system()
+        rag = await get_rag_system()
         
         # Process question
         #this will store 1)answer 2)sources 3)num_docs_used 4)rerank_docs
-        result = rag.answer_question(request.question, evaluate=request.evaluate)
-        
-        # Return structured response
-        return ChatResponse(
-            answer=result['answer'],
-            sources=result['sources'],
-            num_docs_used=result['num_docs_used'],
-            evaluation=result.get('evaluation') if request.evaluate else None
+        result = await rag.answer_question(
+            request.question, evaluate=request.evaluate,
+            limit=request.limit, top_k=request.top_k, adaptive=request.adaptive,
+            mode=request.retrieval_mode, defer_evaluation=request.defer_evaluation
         )
         
+        return chat_response(result, request)
+        
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Error processing question: {str(e)}"
         )
 
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_with_newton_batch(request: ChatBatchRequest):
+    """
+    Answer several questions in one call
+    
+    The questions share one embedding request, one vector search round trip
+    and one reranking pass; answers are generated concurrently. Results come
+    back in question order.
+    """
+    start = time.perf_counter()
+    try:
+        rag = await get_rag_system()
+        results = await rag.answer_questions(
+            request.questions, evaluate=request.evaluate,
+            limit=request.limit, top_k=request.top_k, adaptive=request.adaptive,
+            mode=request.retrieval_mode, max_concurrency=request.max_concurrency,
+            defer_evaluation=request.defer_evaluation
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error processing questions: {str(e)}"
+        )
+    
+    return ChatBatchResponse(
+        results=[chat_response(result, request) for result in results],
+        total_ms=round((time.perf_counter() - start) * 1000, 3)
+    )
+
+def format_sse(event: str, data) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_with_newton_stream(request: ChatRequest):
+    """
+    Streaming chat with Isaac Newton AI (server-sent events)
+    
+    Emits a `sources` event first, then one `token` event per piece of the
+    answer as it is generated, then `evaluation` (if evaluated synchronously)
+    and `done`, which carries the evaluation_id of a deferred evaluation.
+    """
+    rag = await get_rag_system()
+    
+    async def event_stream():
+        try:
+            events = rag.answer_question_stream(
+                request.question, evaluate=request.evaluate,
+                limit=request.limit, top_k=request.top_k, adaptive=request.adaptive,
+                mode=request.retrieval_mode, defer_evaluation=request.defer_evaluation
+            )
+            async for event in events:
+                yield format_sse(event['event'], event['data'])
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Error processing question: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/evaluations/{evaluation_id}")
+async def get_evaluation(evaluation_id: str, wait: float = Query(default=0, ge=0, le=30)):
+    """
+    Fetch a deferred evaluation
+    
+    Status is 'queued', 'running', 'completed' (with the metrics) or 'failed'.
+    With `wait`, polls for up to that many seconds until it is finished.
+    """
+    rag = await get_rag_system()
+    queue = rag.rag.get_evaluation_queue()
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            evaluation = await asyncio.to_thread(queue.get, evaluation_id)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Evaluation store unavailable: {str(e)}")
+        if evaluation is None:
+            raise HTTPException(status_code=404, detail="Unknown evaluation_id")
+        if evaluation['status'] in ('completed', 'failed') or time.monotonic() >= deadline:
+            return jsonable_encoder(evaluation)
+        await asyncio.sleep(0.25)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Semantic answer cache hit/miss statistics"""
+    rag = await get_rag_system()
+    if rag.cache is None:
+        return {"enabled": False}
+    stats = await rag.call_cache(rag.cache.stats)
+    return {"enabled": True, **stats}
+
+@app.get("/reranker/stats")
+async def reranker_stats():
+    """Rerank micro-batching queue depth and batch sizes (also exported on /metrics)"""
+    rag = await get_rag_system()
+    if not hasattr(rag.reranker, "stats"):
+        return {"batching": False}
+    return {"batching": True, **rag.reranker.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency, dependency errors, documents retrieved and rerank batching"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/examples")
 async def get_example_questions():
     """Get example questions to ask Newton"""
@@ -0,0 +1,92 @@
+"""Chunking throughput on very large pages: the original character chunker vs TokenChunker.
+
+Also reports how full chunks and packed embedding requests are relative to
+their token budgets.
+
+    python src/benchmarks/benchmark_chunker.py --chars 10000,100000,1000000
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run_benchmarks import SENTENCES
+from rag.chunker import TokenChunker, clean_text
+from rag.batch_indexer import pack_batches
+from rag.tokenizer import count_tokens
+from typing import Dict, List
+import numpy as np
+import argparse
+import random
+import time
+
+def make_page(chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < chars:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)
+
+def legacy_chunk_text(text: str, title: str, url: str, chunk_size: int = 800) -> List[Dict]:
+    """The original chunker: '. ' splits, character budget, string concatenation"""
+    sentences = text.split('. ')
+    chunks = []
+    current_chunk = ""
+    chunk_index = 0
+    for sentence in sentences:
+        if len(current_chunk + sentence) <= chunk_size:
+            current_chunk += sentence + ". "
+        else:
+            if current_chunk.strip():
+                chunks.append({'text': current_chunk.strip(), 'title': title, 'url': url, 'chunk_index': chunk_index})
+                chunk_index += 1
+            current_chunk = sentence + ". "
+    if current_chunk.strip():
+        chunks.append({'text': current_chunk.strip(), 'title': title, 'url': url, 'chunk_index': chunk_index})
+    return chunks
+
+def time_call(fn, repeats: int):
+    result = fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, float(np.median(timings))
+
+def request_fill(token_counts: List[int], texts: List[str], max_tokens: int, max_items: int) -> float:
+    counts = dict(zip(texts, token_counts))
+    batches = list(pack_batches(texts, max_tokens, max_items, counts))
+    return float(np.mean([sum(counts[text] for text in batch) / max_tokens for batch in batches[:-1] or batches]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunking on large pages")
+    parser.add_argument("--chars", default="10000,100000,1000000,5000000")
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--overlap-tokens", type=int, default=0)
+    parser.add_argument("--legacy-chunk-size", type=int, default=800)
+    parser.add_argument("--request-max-tokens", type=int, default=8000)
+    parser.add_argument("--request-max-items", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    chunker = TokenChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+    print(f"🔍 {args.max_tokens}-token chunks vs {args.legacy_chunk_size}-char legacy chunks")
+    print(f"{'chars':>10} {'chunker':<8} {'ms':>10} {'chunks':>7} {'chunk fill':>11} {'request fill':>13}")
+    for chars in [int(value) for value in args.chars.split(",")]:
+        text = clean_text(make_page(chars))
+        runs = {
+            'legacy': lambda: legacy_chunk_text(text, "Page", "url", args.legacy_chunk_size),
+            'token': lambda: list(chunker.chunk(text, "Page", "url"))
+        }
+        for name, fn in runs.items():
+            chunks, elapsed = time_call(fn, args.repeats)
+            texts = [chunk['text'] for chunk in chunks]
+            counts = [chunk.get('token_count') or count_tokens(chunk['text']) for chunk in chunks]
+            chunk_fill = float(np.mean(counts)) / args.max_tokens
+            fill = request_fill(counts, texts, args.request_max_tokens, args.request_max_items)
+            print(f"{chars:>10} {name:<8} {elapsed:>10.1f} {len(chunks):>7} {chunk_fill:>10.0%} {fill:>12.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Recall@k vs. memory vs. latency for compact vector settings.
+
+Sweeps embedding dimensions (text-embedding-3 `dimensions`), quantization
+(none / scalar int8 / binary) and oversampling. Recall is measured against
+exact search over full 1536-dim float32 vectors, which is what the index
+returns today. Memory is Qdrant's vector storage for --project-points points:
+what stays in RAM and what moves to disk with VECTOR_ON_DISK.
+
+Local in-memory Qdrant always searches exactly and ignores quantization, so
+in that mode quantized search is emulated the way Qdrant does it: approximate
+scores on int8 or 1-bit codes, oversampled candidates, rescoring with the
+originals. Pass --qdrant-url to measure real collections on a server instead.
+
+The offline fakes are sparse hashed bag-of-words vectors, which quantize far
+worse than dense text-embedding-3 vectors; use --embeddings openai (embeddings
+are cached) for numbers to choose settings by.
+
+    python src/benchmarks/benchmark_vectors.py
+    python src/benchmarks/benchmark_vectors.py --dimensions 1536,512,256 --oversampling 1,2,4
+    python src/benchmarks/benchmark_vectors.py --embeddings openai --qdrant-url http://localhost:6333
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('EMBEDDING_CACHE_MEMORY_ENTRIES', '0')
+
+from benchmarks.fakes import FakeOpenAI
+from benchmarks.run_benchmarks import make_pages, save_json
+from rag.chunker import TokenChunker
+from rag.embedding_cache import CachedEmbedder
+from rag.vector_config import FULL_DIMENSIONS, vectors_config, quantization_config, search_params
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import argparse
+import logging
+import math
+import time
+
+# Set bits per byte value, for Hamming distance on packed binary codes
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+def make_texts(pages: int, seed: int) -> List[str]:
+    chunker = TokenChunker()
+    return [
+        chunk['text'] for page in make_pages(pages, seed=seed)
+        for chunk in chunker.chunk(page['content'], page['title'], page['url'])
+    ]
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+def embed(client, texts: List[str], dimensions: int) -> np.ndarray:
+    embedder = CachedEmbedder(client, dimensions=dimensions)
+    vectors = [vector for start in range(0, len(texts), 256) for vector in embedder.embed(texts[start:start + 256])]
+    return normalize(np.asarray(vectors, dtype=np.float32))
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, min(k, corpus.shape[0] - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+def memory_bytes(points: int, dimensions: int, mode: str, on_disk: bool) -> Tuple[int, int]:
+    """(RAM, disk) bytes of vector storage; quantized codes are kept in RAM (always_ram)"""
+    originals = points * dimensions * 4
+    codes = {'none': 0, 'scalar': points * dimensions, 'binary': points * math.ceil(dimensions / 8)}[mode]
+    return (codes, originals) if on_disk else (codes + originals, 0)
+
+class EmulatedQuantizedSearch:
+    """What Qdrant does on a quantized collection, in NumPy.
+
+    Scalar: int8 codes over the 0.99 quantile range, scored by the dot product
+    of the dequantized values (Qdrant folds the offset terms in the same way).
+    Binary: one sign bit per dimension, scored by Hamming similarity. The top
+    limit * oversampling candidates are rescored with the float originals.
+    """
+
+    def __init__(self, vectors: np.ndarray, mode: str, oversampling: float, rescore: bool = True):
+        self.vectors = vectors
+        self.mode = mode
+        self.oversampling = oversampling
+        self.rescore = rescore
+        if mode == 'scalar':
+            self.low, self.high = np.quantile(vectors, [0.005, 0.995])
+            self.codes = self.dequantize(self.quantize(vectors))
+        else:
+            self.codes = np.packbits(vectors > 0, axis=1)
+
+    def quantize(self, vectors: np.ndarray) -> np.ndarray:
+        scaled = (np.clip(vectors, self.low, self.high) - self.low) / (self.high - self.low) * 255
+        return np.round(scaled).astype(np.uint8)
+
+    def dequantize(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) / 255 * (self.high - self.low) + self.low).astype(np.float32)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        if self.mode == 'scalar':
+            return self.codes @ self.dequantize(self.quantize(query))
+        bits = np.packbits(query > 0)
+        return -POPCOUNT[np.bitwise_xor(self.codes, bits)].sum(axis=1, dtype=np.int32)
+
+    def search(self, query: np.ndarray, limit: int) -> List[int]:
+        scores = self.approximate_scores(query)
+        depth = min(len(scores), max(limit, int(math.ceil(limit * self.oversampling))) if self.rescore else limit)
+        candidates = np.argpartition(-scores, depth - 1)[:depth]
+        if self.rescore:
+            scores = self.vectors[candidates] @ query
+        else:
+            scores = scores[candidates]
+        return candidates[np.argsort(-scores)[:limit]].tolist()
+
+class QdrantSearch:
+    """Search a collection built with the pipeline's vector settings"""
+
+    def __init__(self, client: QdrantClient, name: str, vectors: np.ndarray, mode: str, oversampling: float,
+                 on_disk: bool):
+        self.client = client
+        self.name = name
+        self.params = search_params(mode, oversampling=oversampling, rescore=True)
+        config = vectors_config(vectors.shape[1], mode)
+        config.on_disk = on_disk
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        client.create_collection(collection_name=name, vectors_config=config, quantization_config=quantization_config(mode))
+        for start in range(0, len(vectors), 1000):
+            client.upsert(collection_name=name, wait=True, points=[
+                PointStruct(id=start + i, vector=vector.tolist()) for i, vector in enumerate(vectors[start:start + 1000])
+            ])
+
+    def search(self, query: np.ndarray, limit: int) -> List[int]:
+        return [point.id for point in self.client.query_points(
+            collection_name=self.name, query=query.tolist(), limit=limit, search_params=self.params
+        ).points]
+
+    def close(self):
+        self.client.delete_collection(self.name)
+
+def evaluate(search: Callable[[np.ndarray, int], List[int]], queries: np.ndarray, truth: np.ndarray,
+             k: int) -> Dict:
+    search(queries[0], k)
+    hits, timings = 0, []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query, k)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += len(set(found) & set(expected.tolist()))
+    return {
+        'recall_at_k': hits / (len(queries) * k),
+        'p50_ms': float(np.median(timings)),
+        'p95_ms': float(np.percentile(timings, 95))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, memory and latency of reduced and quantized vectors")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic corpus size in pages")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20, help="Results per query; the RAG engine retrieves 20")
+    parser.add_argument("--dimensions", default="1536,512,256")
+    parser.add_argument("--quantization", default="none,scalar,binary")
+    parser.add_argument("--oversampling", default="1,2,4", help="Oversampling factors for quantized settings")
+    parser.add_argument("--no-disk", action="store_true", help="Keep the original vectors in RAM")
+    parser.add_argument("--project-points", type=int, default=1_000_000, help="Corpus size for the memory columns")
+    parser.add_argument("--embeddings", choices=["fake", "openai"], default="fake",
+                        help="Hashed bag-of-words fakes (offline) or text-embedding-3-small")
+    parser.add_argument("--qdrant-url", help="Measure on a Qdrant server instead of in-memory emulation")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.embeddings == "openai":
+        from rag.clients import get_openai_client
+        client = get_openai_client()
+    else:
+        client = FakeOpenAI()
+    on_disk = not args.no_disk
+    qdrant = QdrantClient(url=args.qdrant_url) if args.qdrant_url else QdrantClient(":memory:")
+
+    corpus_texts = make_texts(args.pages, seed=0)
+    query_texts = make_texts(max(1, args.queries // 2), seed=1)[:args.queries]
+    truth = exact_top_k(embed(client, corpus_texts, FULL_DIMENSIONS), embed(client, query_texts, FULL_DIMENSIONS), args.k)
+    where = f"Qdrant at {args.qdrant_url}" if args.qdrant_url else "in-memory Qdrant (quantization emulated)"
+    print(f"🔍 {len(corpus_texts)} chunks, {len(query_texts)} queries, recall@{args.k} vs 1536-dim exact, {where}")
+    print(f"{'dims':>5} {'quantization':<13} {'oversample':>10} {'recall':>7} {'RAM MB':>9} {'disk MB':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'':>5} {'':<13} {'':>10} {'':>7} {'(per ' + format(args.project_points, ',') + ' points)':>19}")
+
+    results = []
+    for dimensions in [int(d) for d in args.dimensions.split(",")]:
+        corpus = embed(client, corpus_texts, dimensions)
+        queries = embed(client, query_texts, dimensions)
+        for mode in args.quantization.split(","):
+            factors = [1.0] if mode == 'none' else [float(f) for f in args.oversampling.split(",")]
+            for oversampling in factors:
+                name = f"bench_vectors_{dimensions}_{mode}"
+                if args.qdrant_url or mode == 'none':
+                    backend = QdrantSearch(qdrant, name, corpus, mode, oversampling, on_disk and mode != 'none')
+                    stats = evaluate(backend.search, queries, truth, args.k)
+                    backend.close()
+                else:
+                    stats = evaluate(EmulatedQuantizedSearch(corpus, mode, oversampling).search, queries, truth, args.k)
+                ram, disk = memory_bytes(args.project_points, dimensions, mode, on_disk and mode != 'none')
+                stats.update(dimensions=dimensions, quantization=mode, oversampling=oversampling,
+                             ram_mb=ram / 2 ** 20, disk_mb=disk / 2 ** 20)
+                results.append(stats)
+                print(
+                    f"{dimensions:>5} {mode:<13} {oversampling if mode != 'none' else '-':>10} "
+                    f"{stats['recall_at_k']:>7.3f} {stats['ram_mb']:>9.0f} {stats['disk_mb']:>9.0f} "
+                    f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f}"
+                )
+
+    if args.output:
+        save_json({'settings': vars(args), 'chunks': len(corpus_texts), 'results': results}, args.output)
+        print(f"✓ Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Deterministic offline stand-ins for the external services used by the RAG engine.
+
+Embeddings are hashed bag-of-words vectors, so texts sharing words land close
+together and vector search returns meaningful neighbours without a network
+call. Latencies can be simulated to keep end-to-end timings realistic.
+"""
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import numpy as np
+import time
+import zlib
+import re
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def hash_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """Signed feature hashing of the lower-cased words, L2-normalized"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = zlib.crc32(word.encode('utf-8'))
+        vector[digest % dimensions] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+class FakeEmbeddings:
+    def __init__(self, owner: "FakeOpenAI"):
+        self.owner = owner
+
+    def create(self, input, model: str = "text-embedding-3-small", dimensions: Optional[int] = None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.owner.pause(self.owner.embedding_latency_ms)
+        self.owner.calls['embeddings'] += 1
+        dimensions = dimensions or self.owner.dimensions
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=hash_embedding(text, dimensions))
+            for i, text in enumerate(texts)
+        ])
+
+class FakeChatCompletions:
+    ANSWER = (
+        "Isaac Newton formulated the laws of motion and universal gravitation, "
+        "developed calculus and built the first reflecting telescope."
+    )
+
+    def __init__(self, owner: "FakeOpenAI"):
+        self.owner = owner
+
+    def create(self, model: str, messages: List[Dict], stream: bool = False, **kwargs):
+        self.owner.pause(self.owner.completion_latency_ms)
+        self.owner.calls['completions'] += 1
+        prompt = messages[-1]['content']
+        # The grounding judge asks for a bare number
+        content = "0.8" if "Return only the numeric score" in prompt else self.ANSWER
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        return iter([
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+            for word in content.split()
+        ])
+
+class FakeOpenAI:
+    """Drop-in for openai.OpenAI covering embeddings.create and chat.completions.create"""
+
+    def __init__(self, dimensions: int = 1536, embedding_latency_ms: float = 0.0,
+                 completion_latency_ms: float = 0.0):
+        self.dimensions = dimensions
+        self.embedding_latency_ms = embedding_latency_ms
+        self.completion_latency_ms = completion_latency_ms
+        self.calls = {'embeddings': 0, 'completions': 0}
+        self.embeddings = FakeEmbeddings(self)
+        self.chat = SimpleNamespace(completions=FakeChatCompletions(self))
+
+    @staticmethod
+    def pause(latency_ms: float):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def close(self):
+        pass
+
+class FakeCrossEncoder:
+    """Scores pairs by query-word overlap, with a per-token cost to mimic model work"""
+
+    def __init__(self, seconds_per_token: float = 0.0):
+        self.seconds_per_token = seconds_per_token
+
+    def predict(self, pairs: List[tuple], batch_size: int = 32, show_progress_bar: bool = False, **kwargs):
+        scores = np.empty(len(pairs), dtype=np.float32)
+        tokens = 0
+        for i, (query, text) in enumerate(pairs):
+            query_words = set(WORD_PATTERN.findall(query.lower()))
+            text_words = WORD_PATTERN.findall(text.lower())
+            tokens += len(text_words)
+            scores[i] = sum(word in query_words for word in text_words) / (len(text_words) or 1)
+        if self.seconds_per_token:
+            time.sleep(tokens * self.seconds_per_token)
+        return scores
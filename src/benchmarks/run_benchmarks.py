@@ -0,0 +1,272 @@
+"""Per-stage micro-benchmarks for the ingestion and RAG pipeline.
+
+Every external service is replaced by a deterministic local stand-in
+(benchmarks.fakes for OpenAI and the cross-encoder, an in-memory Qdrant), so
+the suite runs offline and timings reflect this repo's code. Each stage runs
+on synthetic corpora of growing size; results are written as JSON and can be
+compared against a saved baseline:
+
+    python src/benchmarks/run_benchmarks.py --sizes 10,100,1000
+    python src/benchmarks/run_benchmarks.py --update-baseline
+    python src/benchmarks/run_benchmarks.py --check --threshold 0.25
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# TextProcessor imports its models package relative to data_ingestion
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data_ingestion')))
+
+# Uncached, single-process behaviour: every stage does its full work on each run
+os.environ.setdefault('EMBEDDING_CACHE_DISK', 'off')
+os.environ.setdefault('EMBEDDING_CACHE_MEMORY_ENTRIES', '0')
+os.environ.setdefault('SEMANTIC_CACHE_BACKEND', 'none')
+os.environ.setdefault('RERANK_BATCHING', 'false')
+os.environ.setdefault('RETRIEVAL_MODE', 'dense')
+os.environ.setdefault('EVALUATION_MODE', 'sync')
+
+from benchmarks.fakes import FakeOpenAI, FakeCrossEncoder
+from rag.data_pipeline import NewtonDataPipeline
+from rag.vector_store import NewtonVectorStore, QdrantVectorBackend
+from rag.local_vector_index import LocalVectorBackend
+from rag.reranker import NewtonReranker
+from rag.evaluator import RAGEvaluator
+from rag.newton_rag import EnhancedNewtonRAG
+from processors.text_processors import TextProcessor
+from qdrant_client import QdrantClient
+from qdrant_client.models import VectorParams, Distance
+from pymongo import MongoClient
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+import numpy as np
+import argparse
+import platform
+import logging
+import random
+import json
+import time
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BASELINE_DIR, 'latest.json')
+
+QUERIES = [
+    "Who was Isaac Newton?",
+    "What did Newton contribute to calculus?",
+    "Explain Newton's laws of motion",
+    "What were Newton's key discoveries in optics?",
+    "How did Newton develop the theory of universal gravitation?",
+    "What is the Principia Mathematica about?",
+]
+
+SENTENCES = [
+    "Isaac Newton was an English polymath active as a mathematician, physicist and astronomer.",
+    "The Principia formulated the laws of motion and universal gravitation.",
+    "Newton built the first practical reflecting telescope.",
+    "He developed a theory of colour based on the observation that a prism separates white light.",
+    "Newton shares credit with Gottfried Wilhelm Leibniz for developing infinitesimal calculus.",
+    "He was a fellow of Trinity College and the second Lucasian Professor of Mathematics at Cambridge.",
+    "Newton served as Warden and later Master of the Royal Mint.",
+    "His work on the binomial series and the method of fluxions predates publication by decades.",
+    "Opticks was published in 1704 and described experiments on refraction and diffraction.",
+    "Newton was president of the Royal Society from 1703 until his death in 1727.",
+    "Kepler's laws of planetary motion follow from the inverse-square law of gravitation.",
+    "The Leibniz–Newton calculus controversy began in 1699 and lasted for years.",
+]
+
+COLLECTION = "newton_knowledge"
+
+def make_pages(count: int, sentences_per_page: int = 30, seed: int = 0) -> List[Dict]:
+    """Synthetic pages shaped like the documents SimpleStorage keeps in MongoDB"""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        sentences = [rng.choice(SENTENCES) for _ in range(rng.randint(sentences_per_page // 2, sentences_per_page * 2))]
+        pages.append({
+            'title': f"Synthetic page {i}",
+            'url': f"https://en.wikipedia.org/wiki/Synthetic_page_{i}",
+            'content': " ".join(sentences)
+        })
+    return pages
+
+def make_html(page: Dict) -> str:
+    """Wrap page text in the markup clean_html_content strips (scripts, navboxes, references)"""
+    paragraphs = "".join(
+        f"<p>{sentence}.<sup class=\"reference\">[{i}]</sup></p>\n"
+        for i, sentence in enumerate(page['content'].split(". "))
+    )
+    return (
+        f"<html><head><script>var x = 1;</script><style>p {{}}</style></head><body>"
+        f"<div class=\"hatnote\">For other uses, see {page['title']}.</div>"
+        f"<table class=\"infobox\"><tr><td>Born</td><td>1643</td></tr></table>"
+        f"{paragraphs}<div class=\"navbox\">Navigation</div></body></html>"
+    )
+
+def measure(fn: Callable, repeats: int, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': float(np.median(timings)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'mean_ms': float(np.mean(timings)),
+        'repeats': repeats
+    }
+
+def build_index(pipeline: NewtonDataPipeline, chunks: List[Dict]) -> QdrantClient:
+    """Embed chunks with the fake client and load them into an in-memory Qdrant"""
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=VectorParams(size=pipeline.openai_client.dimensions, distance=Distance.COSINE)
+    )
+    embeddings = pipeline.create_embeddings([chunk['text'] for chunk in chunks])
+    points = [pipeline.build_point(chunk, embedding) for chunk, embedding in zip(chunks, embeddings)]
+    for start in range(0, len(points), 1000):
+        client.upsert(collection_name=COLLECTION, points=points[start:start + 1000])
+    return client
+
+def run_size(size: int, args) -> Dict[str, Dict]:
+    """Time every stage on a corpus of `size` pages"""
+    llm = FakeOpenAI(
+        dimensions=args.dimensions, embedding_latency_ms=args.embedding_latency_ms,
+        completion_latency_ms=args.completion_latency_ms
+    )
+    # MongoClient connects lazily and the timed stages never touch it
+    pipeline = NewtonDataPipeline(
+        mongo_client=MongoClient(connect=False), qdrant_client=QdrantClient(":memory:"), openai_client=llm
+    )
+    processor = TextProcessor()
+    pages = make_pages(size)
+    html_pages = [make_html(page) for page in pages]
+    cleaned = [pipeline.clean_text(page['content']) for page in pages]
+    chunks = [
+        chunk for page, text in zip(pages, cleaned)
+        for chunk in pipeline.chunk_text(text, page['title'], page['url'])
+    ]
+
+    results = {}
+    results['clean_text'] = measure(lambda: [pipeline.clean_text(page['content']) for page in pages], args.repeats)
+    results['chunk_text'] = measure(
+        lambda: [pipeline.chunk_text(text, page['title'], page['url']) for page, text in zip(pages, cleaned)],
+        args.repeats
+    )
+    results['clean_html_content'] = measure(
+        lambda: [processor.clean_html_content(html) for html in html_pages], args.repeats
+    )
+
+    # Rerank depth follows the corpus, capped at the API's maximum limit
+    reranker = NewtonReranker(cross_encoder=FakeCrossEncoder(args.rerank_seconds_per_token))
+    candidates = [{'text': chunk['text'], 'title': chunk['title'], 'url': chunk['url']} for chunk in chunks[:100]]
+    results['rerank_documents'] = measure(
+        lambda: [reranker.rerank_documents(query, candidates, top_k=5) for query in QUERIES], args.repeats
+    )
+
+    client = build_index(pipeline, chunks)
+    query_vectors = [pipeline.create_embeddings([query])[0] for query in QUERIES]
+    qdrant_backend = QdrantVectorBackend(client, COLLECTION)
+    local_backend = LocalVectorBackend.from_qdrant(client, COLLECTION)
+    results['vector_search_qdrant'] = measure(
+        lambda: [qdrant_backend.search(vector, limit=20) for vector in query_vectors], args.repeats
+    )
+    results['vector_search_local'] = measure(
+        lambda: [local_backend.search(vector, limit=20) for vector in query_vectors], args.repeats
+    )
+
+    rag = EnhancedNewtonRAG(
+        vector_store=NewtonVectorStore(backend=qdrant_backend, client=client),
+        reranker=reranker,
+        evaluator=RAGEvaluator(llm),
+        llm=llm
+    )
+    questions = iter(QUERIES * (args.repeats + 1))
+    results['answer_question'] = measure(lambda: rag.answer_question(next(questions)), args.repeats)
+    # The whole query set as one batch: shared embedding, search and rerank
+    results['answer_questions'] = measure(lambda: rag.answer_questions(QUERIES), args.repeats)
+
+    for stage in results.values():
+        stage.update({'pages': size, 'chunks': len(chunks)})
+    return results
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    """Stages whose median got slower than the baseline by more than the threshold.
+
+    Tiny absolute differences are ignored so sub-millisecond stages don't flap.
+    """
+    regressions = []
+    for stage, sizes in results['results'].items():
+        for size, current in sizes.items():
+            previous = baseline.get('results', {}).get(stage, {}).get(size)
+            if not previous:
+                continue
+            delta = current['p50_ms'] - previous['p50_ms']
+            if delta > min_delta_ms and current['p50_ms'] > previous['p50_ms'] * (1 + threshold):
+                regressions.append(
+                    f"{stage} @ {size} pages: {previous['p50_ms']:.2f} ms -> {current['p50_ms']:.2f} ms "
+                    f"(+{delta / previous['p50_ms'] * 100:.0f}%)"
+                )
+    return regressions
+
+def save_json(data: Dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages with offline fakes")
+    parser.add_argument("--sizes", default="10,100,1000", help="Corpus sizes in pages")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--completion-latency-ms", type=float, default=0.0)
+    parser.add_argument("--rerank-seconds-per-token", type=float, default=0.0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Also save the results as the baseline")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero on a regression against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, as a fraction of baseline p50")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'results': {}
+    }
+    print(f"🔍 Benchmarking {len(sizes)} corpus sizes, {args.repeats} repeats")
+    print(f"{'stage':<22} {'pages':>6} {'chunks':>7} {'p50 ms':>10} {'p95 ms':>10}")
+    for size in sizes:
+        for stage, stats in run_size(size, args).items():
+            results['results'].setdefault(stage, {})[str(size)] = stats
+            print(f"{stage:<22} {size:>6} {stats['chunks']:>7} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f}")
+
+    save_json(results, args.output)
+    print(f"✓ Results saved to {args.output}")
+    if args.update_baseline:
+        save_json(results, args.baseline)
+        print(f"✓ Baseline updated at {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"✗ Regression: {regression}")
+        if not regressions:
+            print(f"✅ No stage slower than baseline by more than {args.threshold:.0%}")
+        if regressions and args.check:
+            sys.exit(1)
+    elif args.check:
+        print(f"✗ No baseline at {args.baseline}; run with --update-baseline first")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -32,20 +32,18 @@ def extract_and_store_newton_content():
     extractor = SimpleWikipediaExtractor()
     storage = SimpleStorage()
     
-    content_list = []
-    for page in NEWTON_PAGES:
-        try:
-            print(f"Extracting: {page}")
-            content = extractor.extract_page(page)
-            content_list.append(content)
-            print(f"✓ Got {len(content.content)} characters from {page}")
-        except Exception as e:
-            print(f"✗ Failed {page}: {e}")
+    # Pages fetched concurrently and rate-limited
+    print(f"Extracting {len(NEWTON_PAGES)} pages")
+    content_list = extractor.extract_pages(NEWTON_PAGES)
+    print(f"✓ Got {len(content_list)} of {len(NEWTON_PAGES)} pages")
     
     # Store all content
-    storage.store_content(content_list)
+    counts = storage.store_content(content_list)
     
-    return f"Successfully processed {len(content_list)} Newton pages for chatbot"
+    return (
+        f"Successfully processed {len(content_list)} Newton pages for chatbot "
+        f"({counts['inserted']} new, {counts['updated']} updated, {counts['unchanged']} unchanged)"
+    )
 
 # Single task - extract and store
 process_newton_content = extract_and_store_newton_content()
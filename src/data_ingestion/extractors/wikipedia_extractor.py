@@ -1,36 +1,142 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
 from models.wikipedia_models import WikipediaContent
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://en.wikipedia.org/w/api.php"
+
+class RateLimiter:
+    """Spaces requests evenly so concurrent workers stay under a polite request rate"""
+    
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
 class SimpleWikipediaExtractor:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, requests_per_second: float = 10.0, max_retries: int = 3):
         self.headers = {'User-Agent': 'NewtonAI-Bot/1.0 (Educational; student@example.com)'}
-    
-    def extract_page(self, page_title: str) -> WikipediaContent:
-        """Get clean text from Wikipedia page"""
-        url = f"https://en.wikipedia.org/w/api.php"
-        params = {
-            'action': 'parse',
-            'page': page_title,
-            'format': 'json',
-            'prop': 'text|displaytitle'
-        }
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
         
-        response = requests.get(url, params=params, headers=self.headers, timeout=15)
+        # One keep-alive session shared by all workers, retrying throttling and server errors
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("https://", adapter)
+    
+    def api_get(self, params: Dict) -> Dict:
+        self.rate_limiter.wait()
+        response = self.session.get(API_URL, params={**params, 'format': 'json'}, timeout=15)
+        response.raise_for_status()
         data = response.json()
-        
+        if 'error' in data:
+            raise ValueError(f"MediaWiki error: {data['error'].get('info', data['error'])}")
+        return data
+    
+    def html_to_text(self, html: str) -> str:
         # Clean HTML to text
-        soup = BeautifulSoup(data['parse']['text']['*'], 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
         
         # Remove unwanted elements
         for element in soup(['script', 'style', 'table', 'div.navbox', 'div.infobox']):
             element.decompose()
         
         clean_text = soup.get_text()
-        clean_text = ' '.join(clean_text.split())  # Clean whitespace
-        
+        return ' '.join(clean_text.split())  # Clean whitespace
+    
+    def fetch_page(self, page_title: str) -> Dict:
+        """Rendered page (action=parse, redirects followed): page ID, plain title and text"""
+        parse = self.api_get({
+            'action': 'parse',
+            'page': page_title,
+            'redirects': 1,
+            'prop': 'text',
+            'formatversion': 2
+        })['parse']
+        return {'pageid': parse['pageid'], 'title': parse['title'], 'text': self.html_to_text(parse['text'])}
+    
+    @staticmethod
+    def to_content(page_title: str, page: Dict) -> WikipediaContent:
+        # The URL is built from the requested title, as stored documents are keyed on it
         return WikipediaContent(
-            title=data['parse']['displaytitle'],
-            content=clean_text,
+            title=page['title'],
+            content=page['text'],
             url=f"https://en.wikipedia.org/wiki/{page_title.replace(' ', '_')}"
         )
+    
+    def extract_page(self, page_title: str) -> WikipediaContent:
+        """Get clean text from Wikipedia page"""
+        return self.to_content(page_title, self.fetch_page(page_title))
+    
+    def get_linked_titles(self, page_title: str, limit: int = 5000) -> List[str]:
+        """Article titles linked from a page, for growing the crawl list"""
+        titles = []
+        params = {
+            'action': 'query',
+            'titles': page_title,
+            'prop': 'links',
+            'plnamespace': 0,
+            'pllimit': 'max',
+            'formatversion': 2
+        }
+        while len(titles) < limit:
+            data = self.api_get(params)
+            for page in data['query'].get('pages', []):
+                titles.extend(link['title'] for link in page.get('links', []))
+            if 'continue' not in data:
+                break
+            params = {**params, **data['continue']}
+        return titles[:limit]
+    
+    def extract_pages(self, page_titles: List[str]) -> List[WikipediaContent]:
+        """Extract many pages, fetched concurrently through the shared rate limiter.
+
+        action=parse renders one page per request, so each title is its own
+        request. Pages that fail are logged and skipped; results keep the
+        input order, without duplicates when several titles lead to the same page.
+        """
+        titles = list(dict.fromkeys(page_titles))
+        
+        pages = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.fetch_page, title): title for title in titles}
+            for future in as_completed(futures):
+                title = futures[future]
+                try:
+                    pages[title] = future.result()
+                except Exception as e:
+                    logger.error(f"✗ Failed {title}: {e}")
+        
+        contents = {}
+        for title in titles:
+            if title not in pages:
+                continue
+            page = pages[title]
+            if page['pageid'] in contents:
+                continue
+            contents[page['pageid']] = self.to_content(title, page)
+            logger.info(f"✓ Got {len(page['text'])} characters from {page['title']}")
+        return list(contents.values())
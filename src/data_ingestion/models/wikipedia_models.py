@@ -1,8 +1,36 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Any, Dict, List
 
 class WikipediaContent(BaseModel):
     title: str
     content: str  # Clean text only
     url: str
     extracted_at: datetime = datetime.now()
+
+class ProcessingConfig(BaseModel):
+    remove_elements: List[str] = [
+        "script", "style", "table", "div.navbox", "div.infobox",
+        "div.hatnote", "div.dablink", "sup.reference"
+    ]
+    min_text_length: int = 100
+    preserve_structure: bool = False
+
+class ProcessedPageData(BaseModel):
+    source_type: str
+    source_id: str
+    page_title: str
+    page_id: int
+    revision_id: int
+    clean_text: str
+    text_length: int
+    source_url: str
+    metadata: Dict[str, Any] = {}
+
+class ProcessingSummary(BaseModel):
+    total_pages_processed: int
+    successful_pages: int
+    failed_pages: int
+    total_characters_processed: int
+    average_text_length: float
+    processing_time_seconds: float
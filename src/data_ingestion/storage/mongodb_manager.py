@@ -1,30 +1,107 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from typing import Dict
+import hashlib
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_client = None
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def get_client() -> MongoClient:
+    """One pooled client per process, with the same MONGO_* pool and timeout settings as rag.clients"""
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            os.getenv('MONGO_URI'),
+            maxPoolSize=int(os.getenv('MONGO_MAX_POOL_SIZE', '50')),
+            connectTimeoutMS=int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+            serverSelectionTimeoutMS=int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000')),
+            socketTimeoutMS=int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '60000'))
+        )
+    return _client
+
 class SimpleStorage:
-    def __init__(self):
-        self.client = MongoClient(os.getenv('MONGO_URI'))
+    def __init__(self, client: MongoClient = None):
+        self.client = client or get_client()
         self.db = self.client[os.getenv('MONGO_DB_NAME')]
         self.collection = self.db['newton_content']  # Simple collection name
+        self.key_documents_by_url()
+    
+    def key_documents_by_url(self):
+        """Upserts filter on url, so it must be indexed (and unique).
+
+        Pages used to be keyed on title, and the title format changed, so a
+        page could be stored twice under one url. The most recently extracted
+        copy is kept; the indexing pipeline tracks pages by url as well.
+        """
+        if 'title_1' in self.collection.index_information():
+            self.collection.drop_index('title_1')
+        duplicates = self.collection.aggregate([
+            {'$sort': {'extracted_at': -1}},
+            {'$group': {'_id': '$url', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': 1}}}
+        ])
+        stale = [doc_id for group in duplicates for doc_id in group['ids'][1:]]
+        if stale:
+            self.collection.delete_many({'_id': {'$in': stale}})
+            print(f"Removed {len(stale)} duplicate documents stored under an old title")
+        self.collection.create_index('url', unique=True)
     
-    def store_content(self, content_list):
-        """Store clean content for RAG"""
-        for content in content_list:
-            doc = {
-                'title': content.title,
-                'content': content.content,
-                'url': content.url,
-                'extracted_at': content.extracted_at
+    def store_content(self, content_list, batch_size: int = 500) -> Dict:
+        """Store clean content for RAG
+
+        Writes unordered bulk upserts and skips pages whose content hash is
+        unchanged. Returns total and per-batch inserted/updated/unchanged counts.
+        """
+        # Last occurrence wins if a url shows up twice
+        latest = {content.url: content for content in content_list}
+        contents = list(latest.values())
+        
+        totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        batches = []
+        for start in range(0, len(contents), batch_size):
+            batch = contents[start:start + batch_size]
+            hashes = {content.url: content_hash(content.content) for content in batch}
+            stored = {
+                doc['url']: doc
+                for doc in self.collection.find(
+                    {'url': {'$in': list(hashes)}}, {'url': 1, 'title': 1, 'content_hash': 1}
+                )
             }
             
-            # Update if exists, insert if new
-            self.collection.update_one(
-                {'title': content.title},
-                {'$set': doc},
-                upsert=True
-            )
+            operations = []
+            for content in batch:
+                previous = stored.get(content.url, {})
+                if previous.get('content_hash') == hashes[content.url] and previous.get('title') == content.title:
+                    continue
+                doc = {
+                    'title': content.title,
+                    'content': content.content,
+                    'url': content.url,
+                    'extracted_at': content.extracted_at,
+                    'content_hash': hashes[content.url]
+                }
+                
+                # Update if exists, insert if new
+                operations.append(UpdateOne({'url': content.url}, {'$set': doc}, upsert=True))
+            
+            counts = {'inserted': 0, 'updated': 0, 'unchanged': len(batch) - len(operations)}
+            if operations:
+                result = self.collection.bulk_write(operations, ordered=False)
+                counts['inserted'] = result.upserted_count
+                counts['updated'] = result.modified_count
+                counts['unchanged'] += result.matched_count - result.modified_count
+            
+            batches.append(counts)
+            for key in totals:
+                totals[key] += counts[key]
         
-        print(f"Stored {len(content_list)} documents for Newton chatbot")
+        print(
+            f"Stored {len(contents)} documents for Newton chatbot: "
+            f"{totals['inserted']} inserted, {totals['updated']} updated, {totals['unchanged']} unchanged"
+        )
+        return {**totals, 'batches': batches}
@@ -0,0 +1,41 @@
+from typing import Dict, List, Optional, Tuple
+import os
+
+DEFAULT_LIMIT = 20
+DEFAULT_TOP_K = 5
+
+class AdaptiveRetrievalPolicy:
+    """Decides per request how much cross-encoder work the vector hits deserve.
+
+    Candidates scoring more than cutoff_gap below the best hit are dropped
+    first. If the survivors fit in top_k there is nothing to rerank. If the
+    vector score gap between rank top_k and top_k + 1 is at least skip_margin,
+    the vector order is trusted as is. Otherwise only the survivors are
+    reranked, which is a full rerank when nothing was cut.
+    """
+    
+    def __init__(self, enabled: Optional[bool] = None, skip_margin: Optional[float] = None,
+                 cutoff_gap: Optional[float] = None):
+        if enabled is None:
+            enabled = os.getenv('ADAPTIVE_RETRIEVAL', 'false').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.skip_margin = skip_margin if skip_margin is not None else float(os.getenv('ADAPTIVE_SKIP_MARGIN', '0.08'))
+        self.cutoff_gap = cutoff_gap if cutoff_gap is not None else float(os.getenv('ADAPTIVE_CUTOFF_GAP', '0.15'))
+    
+    def plan(self, docs: List[Dict], top_k: int, adaptive: Optional[bool] = None) -> Tuple[List[Dict], bool, str]:
+        """Return (candidates, rerank_needed, path) for vector hits sorted by score"""
+        if not (self.enabled if adaptive is None else adaptive) or len(docs) <= top_k:
+            return docs, bool(docs), 'full_rerank'
+        
+        best = docs[0]['vector_score']
+        candidates = [doc for doc in docs if doc['vector_score'] >= best - self.cutoff_gap]
+        if len(candidates) <= top_k:
+            return candidates, False, 'skipped_cutoff'
+        
+        boundary_gap = candidates[top_k - 1]['vector_score'] - candidates[top_k]['vector_score']
+        if boundary_gap >= self.skip_margin:
+            return candidates[:top_k], False, 'skipped_confident'
+        
+        if len(candidates) < len(docs):
+            return candidates, True, 'shrunk_rerank'
+        return candidates, True, 'full_rerank'
@@ -0,0 +1,349 @@
+from .newton_rag import EnhancedNewtonRAG, WARMUP_DOCS, WARMUP_QUESTION, warmup_step
+from .vector_store import AsyncNewtonVectorStore, QdrantVectorBackend
+from .embedding_cache import AsyncCachedEmbedder
+from .evaluator import AsyncRAGEvaluator
+from .rerank_batcher import RerankBatcher
+from .adaptive_retrieval import DEFAULT_LIMIT, DEFAULT_TOP_K
+from .lexical_index import reciprocal_rank_fusion
+from .clients import get_async_openai_client, close_async_clients
+from .metrics import StageTimer, record_dependency_error
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class AsyncNewtonRAG:
+    """Non-blocking RAG engine for the API.
+
+    OpenAI and Qdrant calls go through their async clients. The CrossEncoder
+    is CPU bound, so reranking runs in a small dedicated thread pool; the pool
+    size caps how many rerank passes compete for cores at once.
+    """
+
+    def __init__(self, rag: Optional[EnhancedNewtonRAG] = None, rerank_workers: Optional[int] = None):
+        self.rag = rag or EnhancedNewtonRAG()
+        self.reranker = self.rag.reranker
+        self.cache = self.rag.cache
+        # Remote searches need the async client; an in-process backend is shared
+        # through the sync store, which swaps it on reload
+        sync_store = self.rag.vector_store
+        self.vector_store = AsyncNewtonVectorStore(
+            local_store=None if isinstance(sync_store.backend, QdrantVectorBackend) else sync_store
+        )
+        self.llm = get_async_openai_client()
+        self.embedder = AsyncCachedEmbedder(self.llm)
+        self.evaluator = AsyncRAGEvaluator(self.rag.evaluator, self.llm, self.embedder)
+
+        rerank_workers = rerank_workers or int(os.getenv('RERANK_MAX_WORKERS', '2'))
+        self.rerank_executor = ThreadPoolExecutor(
+            max_workers=rerank_workers, thread_name_prefix="rerank"
+        )
+
+        logger.info(f"✅ Async Newton RAG initialized ({rerank_workers} rerank workers)")
+    
+    async def create_embedding(self, text: str) -> List[float]:
+        return await self.embedder.embed_one(text)
+    
+    async def warmup(self, progress: Optional[Dict] = None) -> Dict:
+        """Async version of EnhancedNewtonRAG.warmup, exercising the async clients"""
+        progress = {} if progress is None else progress
+        embedding = docs = None
+        with warmup_step(progress, 'embedding'):
+            embedding = await self.create_embedding(WARMUP_QUESTION)
+        if embedding is not None:
+            with warmup_step(progress, 'search'):
+                docs = self.rag.format_documents(await self.vector_store.search(embedding, limit=5))
+        with warmup_step(progress, 'rerank'):
+            await self.rerank_documents(WARMUP_QUESTION, docs or WARMUP_DOCS, top_k=1)
+        return progress
+    
+    async def embed_query(self, question: str, mode: Optional[str] = None) -> Tuple[Optional[List[float]], str]:
+        """Async version of EnhancedNewtonRAG.embed_query"""
+        mode = mode or self.rag.retrieval_mode
+        if mode == 'lexical':
+            return None, mode
+        if self.rag.embedding_deadline is None:
+            return await self.create_embedding(question), mode
+        
+        # Shielded so a missed deadline still finishes and fills the embedding cache
+        task = asyncio.ensure_future(self.create_embedding(question))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.rag.embedding_deadline), mode
+        except asyncio.TimeoutError:
+            record_dependency_error('openai')
+            logger.warning(f"Query embedding exceeded {self.rag.embedding_deadline * 1000:.0f} ms, using lexical search")
+            return None, 'lexical'
+    
+    async def get_lexical_index(self):
+        """The BM25 index; the first request in a dense-by-default process builds it off the event loop"""
+        if self.rag.lexical_index is not None:
+            return self.rag.lexical_index
+        return await asyncio.to_thread(self.rag.get_lexical_index)
+    
+    async def search_candidates(self, question: str, query_embedding: Optional[List[float]], limit: int,
+                                with_vectors: bool, mode: str):
+        # BM25 search is in-process and fast, so it runs inline
+        if query_embedding is None:
+            return (await self.get_lexical_index()).search(question, limit=limit)
+        
+        dense = await self.vector_store.search(query_embedding, limit=limit, with_vectors=with_vectors)
+        if mode == 'hybrid':
+            lexical_index = await self.get_lexical_index()
+            return reciprocal_rank_fusion([dense, lexical_index.search(question, limit=limit)], limit)
+        return dense
+    
+    async def search_candidates_batch(self, questions: List[str], query_embeddings: List[Optional[List[float]]],
+                                      limit: int, with_vectors: bool, mode: str) -> List:
+        """Async version of EnhancedNewtonRAG.search_candidates_batch"""
+        if mode == 'lexical':
+            lexical_index = await self.get_lexical_index()
+            return [lexical_index.search(question, limit=limit) for question in questions]
+        
+        dense = await self.vector_store.search_batch(query_embeddings, limit=limit, with_vectors=with_vectors)
+        if mode == 'hybrid':
+            lexical_index = await self.get_lexical_index()
+            return [
+                reciprocal_rank_fusion([hits, lexical_index.search(question, limit=limit)], limit)
+                for question, hits in zip(questions, dense)
+            ]
+        return dense
+    
+    async def rerank_documents(self, question: str, docs: List[Dict], top_k: int = 5) -> List[Dict]:
+        """Run the CrossEncoder in the bounded rerank pool, or through the batcher"""
+        if isinstance(self.reranker, RerankBatcher):
+            if not docs:
+                return []
+            future = self.reranker.submit([(question, doc['text']) for doc in docs])
+            scores = await asyncio.wrap_future(future)
+            return self.reranker.reranker.select_top(docs, scores, top_k)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.rerank_executor, self.reranker.rerank_documents, question, docs, top_k
+        )
+    
+    async def generate_answer(self, question: str, docs: List[Dict]) -> str:
+        response = await self.llm.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": self.rag.build_prompt(question, docs)}],
+            temperature=0.3
+        )
+        return response.choices[0].message.content
+    
+    async def stream_answer_tokens(self, question: str, docs: List[Dict]) -> AsyncIterator[str]:
+        stream = await self.llm.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": self.rag.build_prompt(question, docs)}],
+            temperature=0.3,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def retrieve_documents(self, question: str, query_embedding: Optional[List[float]],
+                                 with_vectors: bool = False, limit: Optional[int] = None,
+                                 top_k: Optional[int] = None, adaptive: Optional[bool] = None,
+                                 mode: str = 'dense',
+                                 timer: Optional[StageTimer] = None) -> Tuple[List[Dict], Dict]:
+        limit, top_k = limit or DEFAULT_LIMIT, top_k or DEFAULT_TOP_K
+        timer = timer or StageTimer()
+        with timer.stage('search', dependency='vector_store'):
+            search_results = await self.search_candidates(question, query_embedding, limit, with_vectors, mode)
+        initial_docs = self.rag.format_documents(search_results)
+        
+        logger.info(f"✓ Retrieved {len(initial_docs)} initial documents ({mode})")
+        
+        candidates, rerank, path = self.rag.plan_candidates(initial_docs, top_k, adaptive, mode)
+        if rerank:
+            with timer.stage('rerank', dependency='reranker'):
+                docs = await self.rerank_documents(question, candidates, top_k=top_k)
+        else:
+            docs = candidates[:top_k]
+        return self.rag.finish_retrieval(initial_docs, candidates, docs, rerank, path, limit, top_k, mode, timer)
+    
+    async def call_cache(self, method, *args):
+        """In-process cache calls are cheap; shared-backend calls go to a thread"""
+        if self.cache is not None and self.cache.backend.is_remote:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+    
+    async def finish_answer(self, question: str, answer: str, docs: List[Dict], retrieval: Dict,
+                            query_embedding: Optional[List[float]], evaluate_now: bool, evaluate_later: bool,
+                            cache_scope: Optional[str], timer: StageTimer) -> Dict:
+        """Async version of EnhancedNewtonRAG.finish_answer; evaluation uses the async OpenAI client"""
+        if evaluate_now:
+            with timer.stage('evaluation'):
+                evaluation = await self.evaluator.evaluate(question, answer, docs, query_embedding, timer)
+            evaluation_id = None
+        else:
+            # Only queues the evaluation, which does not block
+            evaluation, evaluation_id = self.rag.evaluate_answer(
+                question, answer, docs, query_embedding, False, evaluate_later, timer
+            )
+        return await self.call_cache(
+            self.rag.record_answer, answer, docs, retrieval, query_embedding, evaluation, evaluate_now,
+            evaluation_id, cache_scope
+        )
+    
+    async def answer_question(self, question: str, evaluate: bool = True, limit: Optional[int] = None,
+                              top_k: Optional[int] = None, adaptive: Optional[bool] = None,
+                              mode: Optional[str] = None, defer_evaluation: Optional[bool] = None) -> Dict:
+        """Async version of EnhancedNewtonRAG.answer_question"""
+        timer = StageTimer()
+        evaluate_now, evaluate_later = self.rag.evaluation_plan(evaluate, defer_evaluation)
+        
+        # 1. Embed the question (skipped for lexical retrieval)
+        with timer.stage('embedding', dependency='openai'):
+            query_embedding, mode = await self.embed_query(question, mode)
+        use_cache = query_embedding is not None and self.rag.use_cache(limit, top_k)
+        scope = self.rag.cache_scope(mode, adaptive) if use_cache else None
+        
+        if use_cache:
+            with timer.stage('cache_lookup', dependency='cache'):
+                cached = await self.call_cache(
+                    self.rag.lookup_cache, question, query_embedding, scope, evaluate_now, evaluate_later
+                )
+            if cached:
+                return {**cached, 'timings': timer.finish()}
+        
+        # 2. Retrieve and rerank documents
+        reranked_docs, retrieval = await self.retrieve_documents(
+            question, query_embedding, with_vectors=evaluate, limit=limit, top_k=top_k,
+            adaptive=adaptive, mode=mode, timer=timer
+        )
+        
+        # 3. Generate answer
+        with timer.stage('generation', dependency='openai'):
+            answer = await self.generate_answer(question, reranked_docs)
+        
+        # 4. Evaluate (optional), compile and cache the result
+        result = await self.finish_answer(
+            question, answer, reranked_docs, retrieval, query_embedding,
+            evaluate_now, evaluate_later, scope, timer
+        )
+        return {**result, 'timings': timer.finish()}
+    
+    async def answer_questions(self, questions: List[str], evaluate: bool = True, limit: Optional[int] = None,
+                               top_k: Optional[int] = None, adaptive: Optional[bool] = None,
+                               mode: Optional[str] = None, max_concurrency: Optional[int] = None,
+                               defer_evaluation: Optional[bool] = None) -> List[Dict]:
+        """Async version of EnhancedNewtonRAG.answer_questions"""
+        if not questions:
+            return []
+        batch = StageTimer()
+        evaluate_now, evaluate_later = self.rag.evaluation_plan(evaluate, defer_evaluation)
+        timers = [StageTimer() for _ in questions]
+        results: List[Optional[Dict]] = [None] * len(questions)
+        mode = mode or self.rag.retrieval_mode
+        use_cache = mode != 'lexical' and self.rag.use_cache(limit, top_k)
+        scope = self.rag.cache_scope(mode, adaptive) if use_cache else None
+        limit, top_k = limit or DEFAULT_LIMIT, top_k or DEFAULT_TOP_K
+        
+        # 1. One embedding request for the whole batch
+        embeddings = [None] * len(questions)
+        if mode != 'lexical':
+            with batch.stage('embedding', dependency='openai'):
+                embeddings = await self.embedder.embed(questions)
+        
+        pending = list(range(len(questions)))
+        if use_cache:
+            with batch.stage('cache_lookup', dependency='cache'):
+                cached = [
+                    await self.call_cache(
+                        self.rag.lookup_cache, questions[i], embeddings[i], scope, evaluate_now, evaluate_later
+                    )
+                    for i in pending
+                ]
+            for i, hit in zip(pending, cached):
+                if hit:
+                    results[i] = {**hit, 'timings': {**batch.timings, **timers[i].finish()}}
+            pending = [i for i in pending if results[i] is None]
+        if not pending:
+            return results
+        
+        # 2. Batched search, then one rerank pass in the rerank pool
+        pending_questions = [questions[i] for i in pending]
+        with batch.stage('search', dependency='vector_store'):
+            search_results = await self.search_candidates_batch(
+                pending_questions, [embeddings[i] for i in pending], limit, evaluate, mode
+            )
+        loop = asyncio.get_running_loop()
+        retrieved = await loop.run_in_executor(
+            self.rerank_executor, self.rag.rerank_batch, pending_questions,
+            [self.rag.format_documents(hits) for hits in search_results], limit, top_k, adaptive, mode, batch
+        )
+        
+        # 3. Generate (and evaluate) with at most max_concurrency questions in flight
+        semaphore = asyncio.Semaphore(max_concurrency or self.rag.batch_concurrency)
+        
+        async def answer(i: int, reranked_docs: List[Dict], retrieval: Dict) -> Dict:
+            timer = timers[i]
+            async with semaphore:
+                with timer.stage('generation', dependency='openai'):
+                    generated = await self.generate_answer(questions[i], reranked_docs)
+                result = await self.finish_answer(
+                    questions[i], generated, reranked_docs, retrieval, embeddings[i],
+                    evaluate_now, evaluate_later, scope, timer
+                )
+            return {**result, 'timings': {**batch.timings, **timer.finish()}}
+        
+        answered = await asyncio.gather(*(
+            answer(i, docs, retrieval) for i, (docs, retrieval) in zip(pending, retrieved)
+        ))
+        for i, result in zip(pending, answered):
+            results[i] = result
+        return results
+    
+    async def answer_question_stream(self, question: str, evaluate: bool = True, limit: Optional[int] = None,
+                                     top_k: Optional[int] = None,
+                                     adaptive: Optional[bool] = None,
+                                     mode: Optional[str] = None,
+                                     defer_evaluation: Optional[bool] = None) -> AsyncIterator[Dict]:
+        """Async version of EnhancedNewtonRAG.answer_question_stream"""
+        timer = StageTimer()
+        evaluate_now, evaluate_later = self.rag.evaluation_plan(evaluate, defer_evaluation)
+        with timer.stage('embedding', dependency='openai'):
+            query_embedding, mode = await self.embed_query(question, mode)
+        use_cache = query_embedding is not None and self.rag.use_cache(limit, top_k)
+        scope = self.rag.cache_scope(mode, adaptive) if use_cache else None
+        
+        if use_cache:
+            with timer.stage('cache_lookup', dependency='cache'):
+                cached = await self.call_cache(
+                    self.rag.lookup_cache, question, query_embedding, scope, evaluate_now, evaluate_later
+                )
+            if cached:
+                for event in self.rag.replay_result({**cached, 'timings': timer.finish()}):
+                    yield event
+                return
+        
+        reranked_docs, retrieval = await self.retrieve_documents(
+            question, query_embedding, with_vectors=evaluate, limit=limit, top_k=top_k,
+            adaptive=adaptive, mode=mode, timer=timer
+        )
+        yield self.rag.sources_event(reranked_docs, retrieval)
+        
+        tokens = []
+        with timer.stage('generation', dependency='openai'):
+            async for token in self.stream_answer_tokens(question, reranked_docs):
+                tokens.append(token)
+                yield {'event': 'token', 'data': token}
+        
+        result = await self.finish_answer(
+            question, "".join(tokens), reranked_docs, retrieval, query_embedding,
+            evaluate_now, evaluate_later, scope, timer
+        )
+        if evaluate_now:
+            yield {'event': 'evaluation', 'data': result['evaluation']}
+        yield self.rag.done_event(result, timer.finish())
+    
+    async def aclose(self):
+        """Release the shared async HTTP clients, the rerank pool and the evaluation workers"""
+        await close_async_clients()
+        self.rerank_executor.shutdown(wait=False)
+        if self.rag.evaluation_queue is not None:
+            await asyncio.to_thread(self.rag.evaluation_queue.close)
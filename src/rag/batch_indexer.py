@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+from qdrant_client.models import PointStruct
+from .embedding_cache import CachedEmbedder, embedding_key
+from .tokenizer import count_tokens
+import logging
+import random
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+def pack_batches(texts: List[str], max_tokens: int, max_items: int,
+                 token_counts: Optional[Dict[str, int]] = None) -> Iterator[List[str]]:
+    """Greedily pack texts into request batches under both the token and item budget.
+
+    Known token counts (e.g. from the chunker) are used instead of re-tokenizing.
+    """
+    token_counts = token_counts or {}
+    batch, batch_tokens = [], 0
+    for text in texts:
+        tokens = token_counts.get(text)
+        if tokens is None:
+            tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+class BatchEmbedder:
+    """Embeds large text sets with packed requests, several in flight at once.
+
+    Cached vectors are resolved in one lookup up front; only misses are
+    packed into requests. Rate-limit and transient errors are retried with
+    exponential backoff and jitter.
+    """
+    
+    def __init__(self, embedder: CachedEmbedder, max_tokens: int = None, max_items: int = None,
+                 max_in_flight: int = None, max_retries: int = None):
+        self.embedder = embedder
+        self.max_tokens = max_tokens or int(os.getenv('EMBED_BATCH_MAX_TOKENS', '100000'))
+        self.max_items = max_items or int(os.getenv('EMBED_BATCH_MAX_ITEMS', '512'))
+        self.max_in_flight = max_in_flight or int(os.getenv('EMBED_MAX_IN_FLIGHT', '4'))
+        self.max_retries = max_retries or int(os.getenv('EMBED_MAX_RETRIES', '6'))
+    
+    def request_with_retry(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.embedder.client.embeddings.create(**self.embedder.request_kwargs(texts))
+                return [data.embedding for data in response.data]
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+                logger.warning(f"Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def embed(self, texts: List[str],
+              token_counts: Optional[List[int]] = None) -> Iterator[Tuple[List[int], List[List[float]]]]:
+        """Yield (input indices, vectors) groups as they become available.
+
+        Cache hits come first as one group, then each request's results in
+        completion order, so callers can start storing before the last
+        request returns. token_counts, parallel to texts, skips re-tokenizing.
+        """
+        model, dimensions = self.embedder.model, self.embedder.dimensions
+        keys = [embedding_key(text, model, dimensions) for text in texts]
+        cached = self.embedder.cache.get_many(keys)
+        
+        positions = {}
+        for i, (text, key) in enumerate(zip(texts, keys)):
+            if key not in cached:
+                positions.setdefault(text, []).append(i)
+        
+        hit_indices = [i for i, key in enumerate(keys) if key in cached]
+        if hit_indices:
+            yield hit_indices, [cached[keys[i]] for i in hit_indices]
+        
+        counts = dict(zip(texts, token_counts)) if token_counts is not None else None
+        batches = list(pack_batches(list(positions), self.max_tokens, self.max_items, counts))
+        logger.info(
+            f"✓ {len(hit_indices)} embeddings from cache, {len(positions)} to embed in {len(batches)} requests"
+        )
+        
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embed") as pool:
+            futures = {pool.submit(self.request_with_retry, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                vectors = future.result()
+                self.embedder.cache.put_many({
+                    embedding_key(text, model, dimensions): vector for text, vector in zip(batch, vectors)
+                })
+                
+                indices, grouped = [], []
+                for text, vector in zip(batch, vectors):
+                    for i in positions[text]:
+                        indices.append(i)
+                        grouped.append(vector)
+                yield indices, grouped
+
+class BulkUpserter:
+    """Buffers points and writes them to Qdrant in large batches, several in parallel"""
+    
+    def __init__(self, client, collection_name: str, batch_size: int = None, parallel: int = None):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size or int(os.getenv('QDRANT_UPSERT_BATCH_SIZE', '256'))
+        self.pool = ThreadPoolExecutor(
+            max_workers=parallel or int(os.getenv('QDRANT_UPSERT_PARALLEL', '4')),
+            thread_name_prefix="upsert"
+        )
+        self.buffer: List[PointStruct] = []
+        self.pending = []
+        self.stored = 0
+    
+    def add(self, points: List[PointStruct]):
+        self.buffer.extend(points)
+        while len(self.buffer) >= self.batch_size:
+            self._submit(self.buffer[:self.batch_size])
+            self.buffer = self.buffer[self.batch_size:]
+    
+    def _submit(self, points: List[PointStruct]):
+        self.pending.append(self.pool.submit(
+            self.client.upsert, collection_name=self.collection_name, points=points, wait=True
+        ))
+        self.stored += len(points)
+    
+    def flush(self) -> int:
+        """Write what is buffered and wait for every in-flight batch; raises the first failure"""
+        if self.buffer:
+            self._submit(self.buffer)
+            self.buffer = []
+        for future in self.pending:
+            future.result()
+        self.pending = []
+        return self.stored
+    
+    def close(self) -> int:
+        try:
+            return self.flush()
+        finally:
+            self.pool.shutdown()
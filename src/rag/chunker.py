@@ -0,0 +1,131 @@
+from collections import deque
+from typing import Dict, Iterator, Optional, Tuple
+from .tokenizer import EMBEDDING_MODEL, count_tokens, counts_exactly, get_encoding
+import logging
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Compiled once; clean_text runs them for every document
+WHITESPACE = re.compile(r'\s+')
+DISALLOWED_CHARS = re.compile(r'[^\w\s.,;:!?()-]')
+SENTENCE_END_SPACING = re.compile(r'([.!?])\s*')
+
+# End punctuation and whitespace, followed by what can start a sentence
+BOUNDARY = re.compile(r'[.!?]+\s+(?=["\'(\[]?[A-Z0-9])')
+
+# Periods after these don't end a sentence
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'rev', 'hon', 'gen', 'col', 'capt', 'lt',
+    'sir', 'vs', 'etc', 'ie', 'eg', 'cf', 'al', 'approx', 'ca', 'c', 'fl', 'no', 'vol', 'pp', 'ed', 'eds',
+    'fig', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec'
+})
+
+def clean_text(content: str) -> str:
+    """Collapse whitespace, drop symbols and space out sentence punctuation"""
+    content = WHITESPACE.sub(' ', content)
+    content = DISALLOWED_CHARS.sub('', content)
+    content = SENTENCE_END_SPACING.sub(r'\1 ', content)
+    return content.strip()
+
+def split_sentences(text: str) -> Iterator[str]:
+    """Rule-based sentence segmentation in a single pass over the text.
+
+    A boundary is end punctuation plus whitespace where the next sentence
+    starts with a capital, digit or opening quote/bracket, and the word
+    before it is not a known abbreviation or a single letter (initials, "i. e.").
+    """
+    start = 0
+    for match in BOUNDARY.finditer(text):
+        stop = match.start()
+        if text[stop] == '.':
+            word = text[max(text.rfind(' ', start, stop) + 1, start):stop].lstrip('("\'[').lower()
+            if len(word) == 1 or word in ABBREVIATIONS:
+                continue
+        sentence = text[start:stop + 1].strip()
+        if sentence:
+            yield sentence
+        start = match.end()
+    sentence = text[start:].strip()
+    if sentence:
+        yield sentence
+
+class TokenChunker:
+    """Packs sentences into chunks of at most `max_tokens` embedding-model tokens.
+
+    Works as a generator over one pass of the document: every sentence is
+    tokenized once, and consecutive chunks share up to `overlap_tokens` of
+    trailing sentences. A single sentence longer than the budget is split on
+    token boundaries.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None,
+                 model: str = EMBEDDING_MODEL):
+        self.max_tokens = max_tokens or int(os.getenv('CHUNK_MAX_TOKENS', '200'))
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else int(os.getenv('CHUNK_OVERLAP_TOKENS', '0'))
+        if self.overlap_tokens >= self.max_tokens:
+            raise ValueError("CHUNK_OVERLAP_TOKENS must be smaller than CHUNK_MAX_TOKENS")
+        self.model = model
+
+    def signature(self) -> str:
+        """Identifies the chunking settings; a change means stored chunks are stale.
+
+        Chunks sized with the ~4 chars/token estimate are marked, so they are
+        rebuilt once the real tokenizer loads.
+        """
+        signature = f"tokens:{self.model}:{self.max_tokens}:{self.overlap_tokens}"
+        return signature if counts_exactly(self.model) else f"{signature}:estimated"
+
+    def split_long_sentence(self, sentence: str) -> Iterator[Tuple[str, int]]:
+        encoding = get_encoding(self.model)
+        if encoding is None:
+            # Same ~4 chars/token estimate count_tokens falls back to
+            width = self.max_tokens * 4
+            for i in range(0, len(sentence), width):
+                piece = sentence[i:i + width]
+                yield piece, count_tokens(piece, self.model)
+            return
+        tokens = encoding.encode(sentence, disallowed_special=())
+        for i in range(0, len(tokens), self.max_tokens):
+            window = tokens[i:i + self.max_tokens]
+            yield encoding.decode(window), len(window)
+
+    def pieces(self, text: str) -> Iterator[Tuple[str, int]]:
+        """(sentence, token count) pairs, with oversized sentences split up"""
+        for sentence in split_sentences(text):
+            tokens = count_tokens(sentence, self.model)
+            if tokens > self.max_tokens:
+                yield from self.split_long_sentence(sentence)
+            else:
+                yield sentence, tokens
+
+    def chunk(self, text: str, title: str, url: str) -> Iterator[Dict]:
+        window = deque()
+        window_tokens = 0
+        chunk_index = 0
+
+        for sentence, tokens in self.pieces(text):
+            if window and window_tokens + tokens > self.max_tokens:
+                yield self.make_chunk(window, window_tokens, title, url, chunk_index)
+                chunk_index += 1
+                # Keep the trailing sentences that fit in the overlap
+                while window and (window_tokens > self.overlap_tokens or window_tokens + tokens > self.max_tokens):
+                    window_tokens -= window.popleft()[1]
+            window.append((sentence, tokens))
+            window_tokens += tokens
+
+        # Every emit is followed by a new sentence, so a non-empty window is unemitted
+        if window:
+            yield self.make_chunk(window, window_tokens, title, url, chunk_index)
+
+    @staticmethod
+    def make_chunk(window, window_tokens: int, title: str, url: str, chunk_index: int) -> Dict:
+        return {
+            'text': " ".join(sentence for sentence, _ in window),
+            'title': title,
+            'url': url,
+            'chunk_index': chunk_index,
+            'source_type': 'wikipedia',
+            'token_count': window_tokens
+        }
@@ -0,0 +1,108 @@
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from pymongo import MongoClient
+from typing import Callable, Dict
+import threading
+import logging
+import httpx
+import os
+
+logger = logging.getLogger(__name__)
+
+# One client (and so one connection pool) per dependency per process
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+def _shared(name: str, factory: Callable[[], object]):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+                logger.info(f"✓ Created shared {name} client")
+    return client
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+def openai_settings() -> Dict:
+    """Timeout, retries and HTTP keep-alive limits for OpenAI (OPENAI_* settings)"""
+    return {
+        'api_key': os.getenv('OPENAI_API_KEY'),
+        'timeout': httpx.Timeout(
+            float(os.getenv('OPENAI_TIMEOUT_SECONDS', '30')),
+            connect=float(os.getenv('OPENAI_CONNECT_TIMEOUT_SECONDS', '5'))
+        ),
+        'max_retries': int(os.getenv('OPENAI_MAX_RETRIES', '2')),
+        'limits': httpx.Limits(
+            max_connections=int(os.getenv('OPENAI_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.getenv('OPENAI_MAX_KEEPALIVE', '20')),
+            keepalive_expiry=float(os.getenv('OPENAI_KEEPALIVE_SECONDS', '60'))
+        )
+    }
+
+def qdrant_settings() -> Dict:
+    """Connection settings for Qdrant (QDRANT_* settings).
+
+    QDRANT_PREFER_GRPC=true switches searches and upserts to the gRPC port,
+    which avoids JSON encoding of vectors. The server version check costs a
+    request per client, so it is skipped unless QDRANT_CHECK_COMPATIBILITY is set.
+    """
+    return {
+        'url': os.getenv("QDRANT_CLOUD_URL"),
+        'api_key': os.getenv("QDRANT_APIKEY"),
+        'timeout': int(os.getenv('QDRANT_TIMEOUT_SECONDS', '10')),
+        'prefer_grpc': _env_flag('QDRANT_PREFER_GRPC', 'false'),
+        'grpc_port': int(os.getenv('QDRANT_GRPC_PORT', '6334')),
+        'pool_size': int(os.getenv('QDRANT_POOL_SIZE', '32')),
+        'check_compatibility': _env_flag('QDRANT_CHECK_COMPATIBILITY', 'false')
+    }
+
+def mongo_settings() -> Dict:
+    """Pool size and timeouts for MongoDB (MONGO_* settings)"""
+    return {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', '50')),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000')),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '60000'))
+    }
+
+def create_openai_client() -> OpenAI:
+    settings = openai_settings()
+    return OpenAI(
+        api_key=settings['api_key'], timeout=settings['timeout'], max_retries=settings['max_retries'],
+        http_client=DefaultHttpxClient(limits=settings['limits'])
+    )
+
+def create_async_openai_client() -> AsyncOpenAI:
+    settings = openai_settings()
+    return AsyncOpenAI(
+        api_key=settings['api_key'], timeout=settings['timeout'], max_retries=settings['max_retries'],
+        http_client=DefaultAsyncHttpxClient(limits=settings['limits'])
+    )
+
+def get_openai_client() -> OpenAI:
+    return _shared('openai', create_openai_client)
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Shared async client; it belongs to the event loop that first uses it"""
+    return _shared('async_openai', create_async_openai_client)
+
+def get_qdrant_client() -> QdrantClient:
+    return _shared('qdrant', lambda: QdrantClient(**qdrant_settings()))
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    return _shared('async_qdrant', lambda: AsyncQdrantClient(**qdrant_settings()))
+
+def get_mongo_client() -> MongoClient:
+    return _shared('mongo', lambda: MongoClient(os.getenv('MONGO_URI'), **mongo_settings()))
+
+async def close_async_clients():
+    """Close the shared async clients, e.g. on API shutdown"""
+    with _clients_lock:
+        clients = [_clients.pop(name) for name in ('async_openai', 'async_qdrant') if name in _clients]
+    for client in clients:
+        await client.close()
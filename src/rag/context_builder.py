@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Set, Tuple
+from .chunker import split_sentences
+from .tokenizer import count_tokens
+import logging
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+GENERATION_MODEL = "gpt-4o-mini"
+
+WORD = re.compile(r'\w+')
+
+def shingles(sentence: str) -> Set:
+    """Word bigrams of a sentence, lowercased; single-word sentences fall back to the word"""
+    words = WORD.findall(sentence.lower())
+    if len(words) < 2:
+        return set(words)
+    return set(zip(words, words[1:]))
+
+def coverage(sentence_shingles: Set, seen: Set) -> float:
+    """Share of a sentence's bigrams that already appear in `seen`"""
+    if not sentence_shingles:
+        return 0.0
+    return len(sentence_shingles & seen) / len(sentence_shingles)
+
+class ContextBuilder:
+    """Packs reranked documents into a token budget for the generation prompt.
+
+    Documents are taken in rank order and split into sentences. A sentence
+    whose word bigrams are at least `dedup_threshold` covered by the bigrams
+    already packed is dropped as a near duplicate, which is common when
+    several pages describe the same event. The rest are packed until
+    `max_tokens` generation-model tokens are used; a sentence that does not
+    fit is skipped so shorter ones later on can still fill the budget.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, dedup_threshold: Optional[float] = None,
+                 model: str = GENERATION_MODEL):
+        self.max_tokens = max_tokens or int(os.getenv('CONTEXT_MAX_TOKENS', '1500'))
+        self.dedup_threshold = (dedup_threshold if dedup_threshold is not None
+                                else float(os.getenv('CONTEXT_DEDUP_THRESHOLD', '0.8')))
+        self.model = model
+
+    def pack(self, docs: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """Return copies of `docs` with the packed 'context_text' of each, plus packing stats"""
+        seen: Set = set()
+        used = duplicates = over_budget = 0
+        packed = []
+
+        for doc in docs:
+            sentences = []
+            for sentence in split_sentences(doc['text']):
+                sentence_shingles = shingles(sentence)
+                if coverage(sentence_shingles, seen) >= self.dedup_threshold:
+                    duplicates += 1
+                    continue
+                # +1 for the separator joining it to the previous sentence
+                tokens = count_tokens(sentence, self.model) + 1
+                if used + tokens > self.max_tokens:
+                    over_budget += 1
+                    continue
+                used += tokens
+                seen |= sentence_shingles
+                sentences.append(sentence)
+            packed.append({**doc, 'context_text': " ".join(sentences)})
+
+        original_tokens = count_tokens(self.join([doc['text'] for doc in docs]), self.model)
+        context_tokens = count_tokens(self.join([doc['context_text'] for doc in packed]), self.model)
+        stats = {
+            'budget_tokens': self.max_tokens,
+            'original_tokens': original_tokens,
+            'context_tokens': context_tokens,
+            'tokens_saved': original_tokens - context_tokens,
+            'duplicate_sentences': duplicates,
+            'over_budget_sentences': over_budget
+        }
+        if stats['tokens_saved']:
+            logger.info(
+                f"✓ Packed context into {context_tokens} tokens "
+                f"(saved {stats['tokens_saved']}, {duplicates} duplicate sentences)"
+            )
+        return packed, stats
+
+    @staticmethod
+    def join(texts: List[str]) -> str:
+        """How the prompt joins the documents' context"""
+        return "\n\n".join(text for text in texts if text)
@@ -1,133 +1,548 @@
 import os
-import re
 import uuid
-from typing import List, Dict
-from pymongo import MongoClient
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pymongo import MongoClient, UpdateOne
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
-from openai import OpenAI
+from qdrant_client.models import (
+    VectorParamsDiff, Disabled, PointStruct, PointIdsList, FilterSelector, Filter,
+    IsEmptyCondition, PayloadField, SetPayload, SetPayloadOperation
+)
 from dotenv import load_dotenv
+from .index_generation import IndexGeneration, INDEX_RUN_ID
+from .embedding_cache import CachedEmbedder
+from .local_vector_index import LocalVectorBackend, DEFAULT_INDEX_PATH
+from .batch_indexer import BatchEmbedder, BulkUpserter
+from .lexical_index import BM25Index
+from .chunker import TokenChunker, clean_text
+from .near_duplicates import MinHasher, StoredNearDuplicates
+from .vector_config import vector_size, vectors_config, quantization_config, quantization_mode, originals_on_disk
+from .stream_stages import StagedStream
+from .clients import get_mongo_client, get_openai_client, get_qdrant_client
+from itertools import islice
 import logging
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-class NewtonDataPipeline:
-    def __init__(self):
-        self.mongo_client = MongoClient(os.getenv('MONGO_URI'))
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-        self.qdrant_client = QdrantClient(
-            url=os.getenv("QDRANT_CLOUD_URL"),
-            api_key=os.getenv("QDRANT_APIKEY")
-        )
+def chunk_point_id(url: str, chunk_index: int, text: str) -> str:
+    """Deterministic point ID: re-indexing the same chunk overwrites it instead of duplicating it"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{url}#{chunk_index}:{content_hash(text)}"))
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
-        self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+class NewtonDataPipeline:
+    def __init__(self, mongo_client: MongoClient = None, qdrant_client: QdrantClient = None, openai_client=None):
+        self.mongo_client = mongo_client or get_mongo_client()
+        self.qdrant_client = qdrant_client or get_qdrant_client()
+        self.openai_client = openai_client or get_openai_client()
+        self.embedder = CachedEmbedder(self.openai_client)
+        self.batch_embedder = BatchEmbedder(self.embedder)
+        self.chunker = TokenChunker()
         
-        self.mongo_db = self.mongo_client[os.getenv('MONGO_DB_NAME')]
+        self.mongo_db = self.mongo_client[os.getenv('MONGO_DB_NAME', 'newton_ai')]
         self.collection = self.mongo_db['newton_content']
+        # Per-document content hash and point IDs from the last indexing run
+        self.index_state = self.mongo_db['newton_index_state']
+        self.index_runs = self.mongo_db['newton_index_runs']
+        # Stored chunk -> MinHash signature and every source page that contained it
+        self.chunk_sources = self.mongo_db['newton_chunk_sources']
         self.qdrant_collection = "newton_knowledge"
+        
+        # Streaming ingestion: Mongo read batch, queue depth between stages,
+        # and chunk tokens gathered per embedding group
+        self.scan_batch_size = int(os.getenv('INGEST_SCAN_BATCH_SIZE', '500'))
+        self.queue_size = int(os.getenv('INGEST_QUEUE_SIZE', '2'))
+        self.group_max_tokens = int(os.getenv('INGEST_GROUP_MAX_TOKENS', '200000'))
+        
+        # Near-duplicate chunks (estimated Jaccard >= threshold) are merged
+        # into the stored chunk instead of being embedded again
+        self.dedup_enabled = os.getenv('CHUNK_DEDUP', 'true').lower() == 'true'
+        self.dedup_threshold = float(os.getenv('CHUNK_DEDUP_THRESHOLD', '0.8'))
+        self.minhasher = MinHasher()
+        self.near_duplicates: Optional[StoredNearDuplicates] = None
+    
+    def index_signature(self) -> str:
+        """Chunking, dedup and vector size; documents indexed under other settings are re-indexed"""
+        dedup = f"lsh-dedup:{self.dedup_threshold:g}" if self.dedup_enabled else "dedup:off"
+        return f"{self.chunker.signature()}|{dedup}|dims:{vector_size()}"
     
     def clean_text(self, content: str) -> str:
         """Clean text from MongoDB content"""
-        content = re.sub(r'\s+', ' ', content)
-        content = re.sub(r'[^\w\s.,;:!?()-]', '', content)
-        content = re.sub(r'([.!?])\s*', r'\1 ', content)
-        return content.strip()
-    
-    def chunk_text(self, text: str, title: str, url: str, chunk_size: int = 800) -> List[Dict]:
-        """Smart chunking with sentence boundaries"""
-        sentences = text.split('. ')
-        chunks = []
-        current_chunk = ""
-        chunk_index = 0
-        
-        for sentence in sentences:
-            if len(current_chunk + sentence) <= chunk_size:
-                current_chunk += sentence + ". "
-            else:
-                if current_chunk.strip():
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'title': title,
-                        'url': url,
-                        'chunk_index': chunk_index,
-                        'source_type': 'wikipedia'
-                    })
-                    chunk_index += 1
-                current_chunk = sentence + ". "
-        
-        if current_chunk.strip():
-            chunks.append({
-                'text': current_chunk.strip(),
-                'title': title,
-                'url': url,
-                'chunk_index': chunk_index,
-                'source_type': 'wikipedia'
-            })
-        
-        return chunks
+        return clean_text(content)
+    
+    def chunk_text(self, text: str, title: str, url: str) -> List[Dict]:
+        """Token-budgeted chunking on sentence boundaries (CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS)"""
+        return list(self.chunker.chunk(text, title, url))
     
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for text chunks"""
-        response = self.openai_client.embeddings.create(
-            input=texts,
-            model="text-embedding-3-small"
-        )
-        return [data.embedding for data in response.data]
+        """Create embeddings for text chunks, reusing cached vectors for unchanged text"""
+        return self.embedder.embed(texts)
     
     def setup_qdrant_collection(self):
-        """Initialize Qdrant collection on cloud"""
-        if not self.qdrant_client.collection_exists(self.qdrant_collection):
-            self.qdrant_client.create_collection(
-                collection_name=self.qdrant_collection,
-                vectors_config=VectorParams(size=1536, distance=Distance.COSINE)
-            )
-            logger.info(f"✓ Created Qdrant collection: {self.qdrant_collection}")
-        else:
-            logger.info(f"✓ Connected to existing Qdrant collection: {self.qdrant_collection}")
-    
-    def store_in_qdrant(self, chunks: List[Dict], embeddings: List[List[float]]):
-        """Store chunks with embeddings in Qdrant"""
-        points = []
-        for chunk, embedding in zip(chunks, embeddings):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    'text': chunk['text'],
-                    'title': chunk['title'],
-                    'url': chunk['url'],
-                    'chunk_index': chunk['chunk_index'],
-                    'source_type': chunk['source_type']
-                }
+        """Create the collection, or bring an existing one in line with the vector settings.
+
+        Quantization and on-disk storage of the originals are changed in
+        place. A different EMBEDDING_DIMENSIONS needs new vectors, so the
+        collection is recreated and its index state cleared; the run then
+        re-embeds every document.
+        """
+        size = vector_size()
+        if self.qdrant_client.collection_exists(self.qdrant_collection):
+            info = self.qdrant_client.get_collection(self.qdrant_collection)
+            params = info.config.params.vectors
+            if params.size == size:
+                self.update_vector_storage(info)
+                logger.info(f"✓ Connected to existing Qdrant collection: {self.qdrant_collection}")
+                return
+            logger.warning(
+                f"Qdrant collection {self.qdrant_collection} holds {params.size}-dim vectors, "
+                f"EMBEDDING_DIMENSIONS needs {size}: rebuilding it"
             )
-            points.append(point)
+            self.qdrant_client.delete_collection(self.qdrant_collection)
+            self.index_state.delete_many({})
+            self.chunk_sources.delete_many({})
         
-        self.qdrant_client.upsert(
+        self.qdrant_client.create_collection(
             collection_name=self.qdrant_collection,
-            points=points
+            vectors_config=vectors_config(size),
+            quantization_config=quantization_config()
+        )
+        logger.info(
+            f"✓ Created Qdrant collection: {self.qdrant_collection} "
+            f"({size} dims, {quantization_mode()} quantization)"
         )
+    
+    def update_vector_storage(self, info):
+        """Apply VECTOR_QUANTIZATION and VECTOR_ON_DISK to an existing collection"""
+        quantization = quantization_config()
+        on_disk = originals_on_disk()
+        if info.config.quantization_config == quantization and bool(info.config.params.vectors.on_disk) == on_disk:
+            return
+        self.qdrant_client.update_collection(
+            collection_name=self.qdrant_collection,
+            vectors_config={'': VectorParamsDiff(on_disk=on_disk)},
+            quantization_config=quantization or Disabled.DISABLED
+        )
+        logger.info(f"✓ Vector storage updated: {quantization_mode()} quantization, originals on disk: {on_disk}")
+    
+    def build_point(self, chunk: Dict, embedding: List[float]) -> PointStruct:
+        return PointStruct(
+            id=chunk_point_id(chunk['url'], chunk['chunk_index'], chunk['text']),
+            vector=embedding,
+            payload={
+                'text': chunk['text'],
+                'title': chunk['title'],
+                'url': chunk['url'],
+                'chunk_index': chunk['chunk_index'],
+                'source_type': chunk['source_type'],
+                'doc_hash': chunk.get('doc_hash'),
+                # Every page the chunk was found on; merged duplicates add theirs
+                'urls': [chunk['url']],
+                'titles': [chunk['title']]
+            }
+        )
+    
+    def store_in_qdrant(self, chunks: List[Dict], embeddings: List[List[float]]) -> List[str]:
+        """Store chunks with embeddings in Qdrant, returning their point IDs"""
+        points = [self.build_point(chunk, embedding) for chunk, embedding in zip(chunks, embeddings)]
+        
+        if points:
+            self.qdrant_client.upsert(
+                collection_name=self.qdrant_collection,
+                points=points
+            )
         logger.info(f"✓ Stored {len(points)} chunks in Qdrant")
+        return [point.id for point in points]
     
-    def process_mongodb_to_qdrant(self):
-        """Complete pipeline: MongoDB → Clean → Chunk → Embed → Qdrant"""
-        self.setup_qdrant_collection()
+    def delete_points(self, point_ids: List[str]) -> int:
+        if point_ids:
+            self.qdrant_client.delete(
+                collection_name=self.qdrant_collection,
+                points_selector=PointIdsList(points=point_ids)
+            )
+        return len(point_ids)
+    
+    def purge_legacy_points(self):
+        """Remove points written before deterministic IDs (they carry no doc_hash)"""
+        self.qdrant_client.delete(
+            collection_name=self.qdrant_collection,
+            points_selector=FilterSelector(filter=Filter(
+                must=[IsEmptyCondition(is_empty=PayloadField(key='doc_hash'))]
+            ))
+        )
+        logger.info("✓ Purged legacy points without a content hash")
+    
+    def export_local_index(self, path: str = None):
+        """Snapshot the collection for the in-process search backend"""
+        path = path or os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+        backend = LocalVectorBackend.from_qdrant(
+            self.qdrant_client, self.qdrant_collection,
+            dtype=os.getenv('VECTOR_INDEX_DTYPE', 'float32')
+        )
+        backend.save(path)
+    
+    def scan_documents(self, force: bool, after_id=None) -> Iterator[Dict]:
+        """Stage 1: walk newton_content in _id order with a projected, batched cursor.
+
+        Only URL, title and stored hash are read for every document; content is
+        fetched for the batch's changed documents alone. Yields one item per
+        batch: the changed documents, the number unchanged and the batch's last
+        _id (the resume checkpoint).
+        """
+        query = {'_id': {'$gt': after_id}} if after_id is not None else {}
+        cursor = self.collection.find(query, {'url': 1, 'title': 1, 'content_hash': 1}) \
+            .sort('_id', 1).batch_size(self.scan_batch_size)
         
-        total_chunks = 0
-        for doc in self.collection.find({}):
-            logger.info(f"Processing: {doc['title']}")
+        for batch in batched(cursor, self.scan_batch_size):
+            urls = [doc['url'] for doc in batch]
+            state = {
+                entry['url']: entry
+                for entry in self.index_state.find({'url': {'$in': urls}}, {'url': 1, 'content_hash': 1, 'chunker': 1, 'point_ids': 1})
+            }
+            signature = self.index_signature()
             
-            # Clean text
-            cleaned_text = self.clean_text(doc['content'])
+            # Documents stored without a hash have to be read to be hashed
+            pending = [
+                doc for doc in batch
+                if force or not doc.get('content_hash')
+                or state.get(doc['url'], {}).get('content_hash') != doc['content_hash']
+                or state.get(doc['url'], {}).get('chunker') != signature
+            ]
+            contents = {
+                doc['_id']: doc['content']
+                for doc in self.collection.find({'_id': {'$in': [doc['_id'] for doc in pending]}}, {'content': 1})
+            } if pending else {}
             
-            # Chunk text
-            chunks = self.chunk_text(cleaned_text, doc['title'], doc['url'])
+            changed = []
+            for doc in pending:
+                doc['content'] = contents.get(doc['_id'], '')
+                # SimpleStorage already stores the same sha256 content hash
+                doc['doc_hash'] = doc.get('content_hash') or content_hash(doc['content'])
+                previous = state.get(doc['url'], {})
+                if not force and previous.get('content_hash') == doc['doc_hash'] and previous.get('chunker') == signature:
+                    continue
+                doc['previous_ids'] = previous.get('point_ids', [])
+                changed.append(doc)
             
-            # Create embeddings
-            embeddings = self.create_embeddings([chunk['text'] for chunk in chunks])
+            yield {'docs': changed, 'unchanged': len(batch) - len(changed), 'last_id': batch[-1]['_id']}
+    
+    def deduplicate_chunks(self, doc: Dict, chunks: List[Dict]) -> List[Dict]:
+        """Drop chunks that near-duplicate a stored or pending chunk, attributing the document to it instead.
+
+        Returns the chunks still to embed. doc['shared'] maps each matched
+        point to the chunk it replaced, which is embedded after all if the
+        match is gone by the time the document is finished.
+        doc['minhashes'] holds the new chunks' signatures.
+        """
+        doc['chunk_count'] = len(chunks)
+        doc['shared'], doc['minhashes'] = {}, {}
+        index = self.near_duplicates
+        if index is None:
+            return chunks
+        
+        unique = []
+        for chunk in chunks:
+            signature = self.minhasher.signature(chunk['text'])
+            match = index.find(signature, doc['url'])
+            if match is not None:
+                doc['shared'].setdefault(match, chunk)
+                continue
+            point_id = chunk_point_id(chunk['url'], chunk['chunk_index'], chunk['text'])
+            index.add_pending(point_id, signature, doc['url'])
+            doc['minhashes'][point_id] = signature
+            unique.append(chunk)
+        return unique
+    
+    def chunk_documents(self, batches: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 2: clean, chunk and drop near duplicates; document content is dropped once chunked"""
+        for batch in batches:
+            for doc in batch['docs']:
+                logger.info(f"Processing: {doc['title']}")
+                chunks = self.chunk_text(self.clean_text(doc.pop('content')), doc['title'], doc['url'])
+                for chunk in chunks:
+                    chunk['doc_hash'] = doc['doc_hash']
+                yield {'doc': doc, 'chunks': self.deduplicate_chunks(doc, chunks)}
+            yield {'checkpoint': batch['last_id'], 'unchanged': batch['unchanged']}
+    
+    def group_documents(self, items: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 3: gather whole documents into token-bounded embedding groups.
+
+        Checkpoints travel with the group that follows their batch's last
+        document, so they are committed only once those documents are stored.
+        """
+        group = {'docs': [], 'chunks': [], 'tokens': 0, 'checkpoints': []}
+        for item in items:
+            if 'checkpoint' in item:
+                group['checkpoints'].append(item)
+                if not group['docs']:
+                    yield group
+                    group = {'docs': [], 'chunks': [], 'tokens': 0, 'checkpoints': []}
+                continue
+            group['docs'].append(item['doc'])
+            group['chunks'].extend(item['chunks'])
+            group['tokens'] += sum(chunk['token_count'] for chunk in item['chunks'])
+            if group['tokens'] >= self.group_max_tokens:
+                yield group
+                group = {'docs': [], 'chunks': [], 'tokens': 0, 'checkpoints': []}
+        if group['docs'] or group['checkpoints']:
+            yield group
+    
+    def embed_groups(self, groups: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 4: embed each group's chunks with packed, parallel requests"""
+        for group in groups:
+            chunks = group.pop('chunks')
+            points = [None] * len(chunks)
+            for indices, embeddings in self.batch_embedder.embed(
+                [chunk['text'] for chunk in chunks], token_counts=[chunk['token_count'] for chunk in chunks]
+            ):
+                for i, embedding in zip(indices, embeddings):
+                    points[i] = self.build_point(chunks[i], embedding)
+            group['points'] = points
+            yield group
+    
+    def store_orphaned_duplicates(self, doc: Dict, own_ids: List[str]) -> List[str]:
+        """Embed the chunks whose match was deleted before this document finished.
+
+        A page earlier in the stream can release the last source of a chunk
+        a later page merged into; that later page then needs its own copy.
+        """
+        shared = [point_id for point_id in doc['shared'] if point_id not in own_ids]
+        if not shared:
+            return []
+        existing = {entry['_id'] for entry in self.chunk_sources.find({'_id': {'$in': shared}}, {'_id': 1})}
+        chunks = [doc['shared'].pop(point_id) for point_id in shared if point_id not in existing]
+        if not chunks:
+            return []
+        embeddings = self.create_embeddings([chunk['text'] for chunk in chunks])
+        point_ids = self.store_in_qdrant(chunks, embeddings)
+        for chunk, point_id in zip(chunks, point_ids):
+            doc['minhashes'][point_id] = self.minhasher.signature(chunk['text'])
+        return point_ids
+    
+    def attribute_chunks(self, doc: Dict, own_ids: List[str]):
+        """Record the document as a source of its new chunks and of the stored chunks it duplicated.
+
+        New chunks also store their signature and LSH band keys, which later
+        near-duplicate lookups query through the 'bands' index.
+        """
+        source = {'url': doc['url'], 'title': doc['title']}
+        operations = []
+        for point_id in own_ids:
+            update = {'$addToSet': {'sources': source}}
+            signature = doc['minhashes'].get(point_id)
+            if signature is not None and self.near_duplicates is not None:
+                update['$set'] = {'minhash': signature.tobytes(), 'bands': self.near_duplicates.band_keys(signature)}
+            operations.append(UpdateOne({'_id': point_id}, update, upsert=True))
+        operations += [UpdateOne({'_id': point_id}, {'$addToSet': {'sources': source}}) for point_id in doc['shared']]
+        if operations:
+            self.chunk_sources.bulk_write(operations, ordered=False)
+    
+    def release_points(self, url: str, point_ids: List[str]) -> Tuple[int, List[str]]:
+        """Detach a page from chunks it no longer contains; chunks left without a source are deleted.
+
+        Returns the number of points deleted and the IDs still attributed to
+        other pages. Points without a chunk_sources entry predate dedup and
+        belonged to this page alone.
+        """
+        if not point_ids:
+            return 0, []
+        self.chunk_sources.update_many({'_id': {'$in': point_ids}}, {'$pull': {'sources': {'url': url}}})
+        remaining = {
+            entry['_id'] for entry in self.chunk_sources.find(
+                {'_id': {'$in': point_ids}, 'sources.0': {'$exists': True}}, {'_id': 1}
+            )
+        }
+        orphaned = [point_id for point_id in point_ids if point_id not in remaining]
+        if orphaned:
+            self.chunk_sources.delete_many({'_id': {'$in': orphaned}})
+        return self.delete_points(orphaned), sorted(remaining)
+    
+    def sync_point_sources(self, point_ids: Iterable[str]):
+        """Rewrite the attribution payload of points whose sources changed.
+
+        url/title name the first remaining source, so a merged chunk never
+        cites a page that has since been removed.
+        """
+        point_ids = list(point_ids)
+        operations = []
+        for batch in batched(point_ids, self.scan_batch_size):
+            for entry in self.chunk_sources.find({'_id': {'$in': batch}}, {'sources': 1}):
+                sources = entry.get('sources', [])
+                if not sources:
+                    continue
+                operations.append(SetPayloadOperation(set_payload=SetPayload(
+                    payload={
+                        'url': sources[0]['url'], 'title': sources[0]['title'],
+                        'urls': [s['url'] for s in sources], 'titles': [s['title'] for s in sources]
+                    },
+                    points=[entry['_id']]
+                )))
+        for batch in batched(operations, self.scan_batch_size):
+            self.qdrant_client.batch_update_points(collection_name=self.qdrant_collection, update_operations=batch)
+    
+    def finish_documents(self, docs: List[Dict], points: List[PointStruct]) -> int:
+        """Record chunk attribution, drop each document's stale points and record its new state.
+
+        Called only after the document's points are written, so the state
+        entry doubles as a per-document checkpoint.
+        """
+        point_ids = {}
+        for point in points:
+            point_ids.setdefault(point.payload['url'], []).append(point.id)
+        
+        deleted = 0
+        touched = set()
+        for doc in docs:
+            own_ids = point_ids.get(doc['url'], [])
+            own_ids = own_ids + self.store_orphaned_duplicates(doc, own_ids)
+            ids = list(dict.fromkeys(own_ids + list(doc['shared'])))
+            self.attribute_chunks(doc, own_ids)
+            if self.near_duplicates is not None:
+                self.near_duplicates.stored(own_ids)
+            doc['chunks_deduplicated'] = doc['chunk_count'] - len(own_ids)
+            touched.update(doc['shared'])
+            released, remaining = self.release_points(doc['url'], sorted(set(doc['previous_ids']) - set(ids)))
+            deleted += released
+            touched.update(remaining)
+            self.index_state.update_one(
+                {'url': doc['url']},
+                {'$set': {
+                    'url': doc['url'],
+                    'title': doc['title'],
+                    'content_hash': doc['doc_hash'],
+                    'chunker': self.index_signature(),
+                    'point_ids': ids,
+                    'indexed_at': datetime.now(timezone.utc)
+                }},
+                upsert=True
+            )
+        self.sync_point_sources(touched)
+        return deleted
+    
+    def remove_deleted_documents(self) -> Tuple[int, int]:
+        """Release points of documents that are gone from Mongo, a batch of URLs at a time"""
+        removed = deleted = 0
+        touched = set()
+        cursor = self.index_state.find({}, {'url': 1, 'point_ids': 1}).batch_size(self.scan_batch_size)
+        for batch in batched(cursor, self.scan_batch_size):
+            urls = [entry['url'] for entry in batch]
+            present = {doc['url'] for doc in self.collection.find({'url': {'$in': urls}}, {'url': 1})}
+            for entry in batch:
+                if entry['url'] not in present:
+                    released, remaining = self.release_points(entry['url'], entry.get('point_ids', []))
+                    deleted += released
+                    touched.update(remaining)
+                    self.index_state.delete_one({'url': entry['url']})
+                    removed += 1
+        self.sync_point_sources(touched)
+        return removed, deleted
+    
+    def export_lexical_index(self, path: str = None):
+        """Rebuild the BM25 index over the stored chunks, next to the local vector index"""
+        path = path or os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+        BM25Index.from_qdrant(self.qdrant_client, self.qdrant_collection).save(path)
+    
+    def process_mongodb_to_qdrant(self, force: bool = False) -> Dict:
+        """Complete pipeline: MongoDB → Clean → Chunk → Embed → Qdrant
+
+        The stages run concurrently in a StagedStream connected by bounded
+        queues, so memory stays flat regardless of corpus size. Incremental:
+        documents whose content hash and chunking settings match the last run
+        are skipped, and points for chunks or documents that disappeared are
+        deleted. Chunks that near-duplicate one already stored are not embedded;
+        the stored chunk is attributed to every page containing it
+        (newton_chunk_sources) and the run reports the dedup ratio.
+        force=True re-indexes everything. Progress is checkpointed in
+        newton_index_runs; an interrupted run resumes after the last batch
+        whose documents were all stored.
+        """
+        self.setup_qdrant_collection()
+        
+        if self.index_state.find_one({}, {'_id': 1}) is None:
+            self.purge_legacy_points()
+        
+        run = self.index_runs.find_one({'_id': INDEX_RUN_ID}) or {}
+        resume = run.get('status') == 'running' and run.get('force') == force \
+            and run.get('chunker') == self.index_signature()
+        after_id = run.get('last_id') if resume else None
+        if after_id is not None:
+            logger.info(f"↻ Resuming interrupted indexing run after document {after_id}")
+        self.index_runs.update_one(
+            {'_id': INDEX_RUN_ID},
+            {'$set': {
+                'status': 'running', 'force': force, 'chunker': self.index_signature(), 'last_id': after_id,
+                'started_at': run.get('started_at') if resume else datetime.now(timezone.utc)
+            }, '$unset': {'finished_at': '', 'stats': ''}},
+            upsert=True
+        )
+        
+        stats = {
+            'documents_unchanged': 0, 'documents_reindexed': 0, 'documents_removed': 0,
+            'chunks_stored': 0, 'points_deleted': 0, 'chunks_total': 0, 'chunks_deduplicated': 0
+        }
+        self.near_duplicates = StoredNearDuplicates(
+            self.chunk_sources, self.dedup_threshold, self.minhasher.num_perm
+        ) if self.dedup_enabled else None
+        stream = StagedStream(
+            self.scan_documents(force, after_id),
+            [self.chunk_documents, self.group_documents, self.embed_groups],
+            maxsize=self.queue_size
+        )
+        upserter = BulkUpserter(self.qdrant_client, self.qdrant_collection)
+        try:
+            for group in stream:
+                # Upserts of this group overlap with embedding the next one
+                upserter.add(group['points'])
+                upserter.flush()
+                stats['points_deleted'] += self.finish_documents(group['docs'], group['points'])
+                stats['documents_reindexed'] += len(group['docs'])
+                stats['chunks_stored'] += len(group['points'])
+                for doc in group['docs']:
+                    stats['chunks_total'] += doc['chunk_count']
+                    stats['chunks_deduplicated'] += doc['chunks_deduplicated']
+                for checkpoint in group['checkpoints']:
+                    stats['documents_unchanged'] += checkpoint['unchanged']
+                    self.index_runs.update_one(
+                        {'_id': INDEX_RUN_ID}, {'$set': {'last_id': checkpoint['checkpoint']}}
+                    )
+        finally:
+            upserter.close()
+            self.near_duplicates = None
+        stats['dedup_ratio'] = round(stats['chunks_deduplicated'] / stats['chunks_total'], 4) if stats['chunks_total'] else 0.0
+        
+        # Documents that are gone from Mongo take their points with them
+        stats['documents_removed'], deleted = self.remove_deleted_documents()
+        stats['points_deleted'] += deleted
+        self.index_runs.update_one(
+            {'_id': INDEX_RUN_ID},
+            {'$set': {'status': 'complete', 'finished_at': datetime.now(timezone.utc), 'stats': stats}}
+        )
+        
+        index_changed = stats['documents_reindexed'] or stats['documents_removed']
+        if index_changed:
+            if os.getenv('VECTOR_BACKEND', 'qdrant').lower() == 'local':
+                self.export_local_index()
+            if os.getenv('RETRIEVAL_MODE', 'dense').lower() != 'dense' or BM25Index.exists(
+                os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+            ):
+                self.export_lexical_index()
             
-            # Store in Qdrant
-            self.store_in_qdrant(chunks, embeddings)
-            total_chunks += len(chunks)
+            # API workers drop cached answers and reload the snapshots they
+            # use when they see the new generation
+            stats['index_generation'] = IndexGeneration(self.index_runs, poll_seconds=0).bump()
         
-        logger.info(f"✅ Pipeline complete - {total_chunks} chunks ready in Qdrant!")
\ No newline at end of file
+        logger.info(
+            f"✅ Pipeline complete - {stats['documents_reindexed']} documents re-indexed, "
+            f"{stats['documents_unchanged']} unchanged, {stats['documents_removed']} removed, "
+            f"{stats['chunks_stored']} chunks stored, {stats['chunks_deduplicated']} near duplicates merged "
+            f"({stats['dedup_ratio']:.1%}), {stats['points_deleted']} stale points deleted"
+        )
+        return stats
@@ -0,0 +1,290 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from .vector_config import embedding_dimensions
+import numpy as np
+import threading
+import hashlib
+import logging
+import asyncio
+import sqlite3
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "text-embedding-3-small"
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'embedding_cache.sqlite')
+)
+
+def embedding_key(text: str, model: str = DEFAULT_MODEL, dimensions: Optional[int] = None) -> str:
+    """Content address of an embedding: hash(model, dimensions, text)"""
+    return hashlib.sha256(f"{model}\x00{dimensions or ''}\x00{text}".encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """Two-tier embedding store: an in-memory LRU over a SQLite file.
+
+    Vectors are stored as float32 blobs, so entries survive restarts and are
+    shared by every process pointed at the same file. The file holds at most
+    `max_disk_rows` embeddings: rows carry the time they were last written or
+    read from disk, and once the limit is passed the least recently used
+    tenth is deleted. Read times are buffered and written `touch_batch` at a
+    time, or with the next write. If another process has the file locked,
+    lookups fall back to misses and writes are skipped.
+    """
+    
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_memory_entries: int = 10000,
+                 max_disk_rows: int = 500000, touch_batch: int = 256):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_rows = max_disk_rows
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        # Disk reads update last_used in batches instead of committing on every lookup
+        self.touched = {}
+        self.touch_batch = touch_batch
+        
+        self.db = None
+        self.disk_rows = 0
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL DEFAULT 0)"
+            )
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(embeddings)")]
+            if 'last_used' not in columns:
+                # Files written before pruning existed; their rows count as least recently used
+                self.db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self.db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self.db.commit()
+            self.disk_rows = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logger.info(f"✓ Embedding cache at {path} ({self.disk_rows} embeddings)")
+    
+    @property
+    def on_disk(self) -> bool:
+        return self.db is not None
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Look up many keys at once; missing keys are simply absent from the result"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            
+            pending = [key for key in keys if key not in found]
+            if pending and self.db is not None:
+                try:
+                    # Stay well below SQLite's bound-parameter limit
+                    for start in range(0, len(pending), 500):
+                        batch = pending[start:start + 500]
+                        rows = self.db.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                            batch
+                        ).fetchall()
+                        for key, blob in rows:
+                            vector = np.frombuffer(blob, dtype=np.float32)
+                            found[key] = vector
+                            self._remember(key, vector)
+                            self.touched[key] = time.time()
+                except sqlite3.OperationalError as e:
+                    # Another process holds the file; whatever was not read yet counts as a miss
+                    logger.warning(f"Embedding cache read failed: {e}")
+                if len(self.touched) >= self.touch_batch:
+                    self._flush_touches()
+            
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        
+        return {key: vector.tolist() for key, vector in found.items()}
+    
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        vectors = {key: np.asarray(vector, dtype=np.float32) for key, vector in items.items()}
+        with self.lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self.db is None:
+                return
+            try:
+                existing = self._stored_keys(list(vectors))
+                now = time.time()
+                self._write_touches()
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in vectors.items()]
+                )
+                self.db.commit()
+            except sqlite3.OperationalError as e:
+                # The vectors stay in memory; the next process to embed them writes them instead
+                self.db.rollback()
+                logger.warning(f"Embedding cache write skipped: {e}")
+                return
+            self.touched.clear()
+            self.disk_rows += len(vectors) - len(existing)
+            if self.disk_rows > self.max_disk_rows:
+                self._prune()
+    
+    def _stored_keys(self, keys: List[str]) -> set:
+        stored = set()
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            stored.update(key for (key,) in self.db.execute(
+                f"SELECT key FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ))
+        return stored
+    
+    def _write_touches(self):
+        if self.touched:
+            self.db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self.touched.items()]
+            )
+    
+    def _flush_touches(self):
+        """Record deferred disk reads in last_used with a single commit"""
+        try:
+            self._write_touches()
+            self.db.commit()
+        except sqlite3.OperationalError as e:
+            # Recency is advisory; losing a batch only makes pruning slightly less exact
+            self.db.rollback()
+            logger.warning(f"Embedding cache recency update skipped: {e}")
+        self.touched.clear()
+    
+    def _prune(self):
+        """Delete the least recently used rows down to 90% of max_disk_rows"""
+        try:
+            self._flush_touches()
+            # Other processes write to the same file, so count again before deleting
+            self.disk_rows = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if self.disk_rows <= self.max_disk_rows:
+                return
+            excess = self.disk_rows - int(self.max_disk_rows * 0.9)
+            self.db.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.db.commit()
+        except sqlite3.OperationalError as e:
+            # Try again after the next write
+            self.db.rollback()
+            logger.warning(f"Embedding cache prune skipped: {e}")
+            return
+        self.disk_rows -= excess
+        self.pruned += excess
+        logger.info(f"✓ Pruned {excess} least recently used embeddings from the disk cache")
+    
+    def _remember(self, key: str, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'disk_rows': self.disk_rows,
+            'pruned': self.pruned
+        }
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache instance, configured by EMBEDDING_CACHE_* settings"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                path = os.getenv('EMBEDDING_CACHE_PATH', DEFAULT_CACHE_PATH)
+                if os.getenv('EMBEDDING_CACHE_DISK', 'on').lower() in ('off', 'false', '0'):
+                    path = None
+                _shared_cache = EmbeddingCache(
+                    path=path,
+                    max_memory_entries=int(os.getenv('EMBEDDING_CACHE_MEMORY_ENTRIES', '10000')),
+                    max_disk_rows=int(os.getenv('EMBEDDING_CACHE_MAX_ROWS', '500000'))
+                )
+    return _shared_cache
+
+class CachedEmbedder:
+    """Embeds texts through the shared cache, sending only misses to OpenAI"""
+    
+    def __init__(self, client, model: str = DEFAULT_MODEL, dimensions: Optional[int] = None,
+                 cache: Optional[EmbeddingCache] = None):
+        self.client = client
+        self.model = model
+        # Queries and stored chunks must share one size, so the default follows EMBEDDING_DIMENSIONS
+        self.dimensions = dimensions if dimensions is not None else embedding_dimensions()
+        self.cache = cache or get_embedding_cache()
+    
+    def request_kwargs(self, texts: List[str]) -> Dict:
+        kwargs = {'input': texts, 'model': self.model}
+        if self.dimensions:
+            kwargs['dimensions'] = self.dimensions
+        return kwargs
+    
+    def _split(self, texts: List[str]):
+        keys = [embedding_key(text, self.model, self.dimensions) for text in texts]
+        cached = self.cache.get_many(keys)
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in cached))
+        return keys, cached, missing
+    
+    def _merge(self, keys: List[str], cached: Dict, missing: List[str], vectors: List[List[float]]):
+        fresh = {
+            embedding_key(text, self.model, self.dimensions): vector
+            for text, vector in zip(missing, vectors)
+        }
+        self.cache.put_many(fresh)
+        cached.update(fresh)
+        return [cached[key] for key in keys]
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys, cached, missing = self._split(texts)
+        vectors = []
+        if missing:
+            response = self.client.embeddings.create(**self.request_kwargs(missing))
+            vectors = [data.embedding for data in response.data]
+        return self._merge(keys, cached, missing, vectors)
+    
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+class AsyncCachedEmbedder(CachedEmbedder):
+    """Same as CachedEmbedder, for an AsyncOpenAI client.
+
+    With the SQLite tier enabled, cache reads and writes run in a thread so
+    disk I/O and commits never block the event loop.
+    """
+    
+    async def call_cache(self, method, *args):
+        if self.cache.on_disk:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys, cached, missing = await self.call_cache(self._split, texts)
+        vectors = []
+        if missing:
+            response = await self.client.embeddings.create(**self.request_kwargs(missing))
+            vectors = [data.embedding for data in response.data]
+        return await self.call_cache(self._merge, keys, cached, missing, vectors)
+    
+    async def embed_one(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from .evaluator import RAGEvaluator
+from .metrics import EVALUATIONS, record_dependency_error
+import threading
+import logging
+import random
+import time
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+class EvaluationQueue:
+    """Runs RAGEvaluator after the answer has been returned and stores the metrics in MongoDB.
+
+    submit() only samples and enqueues, so it adds nothing noticeable to a
+    request. A small worker pool evaluates in the background and writes one
+    document per evaluation to newton_evaluations: 'running' when it starts,
+    then 'completed' with the metrics or 'failed'. Only EVAL_SAMPLE_PERCENT
+    of submissions are evaluated, and at most EVAL_QUEUE_MAX_PENDING wait at
+    once; beyond that new ones are dropped rather than piling up in memory.
+    """
+
+    def __init__(self, evaluator: RAGEvaluator, collection=None, workers: Optional[int] = None,
+                 sample_percent: Optional[float] = None, max_pending: Optional[int] = None):
+        self.evaluator = evaluator
+        if collection is None:
+            from .clients import get_mongo_client
+            collection = get_mongo_client()[os.getenv('MONGO_DB_NAME', 'newton_ai')]['newton_evaluations']
+        self.collection = collection
+        self.sample_percent = (sample_percent if sample_percent is not None
+                               else float(os.getenv('EVAL_SAMPLE_PERCENT', '100')))
+        self.max_pending = max_pending or int(os.getenv('EVAL_QUEUE_MAX_PENDING', '1000'))
+        workers = workers or int(os.getenv('EVAL_QUEUE_WORKERS', '2'))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eval-queue")
+        # Submitted but not yet started; these have no document yet
+        self.queued = set()
+        self.lock = threading.Lock()
+        logger.info(f"✓ Background evaluation: {workers} workers, {self.sample_percent:g}% sampled")
+
+    def sampled(self) -> bool:
+        return random.random() * 100 < self.sample_percent
+
+    def submit(self, question: str, answer: str, docs: List[Dict],
+               query_embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Queue an evaluation; returns its ID, or None if it was sampled out or dropped"""
+        if not self.sampled():
+            EVALUATIONS.labels(outcome='sampled_out').inc()
+            return None
+        with self.lock:
+            if len(self.queued) >= self.max_pending:
+                EVALUATIONS.labels(outcome='dropped').inc()
+                logger.warning(f"Evaluation queue full ({self.max_pending} pending), skipping evaluation")
+                return None
+            evaluation_id = uuid.uuid4().hex
+            self.queued.add(evaluation_id)
+        EVALUATIONS.labels(outcome='queued').inc()
+        self.executor.submit(self.run, evaluation_id, question, answer, docs, query_embedding)
+        return evaluation_id
+
+    def run(self, evaluation_id: str, question: str, answer: str, docs: List[Dict],
+            query_embedding: Optional[List[float]]):
+        try:
+            self.collection.insert_one({
+                '_id': evaluation_id,
+                'status': 'running',
+                'question': question,
+                'answer': answer,
+                'sources': [doc['title'] for doc in docs],
+                'created_at': datetime.now(timezone.utc)
+            })
+        except Exception as e:
+            record_dependency_error('mongo')
+            logger.error(f"Could not record evaluation {evaluation_id}: {e}")
+            return
+        finally:
+            with self.lock:
+                self.queued.discard(evaluation_id)
+
+        start = time.perf_counter()
+        try:
+            evaluation = self.evaluator.evaluate(question, answer, docs, query_embedding=query_embedding)
+            update = {'status': 'completed', 'evaluation': evaluation}
+            EVALUATIONS.labels(outcome='completed').inc()
+        except Exception as e:
+            logger.error(f"Evaluation {evaluation_id} failed: {e}")
+            update = {'status': 'failed', 'error': str(e)}
+            EVALUATIONS.labels(outcome='failed').inc()
+        update.update(
+            completed_at=datetime.now(timezone.utc),
+            evaluation_ms=round((time.perf_counter() - start) * 1000, 1)
+        )
+        try:
+            self.collection.update_one({'_id': evaluation_id}, {'$set': update})
+        except Exception as e:
+            record_dependency_error('mongo')
+            logger.error(f"Could not store evaluation {evaluation_id}: {e}")
+
+    def get(self, evaluation_id: str) -> Optional[Dict]:
+        """The stored evaluation, {'status': 'queued'} if it hasn't started, or None if unknown"""
+        with self.lock:
+            if evaluation_id in self.queued:
+                return {'evaluation_id': evaluation_id, 'status': 'queued'}
+        doc = self.collection.find_one({'_id': evaluation_id})
+        if doc is None:
+            return None
+        return {'evaluation_id': doc.pop('_id'), **doc}
+
+    def close(self):
+        """Finish the evaluations already running and drop the ones still queued"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -1,43 +1,89 @@
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from typing import Dict, List
-from rouge_score import rouge_scorer
+from typing import Dict, List, Optional
+from .embedding_cache import CachedEmbedder
+from .clients import get_openai_client
+from .metrics import StageTimer, record_dependency_error
+import asyncio
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
 class RAGEvaluator:
-    def __init__(self):
-        self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.rouge_scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=True)
+    def __init__(self, openai_client=None):
+        self.openai_client = openai_client or get_openai_client()
+        self.embedder = CachedEmbedder(self.openai_client)
+        # Grounding judge runs here while the caller does the embedding math
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('EVAL_MAX_WORKERS', '4')), thread_name_prefix="eval"
+        )
     
     def get_embedding(self, text: str) -> List[float]:
-        response = self.openai_client.embeddings.create(
-            input=text, model="text-embedding-3-small"
-        )
-        return response.data[0].embedding
+        return self.get_embeddings([text])[0]
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in at most one API call; cached texts cost nothing"""
+        return self.embedder.embed(texts)
     
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         vec1, vec2 = np.array(vec1), np.array(vec2)
         return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
     
-    def evaluate_retrieval_relevance(self, query: str, retrieved_docs: List[Dict]) -> Dict:
-        """Evaluate how well retrieved documents match the query"""
-        query_emb = self.get_embedding(query)
-        similarities = [
-            self.cosine_similarity(query_emb, self.get_embedding(doc['text'])) 
-            for doc in retrieved_docs
-        ]
+    def cosine_similarities(self, query_vec: List[float], doc_vecs: List[List[float]]) -> np.ndarray:
+        """Cosine similarity of one vector against many in one matmul"""
+        if not doc_vecs:
+            return np.array([])
+        query = np.asarray(query_vec, dtype=np.float32)
+        docs = np.asarray(doc_vecs, dtype=np.float32)
+        return (docs @ query) / (np.linalg.norm(docs, axis=1) * np.linalg.norm(query))
+    
+    def resolve_vectors(self, query: str, query_embedding: Optional[List[float]],
+                        retrieved_docs: List[Dict], extra_texts: List[str] = ()):
+        """Reuse the query vector and stored chunk vectors, embedding only what is missing.
+
+        Returns (query_vector, doc_vectors, extra_vectors); everything that still
+        needs embedding goes out in one batched request.
+        """
+        pending = self.pending_texts(query, query_embedding, retrieved_docs, extra_texts)
+        embedded = self.get_embeddings(pending)
+        if pending:
+            logger.info(f"✓ Embedded {len(pending)} texts for evaluation in one call")
+        return self.assign_vectors(query_embedding, retrieved_docs, embedded)
+    
+    def pending_texts(self, query: str, query_embedding: Optional[List[float]],
+                      retrieved_docs: List[Dict], extra_texts: List[str] = ()) -> List[str]:
+        """Texts resolve_vectors still has to embed, in the order assign_vectors expects"""
+        pending = [query] if query_embedding is None else []
+        pending.extend(doc['text'] for doc in retrieved_docs if doc.get('vector') is None)
+        pending.extend(extra_texts)
+        return pending
+    
+    def assign_vectors(self, query_embedding: Optional[List[float]], retrieved_docs: List[Dict],
+                       embedded: List[List[float]]):
+        embedded = iter(embedded)
+        if query_embedding is None:
+            query_embedding = next(embedded)
+        doc_vectors = [next(embedded) if doc.get('vector') is None else doc['vector'] for doc in retrieved_docs]
+        extra_vectors = list(embedded)
+        return query_embedding, doc_vectors, extra_vectors
+    
+    def retrieval_metrics(self, query_vec: List[float], doc_vectors: List[List[float]]) -> Dict:
+        similarities = self.cosine_similarities(query_vec, doc_vectors)
         
         return {
-            'avg_retrieval_similarity': np.mean(similarities) if similarities else 0.0,
-            'max_retrieval_similarity': max(similarities) if similarities else 0.0,
-            'num_retrieved_docs': len(retrieved_docs)
+            'avg_retrieval_similarity': float(np.mean(similarities)) if len(similarities) else 0.0,
+            'max_retrieval_similarity': float(np.max(similarities)) if len(similarities) else 0.0,
+            'num_retrieved_docs': len(doc_vectors)
         }
     
-    def check_factual_grounding(self, answer: str, retrieved_docs: List[Dict]) -> float:
-        """Check if answer is grounded in retrieved documents"""
+    def evaluate_retrieval_relevance(self, query: str, retrieved_docs: List[Dict],
+                                     query_embedding: Optional[List[float]] = None) -> Dict:
+        """Evaluate how well retrieved documents match the query"""
+        query_vec, doc_vectors, _ = self.resolve_vectors(query, query_embedding, retrieved_docs)
+        return self.retrieval_metrics(query_vec, doc_vectors)
+    
+    def grounding_request(self, answer: str, retrieved_docs: List[Dict]) -> Dict:
         context = "\n".join([doc['text'] for doc in retrieved_docs])[:2000]
         
         prompt = f"""
@@ -53,29 +99,116 @@ class RAGEvaluator:
         
         Return only the numeric score:
         """
-        
+        return {
+            'model': "gpt-4o-mini",
+            'messages': [{"role": "user", "content": prompt}],
+            'temperature': 0.1,
+            'max_tokens': 10
+        }
+    
+    def check_factual_grounding(self, answer: str, retrieved_docs: List[Dict],
+                                timer: Optional[StageTimer] = None) -> float:
+        """Check if answer is grounded in retrieved documents"""
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=10
-            )
+            with (timer or StageTimer()).stage('evaluation.grounding'):
+                response = self.openai_client.chat.completions.create(
+                    **self.grounding_request(answer, retrieved_docs)
+                )
             return float(response.choices[0].message.content.strip())
         except Exception as e:
+            record_dependency_error('openai')
             logger.error(f"Grounding evaluation failed: {e}")
             return 0.5
     
-    def evaluate_answer_quality(self, query: str, answer: str, retrieved_docs: List[Dict]) -> Dict:
+    def evaluate_answer_quality(self, query: str, answer: str, retrieved_docs: List[Dict],
+                                query_embedding: Optional[List[float]] = None) -> Dict:
         """Evaluate overall answer quality"""
-        grounding_score = self.check_factual_grounding(answer, retrieved_docs)
+        grounding = self.executor.submit(self.check_factual_grounding, answer, retrieved_docs)
         
         # Answer relevance
-        query_emb = self.get_embedding(query)
-        answer_emb = self.get_embedding(answer)
-        relevance_score = self.cosine_similarity(query_emb, answer_emb)
+        if query_embedding is None:
+            query_embedding, answer_emb = self.get_embeddings([query, answer])
+        else:
+            answer_emb = self.get_embedding(answer)
+        relevance_score = float(self.cosine_similarity(query_embedding, answer_emb))
         
         return {
-            'grounding_score': grounding_score,
+            'grounding_score': grounding.result(),
             'answer_relevance': relevance_score
         }
+    
+    def evaluate(self, query: str, answer: str, retrieved_docs: List[Dict],
+                 query_embedding: Optional[List[float]] = None,
+                 timer: Optional[StageTimer] = None) -> Dict:
+        """Retrieval and answer metrics with at most one embedding call.
+
+        The grounding judge runs concurrently with the embedding request and
+        the similarity math. Sub-stages are recorded on `timer` when given.
+        """
+        timer = timer or StageTimer()
+        grounding = self.executor.submit(self.check_factual_grounding, answer, retrieved_docs, timer)
+        
+        with timer.stage('evaluation.embedding', dependency='openai'):
+            query_vec, doc_vectors, (answer_emb,) = self.resolve_vectors(
+                query, query_embedding, retrieved_docs, extra_texts=[answer]
+            )
+        return self.compile_metrics(query_vec, doc_vectors, answer_emb, grounding.result(), timer)
+    
+    def compile_metrics(self, query_vec: List[float], doc_vectors: List[List[float]], answer_emb: List[float],
+                        grounding_score: float, timer: StageTimer) -> Dict:
+        with timer.stage('evaluation.similarity'):
+            retrieval_metrics = self.retrieval_metrics(query_vec, doc_vectors)
+            relevance_score = float(self.cosine_similarity(query_vec, answer_emb))
+        
+        return {
+            'retrieval_metrics': retrieval_metrics,
+            'answer_metrics': {
+                'grounding_score': grounding_score,
+                'answer_relevance': relevance_score
+            }
+        }
+
+class AsyncRAGEvaluator:
+    """RAGEvaluator.evaluate on an AsyncOpenAI client.
+
+    The grounding judge and the embedding request run as concurrent
+    coroutines, so synchronous evaluation in the async API is not capped by
+    the EVAL_MAX_WORKERS thread pool.
+    """
+    
+    def __init__(self, evaluator: RAGEvaluator, openai_client, embedder):
+        self.evaluator = evaluator
+        self.openai_client = openai_client
+        # AsyncCachedEmbedder; shares the embedding cache with the sync evaluator
+        self.embedder = embedder
+    
+    async def check_factual_grounding(self, answer: str, retrieved_docs: List[Dict],
+                                      timer: Optional[StageTimer] = None) -> float:
+        """Async version of RAGEvaluator.check_factual_grounding"""
+        try:
+            with (timer or StageTimer()).stage('evaluation.grounding'):
+                response = await self.openai_client.chat.completions.create(
+                    **self.evaluator.grounding_request(answer, retrieved_docs)
+                )
+            return float(response.choices[0].message.content.strip())
+        except Exception as e:
+            record_dependency_error('openai')
+            logger.error(f"Grounding evaluation failed: {e}")
+            return 0.5
+    
+    async def evaluate(self, query: str, answer: str, retrieved_docs: List[Dict],
+                       query_embedding: Optional[List[float]] = None,
+                       timer: Optional[StageTimer] = None) -> Dict:
+        """Async version of RAGEvaluator.evaluate"""
+        timer = timer or StageTimer()
+        grounding = asyncio.ensure_future(self.check_factual_grounding(answer, retrieved_docs, timer))
+        try:
+            with timer.stage('evaluation.embedding', dependency='openai'):
+                pending = self.evaluator.pending_texts(query, query_embedding, retrieved_docs, [answer])
+                query_vec, doc_vectors, (answer_emb,) = self.evaluator.assign_vectors(
+                    query_embedding, retrieved_docs, await self.embedder.embed(pending)
+                )
+        except BaseException:
+            grounding.cancel()
+            raise
+        return self.evaluator.compile_metrics(query_vec, doc_vectors, answer_emb, await grounding, timer)
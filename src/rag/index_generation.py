@@ -0,0 +1,104 @@
+from typing import Callable, List, Optional
+from pymongo import ReturnDocument
+from .metrics import record_dependency_error
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# newton_index_runs document holding the resume checkpoint and the generation
+INDEX_RUN_ID = 'mongo_to_qdrant'
+
+class IndexGeneration:
+    """Generation number of the knowledge index, shared through MongoDB.
+
+    The pipeline bumps it (newton_index_runs, field 'generation') after every
+    run that changed the index and after re-exporting the local snapshots.
+    Readers such as the API workers opt in with INDEX_GENERATION_POLL_SECONDS:
+    a background thread reads it (the first read included, so a slow Mongo
+    never delays startup) and calls the on_change callbacks when it moves.
+    Requests only ever see the last known value.
+    """
+
+    def __init__(self, collection=None, poll_seconds: Optional[float] = None):
+        if collection is None:
+            from .clients import get_mongo_client
+            collection = get_mongo_client()[os.getenv('MONGO_DB_NAME', 'newton_ai')]['newton_index_runs']
+        self.collection = collection
+        self.poll_seconds = (poll_seconds if poll_seconds is not None
+                             else float(os.getenv('INDEX_GENERATION_POLL_SECONDS', '0')))
+        self.listeners: List[Callable[[int], None]] = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.value = 0
+        self.thread = None
+        if self.poll_seconds > 0:
+            self.thread = threading.Thread(target=self.poll, name="index-generation", daemon=True)
+            self.thread.start()
+        else:
+            self.value = self.read() or 0
+
+    @classmethod
+    def from_env(cls) -> Optional["IndexGeneration"]:
+        """Watch the shared generation when INDEX_GENERATION_POLL_SECONDS is set; None otherwise.
+
+        Also None without MONGO_URI, rather than trying a local MongoDB.
+        """
+        poll_seconds = float(os.getenv('INDEX_GENERATION_POLL_SECONDS', '0'))
+        if poll_seconds <= 0:
+            return None
+        if not os.getenv('MONGO_URI'):
+            logger.warning("INDEX_GENERATION_POLL_SECONDS is set but MONGO_URI is not; index generations are not watched")
+            return None
+        return cls(poll_seconds=poll_seconds)
+
+    def read(self) -> Optional[int]:
+        try:
+            run = self.collection.find_one({'_id': INDEX_RUN_ID}, {'generation': 1})
+        except Exception as e:
+            record_dependency_error('mongo')
+            logger.warning(f"Could not read the index generation: {e}")
+            return None
+        return int((run or {}).get('generation', 0))
+
+    def on_change(self, callback: Callable[[int], None]):
+        """Call `callback(generation)` from the poller thread whenever the generation moves"""
+        self.listeners.append(callback)
+
+    def poll(self):
+        # Where this worker starts; only later moves are changes
+        generation = self.read()
+        if generation is not None:
+            with self.lock:
+                self.value = generation
+        while not self.stopped.wait(self.poll_seconds):
+            self.refresh()
+
+    def refresh(self) -> int:
+        """Re-read the generation now, notifying listeners if it changed"""
+        generation = self.read()
+        with self.lock:
+            changed = generation is not None and generation != self.value
+            if changed:
+                self.value = generation
+        if changed:
+            logger.info(f"✓ Knowledge index generation is now {generation}")
+            for callback in self.listeners:
+                try:
+                    callback(generation)
+                except Exception as e:
+                    logger.error(f"Index generation listener failed: {e}")
+        return self.value
+
+    def bump(self) -> int:
+        """Start a new generation (pipeline side); readers pick it up on their next poll"""
+        run = self.collection.find_one_and_update(
+            {'_id': INDEX_RUN_ID}, {'$inc': {'generation': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        with self.lock:
+            self.value = int(run['generation'])
+        return self.value
+
+    def close(self):
+        self.stopped.set()
@@ -0,0 +1,140 @@
+from qdrant_client.models import ScoredPoint
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+from .local_vector_index import DEFAULT_INDEX_PATH, atomic_write, snapshot_version
+import unicodedata
+import logging
+import math
+import json
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be by did do does for from had has have he his how in is it its
+of on or s that the their this to was were what when where which who whom why with
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-folded word tokens without stopwords ("Newton's" -> newton)"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [token for token in TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-process Okapi BM25 over the indexed chunks.
+
+    Postings are term -> {doc position: term frequency}; a query touches only
+    the postings of its own terms. Results are ScoredPoints keyed by the same
+    point IDs as the vector index, so lexical and dense hits can be fused.
+    """
+    
+    def __init__(self, ids: List, payloads: List[Dict], k1: float = 1.5, b: float = 0.75):
+        self.ids = list(ids)
+        self.payloads = payloads
+        self.k1 = k1
+        self.b = b
+        # bm25.json version this index was loaded from (None: built from Qdrant)
+        self.version = None
+        
+        self.postings = defaultdict(dict)
+        self.doc_lengths = []
+        for position, payload in enumerate(payloads):
+            terms = tokenize(f"{payload.get('title', '')} {payload['text']}")
+            self.doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term][position] = frequency
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        
+        total = len(self.ids)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        logger.info(f"✓ BM25 index ready: {total} chunks, {len(self.postings)} terms")
+    
+    @classmethod
+    def from_qdrant(cls, client, collection_name: str, batch_size: int = 1000) -> "BM25Index":
+        ids, payloads = [], []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name, limit=batch_size, offset=offset,
+                with_payload=True, with_vectors=False
+            )
+            for record in records:
+                ids.append(record.id)
+                payloads.append(record.payload)
+            if offset is None:
+                break
+        return cls(ids, payloads)
+    
+    def save(self, path: str = DEFAULT_INDEX_PATH):
+        os.makedirs(path, exist_ok=True)
+        with atomic_write(os.path.join(path, "bm25.json"), "w") as f:
+            json.dump({'ids': self.ids, 'payloads': self.payloads, 'k1': self.k1, 'b': self.b}, f)
+        logger.info(f"✓ Saved BM25 index to {path}")
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> "BM25Index":
+        # Postings are rebuilt from the payloads; that is a few ms for this corpus size
+        version = snapshot_version(path, "bm25.json")
+        with open(os.path.join(path, "bm25.json")) as f:
+            data = json.load(f)
+        index = cls(data['ids'], data['payloads'], k1=data['k1'], b=data['b'])
+        index.version = version
+        return index
+    
+    @staticmethod
+    def exists(path: str = DEFAULT_INDEX_PATH) -> bool:
+        return os.path.exists(os.path.join(path, "bm25.json"))
+    
+    def search(self, query: str, limit: int = 20) -> List[ScoredPoint]:
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, frequency in self.postings[term].items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / self.avg_length)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            ScoredPoint(id=self.ids[position], version=0, score=score, payload=self.payloads[position])
+            for position, score in top
+        ]
+
+def reciprocal_rank_fusion(result_lists: List[List[ScoredPoint]], limit: int, k: int = 60) -> List[ScoredPoint]:
+    """Fuse ranked lists by sum of 1 / (k + rank); the first list's copy of a point wins"""
+    fused, points = defaultdict(float), {}
+    for results in result_lists:
+        for rank, point in enumerate(results):
+            fused[point.id] += 1.0 / (k + rank + 1)
+            points.setdefault(point.id, point)
+    
+    top = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [points[point_id].model_copy(update={'score': score}) for point_id, score in top]
+
+def load_lexical_index(client=None, collection_name: str = "newton_knowledge",
+                       path: Optional[str] = None) -> BM25Index:
+    """Open the saved BM25 index, building it from Qdrant on first use"""
+    path = path or os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+    if not BM25Index.exists(path):
+        if client is None:
+            raise FileNotFoundError(f"No BM25 index at {path}")
+        BM25Index.from_qdrant(client, collection_name).save(path)
+    return BM25Index.load(path)
+
+def reload_lexical_index(current: BM25Index, client, collection_name: str = "newton_knowledge",
+                         path: Optional[str] = None) -> BM25Index:
+    """The BM25 index of a new knowledge index generation (see reload_local_backend)"""
+    path = path or os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+    version = snapshot_version(path, "bm25.json")
+    if version is not None and version != current.version:
+        return BM25Index.load(path)
+    index = BM25Index.from_qdrant(client, collection_name)
+    index.version = current.version
+    return index
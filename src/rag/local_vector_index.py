@@ -0,0 +1,168 @@
+from qdrant_client.models import ScoredPoint
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def atomic_write(path: str, mode: str):
+    """Write to a temporary file and move it over `path`, so readers never see a partial file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, mode) as f:
+        yield f
+    os.replace(tmp, path)
+
+def snapshot_version(path: str, filename: str) -> Optional[float]:
+    """Modification time of a snapshot file, None when there is none"""
+    try:
+        return os.path.getmtime(os.path.join(path, filename))
+    except OSError:
+        return None
+
+DEFAULT_INDEX_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'vector_index')
+)
+
+class LocalVectorBackend:
+    """Exact in-process cosine search over a contiguous NumPy matrix.
+
+    Rows are L2-normalized once at load time, so a query is one matmul
+    followed by argpartition for the top-k. Results are ScoredPoints, the
+    same shape the Qdrant backend returns.
+    """
+    
+    def __init__(self, ids: List, vectors: np.ndarray, payloads: List[Dict], normalized: bool = False):
+        self.ids = list(ids)
+        self.payloads = payloads
+        # Snapshot file version this index was loaded from (None: built from Qdrant)
+        self.version = None
+        if not normalized:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        self.vectors = vectors
+        logger.info(f"✓ Local vector index ready: {len(self.ids)} x {vectors.shape[1] if len(self.ids) else 0} ({vectors.dtype})")
+    
+    @classmethod
+    def from_qdrant(cls, client, collection_name: str, dtype: str = "float32",
+                    batch_size: int = 1000) -> "LocalVectorBackend":
+        """Pull every point of a collection into memory with a paged scroll"""
+        ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            for record in records:
+                ids.append(record.id)
+                vectors.append(record.vector)
+                payloads.append(record.payload)
+            if offset is None:
+                break
+        
+        backend = cls(ids, np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1), payloads)
+        backend.vectors = backend.vectors.astype(dtype)
+        return backend
+    
+    def save(self, path: str = DEFAULT_INDEX_PATH):
+        """Write the snapshot; each file is replaced atomically, points.json last"""
+        os.makedirs(path, exist_ok=True)
+        with atomic_write(os.path.join(path, "vectors.npy"), "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors))
+        with atomic_write(os.path.join(path, "points.json"), "w") as f:
+            json.dump({'ids': self.ids, 'payloads': self.payloads}, f)
+        logger.info(f"✓ Saved local vector index to {path}")
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH, mmap: bool = False) -> "LocalVectorBackend":
+        """Load a saved index; with mmap the matrix is paged in from disk on demand"""
+        version = snapshot_version(path, "points.json")
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        with open(os.path.join(path, "points.json")) as f:
+            points = json.load(f)
+        backend = cls(points['ids'], vectors, points['payloads'], normalized=True)
+        backend.version = version
+        return backend
+    
+    @staticmethod
+    def exists(path: str = DEFAULT_INDEX_PATH) -> bool:
+        return os.path.exists(os.path.join(path, "vectors.npy"))
+    
+    def search(self, query_vector: List[float], limit: int = 20, with_vectors: bool = False) -> List[ScoredPoint]:
+        if not self.ids:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        # float16 rows are promoted to float32 here so the matmul goes through BLAS
+        return self.top_points(self.vectors @ query, limit, with_vectors)
+    
+    def search_batch(self, query_vectors: List[List[float]], limit: int = 20,
+                     with_vectors: bool = False) -> List[List[ScoredPoint]]:
+        """All queries scored in a single matrix product"""
+        if not self.ids or not len(query_vectors):
+            return [[] for _ in query_vectors]
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+        scores = queries @ self.vectors.T
+        return [self.top_points(row, limit, with_vectors) for row in scores]
+    
+    def top_points(self, scores: np.ndarray, limit: int, with_vectors: bool) -> List[ScoredPoint]:
+        limit = min(limit, len(scores))
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        
+        return [
+            ScoredPoint(
+                id=self.ids[i],
+                version=0,
+                score=float(scores[i]),
+                payload=self.payloads[i],
+                vector=self.vectors[i].astype(np.float32).tolist() if with_vectors else None
+            )
+            for i in top
+        ]
+
+def load_local_backend(client=None, collection_name: str = "newton_knowledge",
+                       path: Optional[str] = None) -> LocalVectorBackend:
+    """Open the saved local index, building it from Qdrant on first use"""
+    path = path or os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+    dtype = os.getenv('VECTOR_INDEX_DTYPE', 'float32')
+    mmap = os.getenv('VECTOR_INDEX_MMAP', 'false').lower() in ('1', 'true', 'yes')
+    
+    if not LocalVectorBackend.exists(path):
+        if client is None:
+            raise FileNotFoundError(f"No local vector index at {path}")
+        LocalVectorBackend.from_qdrant(client, collection_name, dtype=dtype).save(path)
+    
+    backend = LocalVectorBackend.load(path, mmap=mmap)
+    if backend.vectors.dtype != np.dtype(dtype) and not mmap:
+        backend.vectors = backend.vectors.astype(dtype)
+    return backend
+
+def reload_local_backend(current: LocalVectorBackend, client, collection_name: str = "newton_knowledge",
+                         path: Optional[str] = None) -> LocalVectorBackend:
+    """The index of a new knowledge index generation.
+
+    A snapshot file newer than the one `current` came from is loaded; when
+    the pipeline re-exported it on another host, the points are pulled from
+    Qdrant instead.
+    """
+    path = path or os.getenv('VECTOR_INDEX_PATH', DEFAULT_INDEX_PATH)
+    version = snapshot_version(path, "points.json")
+    if version is not None and version != current.version:
+        return load_local_backend(client, collection_name, path)
+    backend = LocalVectorBackend.from_qdrant(client, collection_name, dtype=os.getenv('VECTOR_INDEX_DTYPE', 'float32'))
+    backend.version = current.version
+    return backend
@@ -0,0 +1,123 @@
+from prometheus_client import Counter, Gauge, Histogram
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import threading
+import time
+
+# Spread from sub-millisecond cache lookups to multi-second generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_LATENCY = Histogram(
+    'newton_rag_stage_latency_seconds',
+    'Time spent in each stage of answering a question',
+    ['stage'],
+    buckets=LATENCY_BUCKETS
+)
+DEPENDENCY_ERRORS = Counter(
+    'newton_rag_dependency_errors_total',
+    'Failed calls to an external dependency or model',
+    ['dependency']
+)
+DOCS_RETRIEVED = Histogram(
+    'newton_rag_documents_retrieved',
+    'Documents returned by first-stage retrieval and kept after reranking',
+    ['phase'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+REQUESTS = Counter(
+    'newton_rag_requests_total',
+    'Questions answered, by how the answer was produced',
+    ['outcome']
+)
+
+CONTEXT_TOKENS = Histogram(
+    'newton_rag_context_tokens',
+    'Prompt context tokens after packing, and tokens saved by deduplication and the budget',
+    ['kind'],
+    buckets=(0, 50, 100, 250, 500, 1000, 1500, 2000, 4000, 8000)
+)
+EVALUATIONS = Counter(
+    'newton_rag_background_evaluations_total',
+    'Deferred evaluations, by what happened to them',
+    ['outcome']
+)
+
+RERANK_QUEUE_DEPTH = Gauge(
+    'newton_rag_rerank_queue_depth',
+    'Rerank requests waiting for the micro-batching worker'
+)
+RERANK_QUEUE_WAIT = Histogram(
+    'newton_rag_rerank_queue_wait_seconds',
+    'Time a rerank request waited between submission and its forward pass',
+    buckets=LATENCY_BUCKETS
+)
+RERANK_BATCH_SIZE = Histogram(
+    'newton_rag_rerank_batch_size',
+    'Forward passes of the rerank batcher, by pairs scored and by requests merged into one pass',
+    ['unit'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+RERANK_REQUESTS = Counter(
+    'newton_rag_rerank_batch_requests_total',
+    'Requests handled by the rerank batcher, by what happened to them',
+    ['outcome']
+)
+
+def record_dependency_error(dependency: str):
+    DEPENDENCY_ERRORS.labels(dependency=dependency).inc()
+
+def record_documents(retrieved: int, kept: int):
+    DOCS_RETRIEVED.labels(phase='retrieved').observe(retrieved)
+    DOCS_RETRIEVED.labels(phase='kept').observe(kept)
+
+def record_rerank_batch(pairs: int, waits: List[float], cancelled: int, failed: bool = False):
+    """One forward pass of the rerank batcher; `waits` has the queue wait of each request in it"""
+    if cancelled:
+        RERANK_REQUESTS.labels(outcome='cancelled').inc(cancelled)
+    if not waits:
+        return
+    RERANK_BATCH_SIZE.labels(unit='pairs').observe(pairs)
+    RERANK_BATCH_SIZE.labels(unit='requests').observe(len(waits))
+    for wait in waits:
+        RERANK_QUEUE_WAIT.observe(wait)
+    RERANK_REQUESTS.labels(outcome='failed' if failed else 'scored').inc(len(waits))
+
+def record_context(stats: Dict):
+    CONTEXT_TOKENS.labels(kind='packed').observe(stats['context_tokens'])
+    CONTEXT_TOKENS.labels(kind='saved').observe(stats['tokens_saved'])
+
+class StageTimer:
+    """Per-request timing spans.
+
+    Every span is observed in the stage latency histogram and added to
+    `timings` (milliseconds), which callers may return with the response.
+    Spans can be opened from worker threads, e.g. the grounding judge.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, dependency: Optional[str] = None):
+        """Time a block; an exception inside it counts as an error of `dependency`"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if dependency:
+                record_dependency_error(dependency)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        STAGE_LATENCY.labels(stage=name).observe(seconds)
+        with self.lock:
+            self.timings[name] = round(self.timings.get(name, 0.0) + seconds * 1000, 3)
+
+    def finish(self) -> Dict[str, float]:
+        """Record the whole request as the 'total' stage and return the breakdown"""
+        self.record('total', time.perf_counter() - self.start)
+        return dict(self.timings)
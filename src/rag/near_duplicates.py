@@ -0,0 +1,170 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import threading
+import logging
+import zlib
+import re
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r'\w+')
+
+# Prime just above 2**32: (a * x + b) stays inside uint64 for 32-bit a, b and x
+PRIME = np.uint64(4294967311)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+class MinHasher:
+    """MinHash signatures over lowercased word shingles.
+
+    The fraction of positions where two signatures agree estimates the
+    Jaccard similarity of the two texts' shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        words = WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)} if size else set()
+        return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """uint32 signature, or None for text without words"""
+        hashes = self.shingle_hashes(text)
+        if not len(hashes):
+            return None
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % PRIME
+        return (permuted.min(axis=1) & MAX_HASH).astype(np.uint32)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) whose candidate threshold (1/bands)**(1/rows) is the highest one below `threshold`.
+
+    Pairs at the threshold are then very likely to share a band, and
+    candidates are confirmed against the full signatures.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [(bands, rows) for bands, rows in options if (1 / bands) ** (1 / rows) <= threshold]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1])) if below else options[0]
+
+class NearDuplicateIndex:
+    """In-memory LSH index of chunk signatures.
+
+    Signatures are split into bands; chunks sharing any band are candidates,
+    and a candidate counts as a near duplicate when the signatures agree on
+    at least `threshold` of their positions.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: Dict[str, Set[str]] = {}
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        """One key per band, '<band>:<hex of its rows>'; the same keys are stored in Mongo"""
+        return [
+            f"{band}:{signature[band * self.rows:(band + 1) * self.rows].tobytes().hex()}"
+            for band in range(self.bands)
+        ]
+
+    def add(self, point_id: str, signature: Optional[np.ndarray]):
+        if signature is None or point_id in self.signatures:
+            return
+        self.signatures[point_id] = signature
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, set()).add(point_id)
+
+    def remove(self, point_id: str):
+        signature = self.signatures.pop(point_id, None)
+        if signature is None:
+            return
+        for key in self.band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(point_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find(self, signature: Optional[np.ndarray]) -> Optional[str]:
+        """The most similar chunk at or above the threshold, if any"""
+        if signature is None:
+            return None
+        candidates = set()
+        for key in self.band_keys(signature):
+            candidates.update(self.buckets.get(key, ()))
+        best, best_similarity = None, self.threshold
+        for point_id in candidates:
+            score = similarity(self.signatures[point_id], signature)
+            if score >= best_similarity:
+                best, best_similarity = point_id, score
+        return best
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+class StoredNearDuplicates:
+    """LSH lookups against the chunk signatures stored in newton_chunk_sources.
+
+    Every stored chunk keeps its band keys in an indexed 'bands' array, so a
+    lookup reads only the chunks sharing a band with the incoming one and
+    memory does not grow with the corpus. Chunks of documents still moving
+    through the ingestion stream are not stored yet; they sit in a small
+    in-memory index until their document is finished.
+    """
+
+    def __init__(self, collection, threshold: float = 0.8, num_perm: int = 128):
+        self.collection = collection
+        self.threshold = threshold
+        self.pending = NearDuplicateIndex(threshold, num_perm)
+        # The chunking stage adds pending chunks while the writer finishes documents
+        self.lock = threading.Lock()
+        collection.create_index('bands')
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        return self.pending.band_keys(signature)
+
+    def find(self, signature: Optional[np.ndarray], url: str) -> Optional[str]:
+        """The most similar chunk at or above the threshold, skipping chunks only `url` contains.
+
+        `url` is the page being re-chunked: its previous chunks are about to
+        be replaced, so they can't absorb the new ones.
+        """
+        if signature is None:
+            return None
+        with self.lock:
+            best = self.pending.find(signature)
+            best_similarity = similarity(self.pending.signatures[best], signature) if best else self.threshold
+
+        stored = self.collection.find(
+            {'bands': {'$in': self.band_keys(signature)}},
+            {'minhash': 1, 'sources.url': 1}
+        )
+        for entry in stored:
+            if not entry.get('minhash') or all(source['url'] == url for source in entry.get('sources', [])):
+                continue
+            score = similarity(np.frombuffer(entry['minhash'], dtype=np.uint32), signature)
+            if score > best_similarity or (best is None and score >= best_similarity):
+                best, best_similarity = entry['_id'], score
+        return best
+
+    def add_pending(self, point_id: str, signature: Optional[np.ndarray], url: str):
+        with self.lock:
+            self.pending.add(point_id, signature)
+
+    def stored(self, point_ids: Iterable[str]):
+        """Forget pending chunks once their documents are written to newton_chunk_sources"""
+        with self.lock:
+            for point_id in point_ids:
+                self.pending.remove(point_id)
+
+    def __len__(self) -> int:
+        return len(self.pending)
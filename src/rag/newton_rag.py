@@ -1,60 +1,206 @@
 from .vector_store import NewtonVectorStore
 from .reranker import NewtonReranker
+from .rerank_batcher import RerankBatcher
 from .evaluator import RAGEvaluator
-from openai import OpenAI
-from typing import Dict, List
+from .evaluation_queue import EvaluationQueue
+from .context_builder import ContextBuilder
+from .semantic_cache import SemanticCache
+from .index_generation import IndexGeneration
+from .embedding_cache import CachedEmbedder
+from .clients import get_openai_client
+from .adaptive_retrieval import AdaptiveRetrievalPolicy, DEFAULT_LIMIT, DEFAULT_TOP_K
+from .lexical_index import load_lexical_index, reload_lexical_index, reciprocal_rank_fusion
+from .local_vector_index import LocalVectorBackend, reload_local_backend
+from .metrics import REQUESTS, StageTimer, record_context, record_dependency_error, record_documents
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import threading
 import logging
+import time
 import os
 
 logger = logging.getLogger(__name__)
 
+WARMUP_QUESTION = "Who was Isaac Newton?"
+# Used for the rerank warm-up when the search step returned nothing
+WARMUP_DOCS = [{
+    'text': "Isaac Newton was an English mathematician, physicist and astronomer.",
+    'title': "Isaac Newton",
+    'url': "https://en.wikipedia.org/wiki/Isaac_Newton"
+}]
+
+@contextmanager
+def warmup_step(progress: Dict, name: str):
+    """Record a warm-up step's status and duration in `progress`; failures are logged, not raised"""
+    progress[name] = {'status': 'running'}
+    start = time.perf_counter()
+    try:
+        yield
+        progress[name] = {'status': 'ok', 'ms': round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        logger.warning(f"Warm-up step '{name}' failed: {e}")
+        progress[name] = {'status': 'failed', 'ms': round((time.perf_counter() - start) * 1000, 1), 'error': str(e)}
+
+def cited_sources(docs: List[Dict]) -> Dict[str, List[str]]:
+    """Titles and URLs of every page the documents came from, pages of merged near duplicates included"""
+    titles = dict.fromkeys(title for doc in docs for title in doc.get('titles') or [doc['title']])
+    urls = dict.fromkeys(url for doc in docs for url in doc.get('urls') or [doc['url']])
+    return {'sources': list(titles), 'source_urls': list(urls)}
+
 class EnhancedNewtonRAG:
-    def __init__(self):
-        self.vector_store = NewtonVectorStore()
-        self.reranker = NewtonReranker()
-        self.evaluator = RAGEvaluator()
-        self.llm = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    def __init__(self, vector_store: Optional[NewtonVectorStore] = None, reranker=None,
+                 evaluator: Optional[RAGEvaluator] = None, llm=None, evaluation_queue=None,
+                 index_generation: Optional[IndexGeneration] = None):
+        self.vector_store = vector_store or NewtonVectorStore()
+        self.reranker = reranker or NewtonReranker()
+        if os.getenv('RERANK_BATCHING', 'false').lower() in ('1', 'true', 'yes'):
+            # Concurrent callers share cross-encoder forward passes
+            self.reranker = RerankBatcher(self.reranker)
+        self.llm = llm or get_openai_client()
+        self.evaluator = evaluator or RAGEvaluator(self.llm)
+        # EVALUATION_MODE: 'deferred' (evaluate in the background, return an
+        # evaluation ID) or 'sync' (evaluate before returning the answer)
+        self.defer_evaluation = os.getenv('EVALUATION_MODE', 'deferred').lower() == 'deferred'
+        self.evaluation_queue = evaluation_queue
+        self.embedder = CachedEmbedder(self.llm)
+        # Knowledge index generation shared with the pipeline (opt-in: INDEX_GENERATION_POLL_SECONDS)
+        self.index_generation = index_generation or IndexGeneration.from_env()
+        self.cache = SemanticCache.from_env(self.index_generation)
+        self.retrieval_policy = AdaptiveRetrievalPolicy()
+        self.context_builder = ContextBuilder()
+        
+        # RETRIEVAL_MODE: 'dense' (vectors only), 'hybrid' (BM25 + vectors fused
+        # with RRF) or 'lexical' (BM25 only, no embedding call)
+        self.retrieval_mode = os.getenv('RETRIEVAL_MODE', 'dense').lower()
+        # Past this deadline the query embedding is abandoned for a lexical-only search
+        deadline_ms = os.getenv('EMBEDDING_DEADLINE_MS')
+        self.embedding_deadline = float(deadline_ms) / 1000 if deadline_ms else None
+        self.embed_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="embed-query")
+        # Generations in flight at once for answer_questions
+        self.batch_concurrency = int(os.getenv('BATCH_MAX_CONCURRENCY', '8'))
+        self.lexical_index = None
+        # Concurrent first hybrid/lexical requests build the BM25 index once
+        self.lexical_lock = threading.Lock()
+        if self.retrieval_mode != 'dense' or self.embedding_deadline is not None:
+            self.get_lexical_index()
+        if self.index_generation is not None:
+            self.index_generation.on_change(self.reload_indexes)
 
         logger.info("✅ Newton RAG initialized with Qdrant Cloud")
     
     def create_embedding(self, text: str) -> List[float]:
-        response = self.llm.embeddings.create(
-            input=text, model="text-embedding-3-small"
-        )
-        return response.data[0].embedding
+        return self.embedder.embed_one(text)
+    
+    def warmup(self, progress: Optional[Dict] = None) -> Dict:
+        """Push one dummy question through embedding, search and rerank.
+
+        Opens the HTTP connection pools and runs a first model forward pass
+        before real traffic arrives. `progress` is filled in step by step so
+        a readiness probe can report it.
+        """
+        progress = {} if progress is None else progress
+        embedding = docs = None
+        with warmup_step(progress, 'embedding'):
+            embedding = self.create_embedding(WARMUP_QUESTION)
+        if embedding is not None:
+            with warmup_step(progress, 'search'):
+                docs = self.format_documents(self.vector_store.search(embedding, limit=5))
+        with warmup_step(progress, 'rerank'):
+            self.reranker.rerank_documents(WARMUP_QUESTION, docs or WARMUP_DOCS, top_k=1)
+        return progress
+    
+    def get_evaluation_queue(self) -> EvaluationQueue:
+        if self.evaluation_queue is None:
+            self.evaluation_queue = EvaluationQueue(self.evaluator)
+        return self.evaluation_queue
+    
+    def evaluation_plan(self, evaluate: bool, defer_evaluation: Optional[bool]) -> Tuple[bool, bool]:
+        """(evaluate before returning, queue a background evaluation)"""
+        defer = self.defer_evaluation if defer_evaluation is None else defer_evaluation
+        return evaluate and not defer, evaluate and defer
+    
+    def get_lexical_index(self):
+        if self.lexical_index is None:
+            with self.lexical_lock:
+                if self.lexical_index is None:
+                    self.lexical_index = load_lexical_index(
+                        self.vector_store.client, self.vector_store.collection_name
+                    )
+        return self.lexical_index
+    
+    def reload_indexes(self, generation: int):
+        """Swap in the in-process vector and BM25 indexes of a new index generation.
+
+        Runs on the generation poller thread; searches keep using the old
+        indexes until the new ones are fully built.
+        """
+        client, collection = self.vector_store.client, self.vector_store.collection_name
+        try:
+            if isinstance(self.vector_store.backend, LocalVectorBackend):
+                self.vector_store.backend = reload_local_backend(self.vector_store.backend, client, collection)
+            if self.lexical_index is not None:
+                self.lexical_index = reload_lexical_index(self.lexical_index, client, collection)
+        except Exception as e:
+            record_dependency_error('vector_store')
+            logger.error(f"Could not reload the indexes for generation {generation}: {e}")
+            return
+        logger.info(f"✓ Reloaded in-process indexes for index generation {generation}")
     
-    def answer_question(self, question: str, evaluate: bool = True) -> Dict:
-        """Complete RAG pipeline with reranking and evaluation"""
+    def embed_query(self, question: str, mode: Optional[str] = None) -> Tuple[Optional[List[float]], str]:
+        """Embed the question for the requested mode.
+
+        Returns (embedding, effective mode); the embedding is None when the
+        mode is lexical or the embedding deadline passed.
+        """
+        mode = mode or self.retrieval_mode
+        if mode == 'lexical':
+            return None, mode
+        if self.embedding_deadline is None:
+            return self.create_embedding(question), mode
         
-        # 1. Vector search
-        query_embedding = self.create_embedding(question)
-        search_results = self.vector_store.search(query_embedding, limit=20)
+        future = self.embed_executor.submit(self.create_embedding, question)
+        try:
+            return future.result(timeout=self.embedding_deadline), mode
+        except FuturesTimeout:
+            # The request keeps running and still lands in the embedding cache
+            record_dependency_error('openai')
+            logger.warning(f"Query embedding exceeded {self.embedding_deadline * 1000:.0f} ms, using lexical search")
+            return None, 'lexical'
+    
+    def search_candidates(self, question: str, query_embedding: Optional[List[float]], limit: int,
+                          with_vectors: bool, mode: str):
+        """First-stage retrieval for the given mode"""
+        if query_embedding is None:
+            return self.get_lexical_index().search(question, limit=limit)
         
-        initial_docs = []
-        for result in search_results:
-            initial_docs.append({
+        dense = self.vector_store.search(query_embedding, limit=limit, with_vectors=with_vectors)
+        if mode == 'hybrid':
+            return reciprocal_rank_fusion([dense, self.get_lexical_index().search(question, limit=limit)], limit)
+        return dense
+    
+    def format_documents(self, search_results) -> List[Dict]:
+        """Turn Qdrant search hits into the document dicts used downstream"""
+        return [
+            {
                 'text': result.payload['text'],
                 'title': result.payload['title'],
                 'url': result.payload['url'],
-                'vector_score': result.score
-            })
-        
-        logger.info(f"✓ Retrieved {len(initial_docs)} initial documents")
-        
-        # 2. Rerank documents
-        reranked_docs = self.reranker.rerank_documents(question, initial_docs, top_k=5)
-        
-        # 3. Evaluate retrieval (optional)
-        retrieval_metrics = {}
-        if evaluate:
-            retrieval_metrics = self.evaluator.evaluate_retrieval_relevance(
-                question, reranked_docs
-            )
-        
-        # 4. Generate answer
-        context = "\n\n".join([doc['text'] for doc in reranked_docs])
+                # Every page containing the chunk, near duplicates included
+                'urls': result.payload.get('urls') or [result.payload['url']],
+                'titles': result.payload.get('titles') or [result.payload['title']],
+                'vector_score': result.score,
+                # Stored chunk vector, present when searched with_vectors
+                'vector': result.vector
+            }
+            for result in search_results
+        ]
+    
+    def build_prompt(self, question: str, docs: List[Dict]) -> str:
+        """Build the generation prompt from the reranked documents' packed context"""
+        context = ContextBuilder.join([doc.get('context_text', doc['text']) for doc in docs])
         
-        prompt = f"""Based on this information about Isaac Newton, answer the question accurately.
+        return f"""Based on this information about Isaac Newton, answer the question accurately.
 
 Context: {context}
 
@@ -67,34 +213,396 @@ Instructions:
 - Keep your answer informative but concise
 
 Answer:"""
+    
+    def compile_result(self, answer: str, reranked_docs: List[Dict], evaluation: Dict,
+                       evaluate: bool, retrieval: Optional[Dict] = None,
+                       evaluation_id: Optional[str] = None) -> Dict:
+        """Assemble the response dict returned to callers"""
+        result = {
+            'answer': answer,
+            **cited_sources(reranked_docs),
+            'num_docs_used': len(reranked_docs),
+            'reranked_docs': [
+                {key: value for key, value in doc.items() if key not in ('vector', 'context_text')}
+                for doc in reranked_docs
+            ]
+        }
+        
+        if evaluate:
+            result['evaluation'] = evaluation
+        if evaluation_id:
+            result['evaluation_id'] = evaluation_id
+        if retrieval:
+            result['retrieval'] = retrieval
+        
+        return result
+    
+    def use_cache(self, limit: Optional[int], top_k: Optional[int]) -> bool:
+        """Cached answers were built with the default depth, so custom depths bypass the cache"""
+        return self.cache is not None and limit is None and top_k is None
+    
+    def cache_scope(self, mode: str, adaptive: Optional[bool]) -> str:
+        """The retrieval settings besides the question that a cached answer depends on"""
+        adaptive = self.retrieval_policy.enabled if adaptive is None else adaptive
+        return f"{mode}:{'adaptive' if adaptive and mode == 'dense' else 'full'}"
+    
+    def retrieve_documents(self, question: str, query_embedding: Optional[List[float]], with_vectors: bool = False,
+                           limit: Optional[int] = None, top_k: Optional[int] = None,
+                           adaptive: Optional[bool] = None, mode: str = 'dense',
+                           timer: Optional[StageTimer] = None) -> Tuple[List[Dict], Dict]:
+        """First-stage retrieval followed by (possibly adaptive) cross-encoder reranking.
+
+        Returns the final documents and a summary of the retrieval path taken.
+        """
+        limit, top_k = limit or DEFAULT_LIMIT, top_k or DEFAULT_TOP_K
+        timer = timer or StageTimer()
+        with timer.stage('search', dependency='vector_store'):
+            search_results = self.search_candidates(question, query_embedding, limit, with_vectors, mode)
+        initial_docs = self.format_documents(search_results)
         
+        logger.info(f"✓ Retrieved {len(initial_docs)} initial documents ({mode})")
+        
+        return self.rerank_candidates(question, initial_docs, limit, top_k, adaptive, mode, timer)
+    
+    def plan_candidates(self, initial_docs: List[Dict], top_k: int, adaptive: Optional[bool], mode: str):
+        # Score-margin rules are calibrated on cosine scores, so they only apply to dense hits
+        return self.retrieval_policy.plan(initial_docs, top_k, adaptive if mode == 'dense' else False)
+    
+    def rerank_candidates(self, question: str, initial_docs: List[Dict], limit: int, top_k: int,
+                          adaptive: Optional[bool], mode: str,
+                          timer: Optional[StageTimer] = None) -> Tuple[List[Dict], Dict]:
+        candidates, rerank, path = self.plan_candidates(initial_docs, top_k, adaptive, mode)
+        if rerank:
+            with (timer or StageTimer()).stage('rerank', dependency='reranker'):
+                docs = self.reranker.rerank_documents(question, candidates, top_k=top_k)
+        else:
+            docs = candidates[:top_k]
+        return self.finish_retrieval(initial_docs, candidates, docs, rerank, path, limit, top_k, mode, timer)
+    
+    def finish_retrieval(self, initial_docs: List[Dict], candidates: List[Dict], docs: List[Dict], rerank: bool,
+                         path: str, limit: int, top_k: int, mode: str,
+                         timer: Optional[StageTimer] = None) -> Tuple[List[Dict], Dict]:
+        """Record and describe a finished retrieval, then pack the kept documents' context"""
+        record_documents(len(initial_docs), len(docs))
+        retrieval = self.describe_retrieval(path, limit, top_k, initial_docs, candidates, rerank, mode)
+        return self.pack_context(docs, retrieval, timer), retrieval
+    
+    def pack_context(self, docs: List[Dict], retrieval: Dict, timer: Optional[StageTimer] = None) -> List[Dict]:
+        """Deduplicate and budget the prompt context; the token stats go into retrieval['context']"""
+        with (timer or StageTimer()).stage('context'):
+            docs, retrieval['context'] = self.context_builder.pack(docs)
+        record_context(retrieval['context'])
+        return docs
+    
+    def search_candidates_batch(self, questions: List[str], query_embeddings: List[Optional[List[float]]],
+                                limit: int, with_vectors: bool, mode: str) -> List:
+        """search_candidates for many questions, with one vector store round trip"""
+        if mode == 'lexical':
+            return [self.get_lexical_index().search(question, limit=limit) for question in questions]
+        
+        dense = self.vector_store.search_batch(query_embeddings, limit=limit, with_vectors=with_vectors)
+        if mode == 'hybrid':
+            return [
+                reciprocal_rank_fusion([hits, self.get_lexical_index().search(question, limit=limit)], limit)
+                for question, hits in zip(questions, dense)
+            ]
+        return dense
+    
+    def rerank_batch(self, questions: List[str], initial_docs: List[List[Dict]], limit: int, top_k: int,
+                     adaptive: Optional[bool], mode: str,
+                     timer: Optional[StageTimer] = None) -> List[Tuple[List[Dict], Dict]]:
+        """rerank_candidates for many questions, scoring every pair in one predict call"""
+        plans = [self.plan_candidates(docs, top_k, adaptive, mode) for docs in initial_docs]
+        pairs = [
+            (question, doc['text'])
+            for question, (candidates, rerank, _) in zip(questions, plans) if rerank
+            for doc in candidates
+        ]
+        scores = []
+        if pairs:
+            with (timer or StageTimer()).stage('rerank', dependency='reranker'):
+                scores = self.reranker.predict(pairs)
+        
+        results, offset = [], 0
+        for docs, (candidates, rerank, path) in zip(initial_docs, plans):
+            if rerank:
+                kept = NewtonReranker.select_top(candidates, scores[offset:offset + len(candidates)], top_k)
+                offset += len(candidates)
+            else:
+                kept = candidates[:top_k]
+            results.append(self.finish_retrieval(docs, candidates, kept, rerank, path, limit, top_k, mode, timer))
+        return results
+    
+    def describe_retrieval(self, path: str, limit: int, top_k: int, initial_docs: List[Dict],
+                           candidates: List[Dict], rerank: bool, mode: str = 'dense') -> Dict:
+        return {
+            'mode': mode,
+            'path': path,
+            'limit': limit,
+            'top_k': top_k,
+            'candidates_retrieved': len(initial_docs),
+            'candidates_reranked': len(candidates) if rerank else 0
+        }
+    
+    def generate_answer(self, question: str, docs: List[Dict]) -> str:
         response = self.llm.chat.completions.create(
             model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+            messages=[{"role": "user", "content": self.build_prompt(question, docs)}],
             temperature=0.3
         )
+        return response.choices[0].message.content
+    
+    def stream_answer_tokens(self, question: str, docs: List[Dict]) -> Iterator[str]:
+        """Yield answer tokens as the completion streams in"""
+        stream = self.llm.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": self.build_prompt(question, docs)}],
+            temperature=0.3,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def sources_event(self, docs: List[Dict], retrieval: Optional[Dict] = None) -> Dict:
+        return {
+            'event': 'sources',
+            'data': {**cited_sources(docs), 'num_docs_used': len(docs), 'retrieval': retrieval}
+        }
+    
+    def replay_result(self, result: Dict) -> Iterator[Dict]:
+        """Emit a finished (e.g. cached) result as the same event sequence as a live stream"""
+        yield {
+            'event': 'sources',
+            'data': {
+                'sources': result['sources'],
+                'source_urls': result.get('source_urls', []),
+                'num_docs_used': result['num_docs_used'],
+                'retrieval': result.get('retrieval')
+            }
+        }
+        yield {'event': 'token', 'data': result['answer']}
+        if result.get('evaluation'):
+            yield {'event': 'evaluation', 'data': result['evaluation']}
+        yield {'event': 'done', 'data': {
+            'cache': result.get('cache'), 'timings': result.get('timings'),
+            'evaluation_id': result.get('evaluation_id')
+        }}
+    
+    def lookup_cache(self, question: str, query_embedding: List[float], scope: str, evaluate_now: bool,
+                     evaluate_later: bool) -> Optional[Dict]:
+        """The cached result for the question, if any; hits are counted here.
+
+        A deferred evaluation requested on a hit gets its own evaluation ID,
+        unless the cached result already carries the metrics.
+        """
+        cached = self.cache.get(query_embedding, require_evaluation=evaluate_now, scope=scope)
+        if not cached:
+            return None
+        REQUESTS.labels(outcome='cache_hit').inc()
+        if evaluate_later and 'evaluation' not in cached:
+            evaluation_id = self.get_evaluation_queue().submit(
+                question, cached['answer'], cached['reranked_docs'], query_embedding
+            )
+            if evaluation_id:
+                cached['evaluation_id'] = evaluation_id
+        return cached
+    
+    def evaluate_answer(self, question: str, answer: str, docs: List[Dict],
+                        query_embedding: Optional[List[float]], evaluate_now: bool, evaluate_later: bool,
+                        timer: StageTimer) -> Tuple[Dict, Optional[str]]:
+        """Evaluate now or queue a deferred evaluation; returns (evaluation, evaluation_id).
+
+        The query vector and the stored chunk vectors are reused.
+        """
+        if evaluate_now:
+            with timer.stage('evaluation'):
+                return self.evaluator.evaluate(question, answer, docs, query_embedding=query_embedding, timer=timer), None
+        if evaluate_later:
+            return {}, self.get_evaluation_queue().submit(question, answer, docs, query_embedding)
+        return {}, None
+    
+    def finish_answer(self, question: str, answer: str, docs: List[Dict], retrieval: Dict,
+                      query_embedding: Optional[List[float]], evaluate_now: bool, evaluate_later: bool,
+                      cache_scope: Optional[str], timer: StageTimer) -> Dict:
+        """Steps after generation shared by every answer path: evaluate, compile and cache the result.
+
+        The result is cached under `cache_scope`; None skips the cache.
+        """
+        evaluation, evaluation_id = self.evaluate_answer(
+            question, answer, docs, query_embedding, evaluate_now, evaluate_later, timer
+        )
+        return self.record_answer(answer, docs, retrieval, query_embedding, evaluation, evaluate_now,
+                                  evaluation_id, cache_scope)
+    
+    def record_answer(self, answer: str, docs: List[Dict], retrieval: Dict, query_embedding: Optional[List[float]],
+                      evaluation: Dict, evaluated: bool, evaluation_id: Optional[str],
+                      cache_scope: Optional[str]) -> Dict:
+        """Compile the result of an evaluated (or queued) answer, cache it and count it"""
+        result = self.compile_result(answer, docs, evaluation, evaluated, retrieval, evaluation_id)
+        if cache_scope is not None:
+            self.cache.put(query_embedding, result, scope=cache_scope)
+        REQUESTS.labels(outcome='generated').inc()
+        return result
+    
+    def done_event(self, result: Dict, timings: Dict) -> Dict:
+        return {'event': 'done', 'data': {'cache': None, 'timings': timings, 'evaluation_id': result.get('evaluation_id')}}
+    
+    def answer_question(self, question: str, evaluate: bool = True, limit: Optional[int] = None,
+                        top_k: Optional[int] = None, adaptive: Optional[bool] = None,
+                        mode: Optional[str] = None, defer_evaluation: Optional[bool] = None) -> Dict:
+        """Complete RAG pipeline with reranking and evaluation.
+
+        The result carries a per-stage 'timings' breakdown in milliseconds.
+        With deferred evaluation (defer_evaluation, default EVALUATION_MODE)
+        it carries an 'evaluation_id' instead of the metrics; see
+        EvaluationQueue.
+        """
+        timer = StageTimer()
+        evaluate_now, evaluate_later = self.evaluation_plan(evaluate, defer_evaluation)
         
-        answer = response.choices[0].message.content
+        # 1. Embed the question (skipped for lexical retrieval)
+        with timer.stage('embedding', dependency='openai'):
+            query_embedding, mode = self.embed_query(question, mode)
+        use_cache = query_embedding is not None and self.use_cache(limit, top_k)
+        scope = self.cache_scope(mode, adaptive) if use_cache else None
         
-        # 5. Evaluate answer quality (optional)
-        answer_metrics = {}
-        if evaluate:
-            answer_metrics = self.evaluator.evaluate_answer_quality(
-                question, answer, reranked_docs
+        if use_cache:
+            with timer.stage('cache_lookup', dependency='cache'):
+                cached = self.lookup_cache(question, query_embedding, scope, evaluate_now, evaluate_later)
+            if cached:
+                return {**cached, 'timings': timer.finish()}
+        
+        # 2. Retrieve and rerank documents
+        reranked_docs, retrieval = self.retrieve_documents(
+            question, query_embedding, with_vectors=evaluate, limit=limit, top_k=top_k,
+            adaptive=adaptive, mode=mode, timer=timer
+        )
+        
+        # 3. Generate answer
+        with timer.stage('generation', dependency='openai'):
+            answer = self.generate_answer(question, reranked_docs)
+        
+        # 4. Evaluate (optional), compile and cache the result
+        result = self.finish_answer(
+            question, answer, reranked_docs, retrieval, query_embedding,
+            evaluate_now, evaluate_later, scope, timer
+        )
+        return {**result, 'timings': timer.finish()}
+    
+    def answer_questions(self, questions: List[str], evaluate: bool = True, limit: Optional[int] = None,
+                         top_k: Optional[int] = None, adaptive: Optional[bool] = None,
+                         mode: Optional[str] = None, max_concurrency: Optional[int] = None,
+                         defer_evaluation: Optional[bool] = None) -> List[Dict]:
+        """answer_question for a batch of questions, in question order.
+
+        All questions are embedded in one request, searched in one vector
+        store round trip and reranked in one cross-encoder call; generation
+        and evaluation then run with up to `max_concurrency`
+        (BATCH_MAX_CONCURRENCY) questions in flight. Each result's timings
+        show the shared stages at batch level and 'total' as the time from
+        the start of the batch to that answer.
+        """
+        if not questions:
+            return []
+        batch = StageTimer()
+        timers = [StageTimer() for _ in questions]
+        results: List[Optional[Dict]] = [None] * len(questions)
+        evaluate_now, evaluate_later = self.evaluation_plan(evaluate, defer_evaluation)
+        mode = mode or self.retrieval_mode
+        use_cache = mode != 'lexical' and self.use_cache(limit, top_k)
+        scope = self.cache_scope(mode, adaptive) if use_cache else None
+        limit, top_k = limit or DEFAULT_LIMIT, top_k or DEFAULT_TOP_K
+        
+        # 1. One embedding request for the whole batch (no deadline fallback here)
+        embeddings = [None] * len(questions)
+        if mode != 'lexical':
+            with batch.stage('embedding', dependency='openai'):
+                embeddings = self.embedder.embed(questions)
+        
+        pending = list(range(len(questions)))
+        if use_cache:
+            with batch.stage('cache_lookup', dependency='cache'):
+                cached = [
+                    self.lookup_cache(questions[i], embeddings[i], scope, evaluate_now, evaluate_later)
+                    for i in pending
+                ]
+            for i, hit in zip(pending, cached):
+                if hit:
+                    results[i] = {**hit, 'timings': {**batch.timings, **timers[i].finish()}}
+            pending = [i for i in pending if results[i] is None]
+        if not pending:
+            return results
+        
+        # 2. Batched search, then one rerank pass over every question's candidates
+        pending_questions = [questions[i] for i in pending]
+        with batch.stage('search', dependency='vector_store'):
+            search_results = self.search_candidates_batch(
+                pending_questions, [embeddings[i] for i in pending], limit, evaluate, mode
             )
+        retrieved = self.rerank_batch(
+            pending_questions, [self.format_documents(hits) for hits in search_results],
+            limit, top_k, adaptive, mode, batch
+        )
         
-        # 6. Compile results
-        result = {
-            'answer': answer,
-            'sources': [doc['title'] for doc in reranked_docs],
-            'num_docs_used': len(reranked_docs),
-            'reranked_docs': reranked_docs
-        }
+        # 3. Generate (and evaluate) concurrently
+        def answer(i: int, reranked_docs: List[Dict], retrieval: Dict) -> Dict:
+            timer = timers[i]
+            with timer.stage('generation', dependency='openai'):
+                generated = self.generate_answer(questions[i], reranked_docs)
+            result = self.finish_answer(
+                questions[i], generated, reranked_docs, retrieval, embeddings[i],
+                evaluate_now, evaluate_later, scope, timer
+            )
+            return {**result, 'timings': {**batch.timings, **timer.finish()}}
         
-        if evaluate:
-            result['evaluation'] = {
-                'retrieval_metrics': retrieval_metrics,
-                'answer_metrics': answer_metrics
-            }
+        workers = max(1, min(max_concurrency or self.batch_concurrency, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-generate") as pool:
+            futures = [pool.submit(answer, i, docs, retrieval) for i, (docs, retrieval) in zip(pending, retrieved)]
+            for i, future in zip(pending, futures):
+                results[i] = future.result()
+        return results
+    
+    def answer_question_stream(self, question: str, evaluate: bool = True, limit: Optional[int] = None,
+                               top_k: Optional[int] = None, adaptive: Optional[bool] = None,
+                               mode: Optional[str] = None,
+                               defer_evaluation: Optional[bool] = None) -> Iterator[Dict]:
+        """Streaming answer_question.
+
+        Yields events in order: 'sources', one 'token' per completion delta,
+        'evaluation' (when evaluated synchronously) and finally 'done', which
+        carries the per-stage timings and any deferred evaluation's ID.
+        """
+        timer = StageTimer()
+        evaluate_now, evaluate_later = self.evaluation_plan(evaluate, defer_evaluation)
+        with timer.stage('embedding', dependency='openai'):
+            query_embedding, mode = self.embed_query(question, mode)
+        use_cache = query_embedding is not None and self.use_cache(limit, top_k)
+        scope = self.cache_scope(mode, adaptive) if use_cache else None
         
-        return result
+        if use_cache:
+            with timer.stage('cache_lookup', dependency='cache'):
+                cached = self.lookup_cache(question, query_embedding, scope, evaluate_now, evaluate_later)
+            if cached:
+                yield from self.replay_result({**cached, 'timings': timer.finish()})
+                return
+        
+        reranked_docs, retrieval = self.retrieve_documents(
+            question, query_embedding, with_vectors=evaluate, limit=limit, top_k=top_k,
+            adaptive=adaptive, mode=mode, timer=timer
+        )
+        yield self.sources_event(reranked_docs, retrieval)
+        
+        tokens = []
+        with timer.stage('generation', dependency='openai'):
+            for token in self.stream_answer_tokens(question, reranked_docs):
+                tokens.append(token)
+                yield {'event': 'token', 'data': token}
+        
+        result = self.finish_answer(
+            question, "".join(tokens), reranked_docs, retrieval, query_embedding,
+            evaluate_now, evaluate_later, scope, timer
+        )
+        if evaluate_now:
+            yield {'event': 'evaluation', 'data': result['evaluation']}
+        yield self.done_event(result, timer.finish())
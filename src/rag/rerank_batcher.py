@@ -0,0 +1,126 @@
+from concurrent.futures import Future
+from collections import Counter
+from typing import Dict, List
+from .reranker import NewtonReranker
+from .metrics import RERANK_QUEUE_DEPTH, record_rerank_batch
+import threading
+import logging
+import queue
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+class RerankBatcher:
+    """Dynamic micro-batching in front of NewtonReranker.
+
+    Callers submit their (query, doc) pairs and get a Future back. A single
+    worker thread drains everything queued (up to max_batch_pairs), waits at
+    most max_wait_ms for stragglers, runs one forward pass and scatters the
+    scores back. At low load a request runs almost alone; under load the
+    requests that queue during one pass are scored together in the next.
+    Callers that gave up (cancelled Futures) are dropped before the pass.
+    Queue depth, queue wait and batch sizes are exported to Prometheus.
+    """
+    
+    def __init__(self, reranker: NewtonReranker, max_batch_pairs: int = None, max_wait_ms: float = None):
+        self.reranker = reranker
+        self.max_batch_pairs = max_batch_pairs or int(os.getenv('RERANK_BATCH_MAX_PAIRS', '128'))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None
+                         else float(os.getenv('RERANK_BATCH_WAIT_MS', '2'))) / 1000
+        # Upper bound on a blocking caller's wait, so a stuck worker can't hang requests
+        self.timeout = float(os.getenv('RERANK_BATCH_TIMEOUT_SECONDS', '30'))
+        self.queue = queue.Queue()
+        RERANK_QUEUE_DEPTH.set_function(self.queue.qsize)
+        
+        self.batches_run = 0
+        self.pairs_scored = 0
+        self.requests_in_batch = Counter()
+        self.last_batch_size = 0
+        
+        self.worker = threading.Thread(target=self.run, name="rerank-batcher", daemon=True)
+        self.worker.start()
+        logger.info(f"✓ Rerank batching enabled (max {self.max_batch_pairs} pairs, {self.max_wait * 1000:.1f} ms window)")
+    
+    def submit(self, pairs: List[tuple]) -> Future:
+        """Queue pairs for scoring; the Future resolves to their scores in order"""
+        future = Future()
+        if not pairs:
+            future.set_result([])
+        else:
+            self.queue.put((pairs, future, time.monotonic()))
+        return future
+    
+    def predict(self, pairs: List[tuple]):
+        """Drop-in replacement for NewtonReranker.predict"""
+        return self.submit(pairs).result(timeout=self.timeout)
+    
+    def rerank_documents(self, query: str, documents: List[Dict], top_k: int = 5) -> List[Dict]:
+        """Drop-in replacement for NewtonReranker.rerank_documents"""
+        if not documents:
+            return []
+        scores = self.submit([(query, doc['text']) for doc in documents]).result(timeout=self.timeout)
+        return self.reranker.select_top(documents, scores, top_k)
+    
+    def collect(self) -> List[tuple]:
+        batch = [self.queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        
+        while size < self.max_batch_pairs:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self.queue.get_nowait() if timeout <= 0 else self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+    
+    def run(self):
+        # The worker must outlive any single batch, or every later caller waits forever
+        while True:
+            try:
+                self.run_batch(self.collect())
+            except Exception as e:
+                logger.error(f"Rerank batch failed: {e}")
+    
+    def run_batch(self, batch: List[tuple]):
+        # Cancelled requests are skipped; the rest are marked running and can no longer be cancelled
+        started = time.monotonic()
+        running = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        cancelled = len(batch) - len(running)
+        batch = running
+        pairs = [pair for request_pairs, _, _ in batch for pair in request_pairs]
+        waits = [started - queued_at for _, _, queued_at in batch]
+        if not batch:
+            record_rerank_batch(0, waits, cancelled)
+            return
+        try:
+            scores = self.reranker.predict(pairs)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            record_rerank_batch(len(pairs), waits, cancelled, failed=True)
+            return
+        record_rerank_batch(len(pairs), waits, cancelled)
+        
+        offset = 0
+        for request_pairs, future, _ in batch:
+            future.set_result(scores[offset:offset + len(request_pairs)])
+            offset += len(request_pairs)
+        
+        self.batches_run += 1
+        self.pairs_scored += len(pairs)
+        self.requests_in_batch[len(batch)] += 1
+        self.last_batch_size = len(pairs)
+    
+    def stats(self) -> Dict:
+        return {
+            'queue_depth': self.queue.qsize(),
+            'batches_run': self.batches_run,
+            'pairs_scored': self.pairs_scored,
+            'avg_batch_pairs': self.pairs_scored / self.batches_run if self.batches_run else 0.0,
+            'last_batch_pairs': self.last_batch_size,
+            'requests_per_batch': dict(sorted(self.requests_in_batch.items()))
+        }
@@ -1,29 +1,101 @@
-from sentence_transformers import CrossEncoder
-from typing import List, Dict
+from typing import List, Dict, Optional
+import numpy as np
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 class NewtonReranker:
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
-        self.reranker = CrossEncoder(model_name)
-        logger.info(f"✓ Loaded reranker model: {model_name}")
+    """Cross-encoder reranker with selectable CPU inference backends.
+
+    backend: 'torch' (fp32, the original path), 'torch-int8' (dynamic int8
+    quantization of the Linear layers) or 'onnx' (ONNX Runtime, optionally a
+    pre-quantized model file via onnx_file). A ready cross_encoder can be
+    passed instead of loading one.
+    """
+    
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 backend: Optional[str] = None, onnx_file: Optional[str] = None,
+                 num_threads: Optional[int] = None, max_length: Optional[int] = None,
+                 batch_size: Optional[int] = None, cross_encoder=None):
+        self.backend = (backend or os.getenv('RERANKER_BACKEND', 'torch')).lower()
+        onnx_file = onnx_file or os.getenv('RERANKER_ONNX_FILE')
+        num_threads = num_threads or int(os.getenv('RERANKER_THREADS', '0')) or None
+        # Token budget for the (query, document) pair; the tokenizer truncates the document side
+        self.max_length = max_length or int(os.getenv('RERANKER_MAX_LENGTH', '512'))
+        self.batch_size = batch_size or int(os.getenv('RERANKER_BATCH_SIZE', '16'))
+        
+        if cross_encoder is not None:
+            # Pre-built model (or a stand-in exposing predict)
+            self.reranker = cross_encoder
+            logger.info(f"✓ Using provided reranker model ({type(cross_encoder).__name__})")
+            return
+        
+        # Imported here: sentence-transformers pulls in torch, which takes seconds
+        from sentence_transformers import CrossEncoder
+        if self.backend == 'onnx':
+            model_kwargs = {'provider': 'CPUExecutionProvider'}
+            if onnx_file:
+                model_kwargs['file_name'] = onnx_file
+            if num_threads:
+                import onnxruntime
+                session_options = onnxruntime.SessionOptions()
+                session_options.intra_op_num_threads = num_threads
+                model_kwargs['session_options'] = session_options
+            self.reranker = CrossEncoder(
+                model_name, max_length=self.max_length, backend='onnx', model_kwargs=model_kwargs
+            )
+        else:
+            import torch
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self.reranker = CrossEncoder(model_name, max_length=self.max_length)
+            if self.backend == 'torch-int8':
+                self.reranker.model = torch.quantization.quantize_dynamic(
+                    self.reranker.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+        
+        logger.info(f"✓ Loaded reranker model: {model_name} ({self.backend})")
+    
+    def predict(self, pairs: List[tuple]) -> np.ndarray:
+        """Score pairs in length-bucketed batches.
+
+        Sorting by length before batching keeps padding inside each batch
+        small; scores are returned in the input order. Character length is
+        close enough to token length for bucketing, and avoids tokenizing
+        every pair twice.
+        """
+        if not pairs:
+            return np.array([])
+        lengths = [len(query) + len(text) for query, text in pairs]
+        order = np.argsort(lengths, kind='stable')
+        
+        sorted_scores = self.reranker.predict(
+            [pairs[i] for i in order], batch_size=self.batch_size, show_progress_bar=False
+        )
+        scores = np.empty(len(pairs), dtype=np.float32)
+        scores[order] = sorted_scores
+        return scores
     
     def rerank_documents(self, query: str, documents: List[Dict], top_k: int = 5) -> List[Dict]:
         """Rerank documents by query-document relevance"""
         if not documents:
             return []
         
-        # Create query-document pairs
-        pairs = [(query, doc['text'][:512]) for doc in documents]
+        # Create query-document pairs; truncation happens in tokens, not characters
+        pairs = [(query, doc['text']) for doc in documents]
         
         # Get relevance scores
-        scores = self.reranker.predict(pairs)
+        scores = self.predict(pairs)
         
+        return self.select_top(documents, scores, top_k)
+    
+    @staticmethod
+    def select_top(documents: List[Dict], scores, top_k: int) -> List[Dict]:
         # Sort by relevance score
         scored_docs = [(doc, score) for doc, score in zip(documents, scores)]
         scored_docs.sort(key=lambda x: x[1], reverse=True)
         
         reranked_docs = [doc for doc, _ in scored_docs[:top_k]]
         logger.info(f"✓ Reranked {len(documents)} docs to top {top_k}")
-        return reranked_docs
\ No newline at end of file
+        return reranked_docs
@@ -0,0 +1,324 @@
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import threading
+import logging
+import json
+import time
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+class InMemoryCacheBackend:
+    """Per-process backend: LRU ordered dict plus a matrix of normalized query vectors.
+
+    The matrix is allocated once for `max_entries` rows. Inserts write the
+    vector into a free row and evictions hand their row back, so a lookup is
+    a single matmul over the rows in use. Every entry belongs to a scope;
+    lookups only match rows of their own.
+    """
+    
+    is_remote = False
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # id -> (row, value, expires_at, scope)
+        # Insertion order is expiry order, since every entry gets the same TTL
+        self.expiries = deque()  # (expires_at, id)
+        self.matrix: Optional[np.ndarray] = None
+        self.row_ids: List[Optional[str]] = []
+        # Scope code per row; -1 marks a free row
+        self.row_scopes = np.full(max_entries, -1, dtype=np.int32)
+        self.scope_codes: Dict[str, int] = {}
+        self.free_rows: List[int] = []
+        self.used_rows = 0
+        self.lock = threading.Lock()
+        self.evictions = 0
+    
+    def lookup(self, vector: np.ndarray, threshold: float, scope: str = '') -> Optional[Tuple[Dict, float]]:
+        with self.lock:
+            self._drop_expired()
+            code = self.scope_codes.get(scope)
+            if code is None or not self.entries or vector.shape[0] != self.matrix.shape[1]:
+                return None
+            similarities = self.matrix[:self.used_rows] @ vector
+            similarities[self.row_scopes[:self.used_rows] != code] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            entry_id = self.row_ids[best]
+            self.entries.move_to_end(entry_id)
+            return self.entries[entry_id][1], float(similarities[best])
+    
+    def store(self, vector: np.ndarray, value: Dict, scope: str = '', entry_id: Optional[str] = None):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            if entry_id in self.entries:
+                return
+            if self.matrix is None or self.matrix.shape[1] != vector.shape[0]:
+                # First entry, or the embedding size changed: start over at this width
+                self._reset(vector.shape[0])
+            while len(self.entries) >= self.max_entries:
+                _, entry = self.entries.popitem(last=False)
+                self._free(entry[0])
+                self.evictions += 1
+            row = self.free_rows.pop() if self.free_rows else self._grow()
+            entry_id = entry_id or uuid.uuid4().hex
+            expires_at = time.time() + self.ttl_seconds
+            self.matrix[row] = vector
+            self.row_ids[row] = entry_id
+            self.row_scopes[row] = self.scope_codes.setdefault(scope, len(self.scope_codes))
+            self.entries[entry_id] = (row, value, expires_at, scope)
+            self.expiries.append((expires_at, entry_id))
+    
+    def discard(self, entry_id: str):
+        with self.lock:
+            entry = self.entries.pop(entry_id, None)
+            if entry is not None:
+                self._free(entry[0])
+    
+    def clear(self):
+        with self.lock:
+            self._reset(self.matrix.shape[1] if self.matrix is not None else 0)
+    
+    def drop_local(self):
+        """Free this process's copy of the entries; here that is all of them"""
+        self.clear()
+    
+    def size(self) -> int:
+        return len(self.entries)
+    
+    def _reset(self, dimensions: int):
+        self.entries.clear()
+        self.expiries.clear()
+        self.matrix = np.zeros((self.max_entries, dimensions), dtype=np.float32) if dimensions else None
+        self.row_ids = [None] * self.max_entries
+        self.row_scopes.fill(-1)
+        self.scope_codes.clear()
+        self.free_rows = []
+        self.used_rows = 0
+    
+    def _grow(self) -> int:
+        self.used_rows += 1
+        return self.used_rows - 1
+    
+    def _free(self, row: int):
+        """Hand a removed entry's row back for the next insert"""
+        self.row_ids[row] = None
+        self.row_scopes[row] = -1
+        self.free_rows.append(row)
+    
+    def _drop_expired(self):
+        now = time.time()
+        while self.expiries and self.expiries[0][0] <= now:
+            _, entry_id = self.expiries.popleft()
+            entry = self.entries.pop(entry_id, None)
+            if entry is not None:
+                self._free(entry[0])
+
+class RedisCacheBackend:
+    """Shared backend so several API workers reuse each other's answers.
+
+    Entries live under a generation number and their scope: the answer as
+    JSON, the vector as float32 bytes, and two sorted sets (last use, for LRU
+    eviction, and insertion time). Each worker mirrors the vectors in a local
+    InMemoryCacheBackend and only fetches the entries added since its last
+    lookup, so a lookup is one local matmul plus a GET of the matched answer.
+    Invalidating bumps the generation, which orphans every old entry at once
+    (they then age out through their TTL).
+    """
+    
+    is_remote = True
+    
+    def __init__(self, url: str, max_entries: int = 1000, ttl_seconds: float = 3600,
+                 prefix: str = "newton:semcache", client=None):
+        if client is None:
+            import redis  # optional dependency, only needed for the shared backend
+            client = redis.Redis.from_url(url)
+        
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self.evictions = 0
+        
+        self.mirror = InMemoryCacheBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.mirror_generation = None
+        # Scope -> insertion time of the newest entry mirrored
+        self.synced: Dict[str, float] = {}
+        self.lock = threading.Lock()
+    
+    def _base(self, scope: str) -> str:
+        generation = int(self.client.get(f"{self.prefix}:generation") or 0)
+        with self.lock:
+            if generation != self.mirror_generation:
+                self.mirror_generation = generation
+                self._drop_mirror()
+        return f"{self.prefix}:{generation}:{scope}"
+    
+    def _sync(self, base: str, scope: str):
+        """Mirror the vectors other workers added to this scope since the last sync"""
+        added = self.client.zrangebyscore(f"{base}:added", self.synced.get(scope, 0), '+inf', withscores=True)
+        fresh = [(entry_id.decode(), at) for entry_id, at in added if entry_id.decode() not in self.mirror.entries]
+        if not fresh:
+            return
+        blobs = self.client.mget([f"{base}:vector:{entry_id}" for entry_id, _ in fresh])
+        for (entry_id, _), blob in zip(fresh, blobs):
+            if blob is not None:
+                self.mirror.store(np.frombuffer(blob, dtype=np.float32), entry_id, scope, entry_id=entry_id)
+        with self.lock:
+            self.synced[scope] = max(self.synced.get(scope, 0), max(at for _, at in fresh))
+    
+    def _forget(self, base: str, entry_ids: List[str]):
+        self.client.zrem(f"{base}:lru", *entry_ids)
+        self.client.zrem(f"{base}:added", *entry_ids)
+        self.client.delete(*[f"{base}:{kind}:{entry_id}" for entry_id in entry_ids for kind in ('entry', 'vector')])
+        for entry_id in entry_ids:
+            self.mirror.discard(entry_id)
+    
+    def lookup(self, vector: np.ndarray, threshold: float, scope: str = '') -> Optional[Tuple[Dict, float]]:
+        base = self._base(scope)
+        self._sync(base, scope)
+        while True:
+            found = self.mirror.lookup(vector, threshold, scope)
+            if found is None:
+                return None
+            entry_id, similarity = found
+            blob = self.client.get(f"{base}:entry:{entry_id}")
+            if blob is None:
+                # Expired, or evicted by another worker
+                self._forget(base, [entry_id])
+                continue
+            self.client.zadd(f"{base}:lru", {entry_id: time.time()})
+            return json.loads(blob), similarity
+    
+    def store(self, vector: np.ndarray, value: Dict, scope: str = ''):
+        base = self._base(scope)
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        
+        pipe = self.client.pipeline()
+        pipe.set(f"{base}:entry:{entry_id}", json.dumps(value), ex=self.ttl_seconds)
+        pipe.set(f"{base}:vector:{entry_id}", vector.astype(np.float32).tobytes(), ex=self.ttl_seconds)
+        pipe.zadd(f"{base}:lru", {entry_id: now})
+        pipe.zadd(f"{base}:added", {entry_id: now})
+        pipe.expire(f"{base}:lru", self.ttl_seconds)
+        pipe.expire(f"{base}:added", self.ttl_seconds)
+        pipe.execute()
+        self.mirror.store(vector, entry_id, scope, entry_id=entry_id)
+        
+        overflow = self.client.zcard(f"{base}:lru") - self.max_entries
+        if overflow > 0:
+            oldest = [entry_id.decode() for entry_id, _ in self.client.zpopmin(f"{base}:lru", overflow)]
+            self._forget(base, oldest)
+            self.evictions += len(oldest)
+    
+    def _drop_mirror(self):
+        self.mirror.clear()
+        self.synced.clear()
+    
+    def drop_local(self):
+        """Free this worker's mirror; entries are fetched again on the next lookup"""
+        with self.lock:
+            self._drop_mirror()
+    
+    def clear(self):
+        self.client.incr(f"{self.prefix}:generation")
+        self.drop_local()
+    
+    def size(self) -> int:
+        generation = int(self.client.get(f"{self.prefix}:generation") or 0)
+        return sum(self.client.zcard(key) for key in self.client.scan_iter(f"{self.prefix}:{generation}:*:lru"))
+
+class SemanticCache:
+    """Answer cache keyed on the query embedding.
+
+    A lookup hits when a cached question's embedding has cosine similarity
+    of at least `threshold` with the new one, so rephrasings of the same
+    question share one answer. Entries are scoped to the knowledge index
+    generation and the caller's retrieval settings (mode, adaptive), so a
+    rebuild seen by any worker, or a different retrieval path, never serves
+    an answer built another way.
+    """
+    
+    def __init__(self, backend=None, threshold: float = 0.95, generation=None):
+        self.backend = backend or InMemoryCacheBackend()
+        self.threshold = threshold
+        # IndexGeneration; None keeps every entry until it expires
+        self.generation = generation
+        # get() runs on several threads at once
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if generation is not None:
+            # Old generations can never hit again, so free their memory right away
+            generation.on_change(lambda _: self.backend.drop_local())
+    
+    @classmethod
+    def from_env(cls, generation=None) -> Optional["SemanticCache"]:
+        """Build the cache from SEMANTIC_CACHE_* settings; None when disabled"""
+        kind = os.getenv('SEMANTIC_CACHE_BACKEND', 'memory').lower()
+        max_entries = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '1000'))
+        ttl_seconds = float(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', '3600'))
+        threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+        
+        if kind in ('none', 'off', 'disabled'):
+            return None
+        if kind == 'redis':
+            backend = RedisCacheBackend(
+                os.getenv('SEMANTIC_CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+                max_entries=max_entries, ttl_seconds=ttl_seconds
+            )
+        else:
+            backend = InMemoryCacheBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        
+        logger.info(f"✓ Semantic cache enabled ({kind}, threshold={threshold})")
+        return cls(backend, threshold=threshold, generation=generation)
+    
+    def normalize(self, vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+    
+    def scoped(self, scope: str) -> str:
+        return f"g{self.generation.value}:{scope}" if self.generation is not None else scope
+    
+    def get(self, query_embedding: List[float], require_evaluation: bool = False,
+            scope: str = '') -> Optional[Dict]:
+        """Return a cached result for a similar enough question, or None"""
+        found = self.backend.lookup(self.normalize(query_embedding), self.threshold, self.scoped(scope))
+        if found is None or (require_evaluation and 'evaluation' not in found[0]):
+            with self.lock:
+                self.misses += 1
+            return None
+        
+        with self.lock:
+            self.hits += 1
+        result, similarity = found
+        logger.info(f"✓ Semantic cache hit (similarity {similarity:.3f})")
+        return {**result, 'cache': {'hit': True, 'similarity': similarity}}
+    
+    def put(self, query_embedding: List[float], result: Dict, scope: str = ''):
+        """Cache a result; its evaluation_id belongs to the request that produced it and is not stored"""
+        result = {key: value for key, value in result.items() if key != 'evaluation_id'}
+        self.backend.store(self.normalize(query_embedding), result, self.scoped(scope))
+    
+    def invalidate(self):
+        self.backend.clear()
+        logger.info("✓ Semantic cache invalidated")
+    
+    def stats(self) -> Dict:
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': self.backend.size(),
+            'evictions': self.backend.evictions,
+            'threshold': self.threshold,
+            'index_generation': self.generation.value if self.generation is not None else None
+        }
@@ -0,0 +1,77 @@
+from typing import Callable, Iterable, Iterator
+import threading
+import queue
+
+_END = object()
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+class StagedStream:
+    """Chains generator stages, each in its own thread, through bounded queues.
+
+    A stage is a function from an iterator of items to an iterator of items.
+    Each queue holds at most `maxsize` items, so a slow stage blocks the ones
+    before it (backpressure) and memory stays bounded by queue depth times
+    item size, however long the source is. Stages run concurrently; the last
+    stage's output is consumed by iterating the StagedStream. An exception in
+    any stage is re-raised to the consumer, and leaving the loop early stops
+    every stage.
+    """
+
+    def __init__(self, source: Iterable, stages: Iterable[Callable[[Iterator], Iterator]], maxsize: int = 4):
+        self.stop = threading.Event()
+        self.threads = []
+        upstream = iter(source)
+        for i, stage in enumerate([lambda items: items, *stages]):
+            output = queue.Queue(maxsize=maxsize)
+            thread = threading.Thread(
+                target=self._run, args=(stage, upstream, output), name=f"stage-{i}", daemon=True
+            )
+            self.threads.append(thread)
+            upstream = self._drain(output)
+        self.output = upstream
+
+    def _put(self, output: queue.Queue, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, source: queue.Queue) -> Iterator:
+        while True:
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def _run(self, stage: Callable[[Iterator], Iterator], upstream: Iterator, output: queue.Queue):
+        try:
+            for item in stage(upstream):
+                if not self._put(output, item):
+                    return
+            self._put(output, _END)
+        except BaseException as e:
+            # Hand the error downstream so the consumer sees it
+            self._put(output, _Failure(e))
+
+    def __iter__(self) -> Iterator:
+        for thread in self.threads:
+            thread.start()
+        try:
+            yield from self.output
+        finally:
+            self.stop.set()
+            for thread in self.threads:
+                thread.join(timeout=5)
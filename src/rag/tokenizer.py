@@ -0,0 +1,51 @@
+import threading
+import logging
+import math
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# text-embedding-3-* and gpt-4o-mini token budgets are what we size against
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Loaded encodings are kept for the life of the process; a failed load (no
+# tiktoken, BPE download error) is retried once this many seconds have passed
+RETRY_SECONDS = float(os.getenv('TOKENIZER_RETRY_SECONDS', '300'))
+
+_encodings = {}
+_failed_at = {}
+_lock = threading.Lock()
+
+def get_encoding(model: str = EMBEDDING_MODEL):
+    """tiktoken encoding for a model, or None when tiktoken or its BPE file is unavailable"""
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    with _lock:
+        if model in _encodings:
+            return _encodings[model]
+        failed_at = _failed_at.get(model)
+        if failed_at is not None and time.monotonic() - failed_at < RETRY_SECONDS:
+            return None
+        try:
+            import tiktoken
+            encoding = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            _failed_at[model] = time.monotonic()
+            logger.warning(f"Tokenizer for {model} unavailable ({e}); estimating token counts")
+            return None
+        _failed_at.pop(model, None)
+        _encodings[model] = encoding
+        return encoding
+
+def counts_exactly(model: str = EMBEDDING_MODEL) -> bool:
+    """Whether count_tokens currently uses the model tokenizer rather than the estimate"""
+    return get_encoding(model) is not None
+
+def count_tokens(text: str, model: str = EMBEDDING_MODEL) -> int:
+    """Exact token count with the model tokenizer, ~4 chars/token estimate otherwise"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,60 @@
+from qdrant_client.models import (
+    VectorParams, Distance, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, SearchParams, QuantizationSearchParams
+)
+from typing import Optional, Union
+import os
+
+# Native size of text-embedding-3-small vectors
+FULL_DIMENSIONS = 1536
+
+QUANTIZATION_MODES = ('none', 'scalar', 'binary')
+
+# Candidates fetched per result before rescoring with the original vectors;
+# binary codes are much coarser, so they need a deeper candidate list
+DEFAULT_OVERSAMPLING = {'scalar': 2.0, 'binary': 3.0}
+
+def embedding_dimensions() -> Optional[int]:
+    """EMBEDDING_DIMENSIONS: shortened text-embedding-3 vectors (e.g. 512 or 256); unset keeps the full 1536"""
+    value = os.getenv('EMBEDDING_DIMENSIONS', '').strip()
+    return int(value) if value else None
+
+def vector_size() -> int:
+    return embedding_dimensions() or FULL_DIMENSIONS
+
+def quantization_mode() -> str:
+    """VECTOR_QUANTIZATION: 'none' (default), 'scalar' (int8) or 'binary' (1 bit per dimension)"""
+    mode = os.getenv('VECTOR_QUANTIZATION', 'none').lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"VECTOR_QUANTIZATION must be one of {', '.join(QUANTIZATION_MODES)}, got {mode!r}")
+    return mode
+
+def originals_on_disk(mode: Optional[str] = None) -> bool:
+    """VECTOR_ON_DISK: keep full vectors on disk; defaults to true when quantized codes serve the search"""
+    mode = mode or quantization_mode()
+    return os.getenv('VECTOR_ON_DISK', 'true' if mode != 'none' else 'false').lower() == 'true'
+
+def vectors_config(size: Optional[int] = None, mode: Optional[str] = None) -> VectorParams:
+    mode = mode or quantization_mode()
+    return VectorParams(size=size or vector_size(), distance=Distance.COSINE, on_disk=originals_on_disk(mode))
+
+def quantization_config(mode: Optional[str] = None) -> Optional[Union[ScalarQuantization, BinaryQuantization]]:
+    """Quantized codes stay in RAM; the originals are only read to rescore candidates"""
+    mode = mode or quantization_mode()
+    if mode == 'scalar':
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if mode == 'binary':
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def search_params(mode: Optional[str] = None, oversampling: Optional[float] = None,
+                  rescore: Optional[bool] = None) -> Optional[SearchParams]:
+    """SEARCH_OVERSAMPLING / SEARCH_RESCORE for quantized collections; None searches with defaults"""
+    mode = mode or quantization_mode()
+    if mode == 'none':
+        return None
+    if oversampling is None:
+        oversampling = float(os.getenv('SEARCH_OVERSAMPLING', DEFAULT_OVERSAMPLING[mode]))
+    if rescore is None:
+        rescore = os.getenv('SEARCH_RESCORE', 'true').lower() == 'true'
+    return SearchParams(quantization=QuantizationSearchParams(rescore=rescore, oversampling=oversampling))
@@ -1,23 +1,106 @@
-from qdrant_client import QdrantClient
-from typing import List
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import QueryRequest, SearchParams
+from .clients import get_qdrant_client, get_async_qdrant_client
+from .local_vector_index import load_local_backend
+from .vector_config import search_params
+from typing import List, Optional
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
-class NewtonVectorStore:
-    def __init__(self):
-        self.client = QdrantClient(url=os.getenv("QDRANT_CLOUD_URL"), 
-        api_key=os.getenv("QDRANT_APIKEY")
+class QdrantVectorBackend:
+    """Remote search against the Qdrant collection.
+
+    On a quantized collection, search_params set the oversampling and
+    rescoring (VECTOR_QUANTIZATION, SEARCH_OVERSAMPLING, SEARCH_RESCORE).
+    """
+    
+    def __init__(self, client: QdrantClient, collection_name: str, params: Optional[SearchParams] = None):
+        self.client = client
+        self.collection_name = collection_name
+        self.params = params if params is not None else search_params()
+    
+    def search(self, query_vector: List[float], limit: int = 20, with_vectors: bool = False):
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            limit=limit,
+            with_vectors=with_vectors,
+            search_params=self.params
+        ).points
+    
+    def search_batch(self, query_vectors: List[List[float]], limit: int = 20, with_vectors: bool = False):
+        """One round trip for many queries (Qdrant batch query API)"""
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=batch_requests(query_vectors, limit, with_vectors, self.params)
         )
+        return [response.points for response in responses]
+
+def batch_requests(query_vectors: List[List[float]], limit: int, with_vectors: bool,
+                   params: Optional[SearchParams] = None) -> List[QueryRequest]:
+    return [
+        QueryRequest(query=vector, limit=limit, with_payload=True, with_vector=with_vectors, params=params)
+        for vector in query_vectors
+    ]
+
+def vector_backend_name() -> str:
+    """VECTOR_BACKEND: 'qdrant' (default) or 'local' for in-process exact search"""
+    return os.getenv('VECTOR_BACKEND', 'qdrant').lower()
+
+class NewtonVectorStore:
+    def __init__(self, backend=None, client: QdrantClient = None):
+        self.client = client or get_qdrant_client()
+
+        self.collection_name = "newton_knowledge"
+        
+        if backend is None:
+            if vector_backend_name() == 'local':
+                backend = load_local_backend(self.client, self.collection_name)
+            else:
+                backend = QdrantVectorBackend(self.client, self.collection_name)
+        self.backend = backend
+        logger.info(f"✓ Vector search backend: {type(backend).__name__}")
+    
+    def search(self, query_vector: List[float], limit: int = 20, with_vectors: bool = False):
+        """Search for similar vectors"""
+        return self.backend.search(query_vector, limit=limit, with_vectors=with_vectors)
+    
+    def search_batch(self, query_vectors: List[List[float]], limit: int = 20, with_vectors: bool = False):
+        """Search for many query vectors at once; one result list per query"""
+        return self.backend.search_batch(query_vectors, limit=limit, with_vectors=with_vectors)
+
+class AsyncNewtonVectorStore:
+    def __init__(self, local_store: Optional[NewtonVectorStore] = None, client: AsyncQdrantClient = None):
+        self.client = client or get_async_qdrant_client()
 
         self.collection_name = "newton_knowledge"
-        logger.info("✓ Connected to Qdrant Cloud for vector search")
+        # The local backend is sub-millisecond, so it is called inline; it is
+        # read from the sync store on every search so reloads are picked up
+        self.local_store = local_store
+        self.params = search_params()
+        logger.info("✓ Connected to Qdrant Cloud for async vector search")
     
-    def search(self, query_vector: List[float], limit: int = 20):
-        """Search for similar vectors in Qdrant"""
-        return self.client.search(
+    async def search(self, query_vector: List[float], limit: int = 20, with_vectors: bool = False):
+        """Search for similar vectors without blocking the event loop"""
+        if self.local_store is not None:
+            return self.local_store.backend.search(query_vector, limit=limit, with_vectors=with_vectors)
+        response = await self.client.query_points(
             collection_name=self.collection_name,
-            query_vector=query_vector,
-            limit=limit
-        )
\ No newline at end of file
+            query=query_vector,
+            limit=limit,
+            with_vectors=with_vectors,
+            search_params=self.params
+        )
+        return response.points
+    
+    async def search_batch(self, query_vectors: List[List[float]], limit: int = 20, with_vectors: bool = False):
+        """Async version of NewtonVectorStore.search_batch"""
+        if self.local_store is not None:
+            return self.local_store.backend.search_batch(query_vectors, limit=limit, with_vectors=with_vectors)
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=batch_requests(query_vectors, limit, with_vectors, self.params)
+        )
+        return [response.points for response in responses]
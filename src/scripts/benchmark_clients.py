@@ -0,0 +1,90 @@
+"""Per-call latency with a new client per call (cold connection) vs the shared pooled clients.
+
+For Qdrant, the REST and gRPC transports are both measured. Dependencies
+without credentials are reported as unavailable.
+
+    python src/scripts/benchmark_clients.py --calls 20
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rag.clients import (
+    create_openai_client, get_openai_client, get_mongo_client, mongo_settings, qdrant_settings
+)
+from qdrant_client import QdrantClient
+from pymongo import MongoClient
+from typing import Callable, List
+from dotenv import load_dotenv
+import numpy as np
+import argparse
+import time
+
+load_dotenv()
+
+COLLECTION = "newton_knowledge"
+
+def time_calls(call: Callable, calls: int) -> List[float]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(name: str, call: Callable, calls: int):
+    try:
+        # Untimed first call: opens the shared clients' connections
+        call()
+        timings = time_calls(call, calls)
+    except Exception as e:
+        print(f"{name:<28} unavailable: {str(e).splitlines()[0][:80]}")
+        return
+    print(f"{name:<28} {np.median(timings):>9.1f} {np.percentile(timings, 95):>9.1f}")
+
+def embed(client):
+    client.embeddings.create(input="Isaac Newton", model="text-embedding-3-small")
+
+def qdrant_client(prefer_grpc: bool) -> QdrantClient:
+    return QdrantClient(**{**qdrant_settings(), 'prefer_grpc': prefer_grpc})
+
+def qdrant_lookup(client: QdrantClient):
+    client.scroll(COLLECTION, limit=1, with_payload=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call latency of fresh vs shared clients")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"🔍 {args.calls} calls each")
+    print(f"{'':<28} {'p50 ms':>9} {'p95 ms':>9}")
+
+    if os.getenv('OPENAI_API_KEY'):
+        report("openai fresh client", lambda: embed(create_openai_client()), args.calls)
+        report("openai shared client", lambda: embed(get_openai_client()), args.calls)
+    else:
+        print(f"{'openai':<28} unavailable: OPENAI_API_KEY not set")
+
+    if os.getenv('QDRANT_CLOUD_URL'):
+        for transport, prefer_grpc in (("rest", False), ("grpc", True)):
+            report(f"qdrant {transport} fresh client",
+                   lambda: qdrant_lookup(qdrant_client(prefer_grpc)), args.calls)
+            shared = qdrant_client(prefer_grpc)
+            report(f"qdrant {transport} shared client", lambda: qdrant_lookup(shared), args.calls)
+    else:
+        print(f"{'qdrant':<28} unavailable: QDRANT_CLOUD_URL not set")
+
+    if os.getenv('MONGO_URI'):
+        def fresh_ping():
+            client = MongoClient(os.getenv('MONGO_URI'), **mongo_settings())
+            try:
+                client.admin.command('ping')
+            finally:
+                client.close()
+        report("mongo fresh client", fresh_ping, args.calls)
+        report("mongo shared client", lambda: get_mongo_client().admin.command('ping'), args.calls)
+    else:
+        print(f"{'mongo':<28} unavailable: MONGO_URI not set")
+
+if __name__ == "__main__":
+    main()
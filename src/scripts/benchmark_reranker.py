@@ -0,0 +1,101 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rag.reranker import NewtonReranker
+from sentence_transformers import CrossEncoder
+import numpy as np
+import argparse
+import random
+import time
+
+MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+QUERIES = [
+    "Who was Isaac Newton?",
+    "What did Newton contribute to calculus?",
+    "Explain Newton's laws of motion",
+    "What were Newton's key discoveries in optics?",
+    "How did Newton develop the theory of universal gravitation?",
+    "What is the Principia Mathematica about?",
+]
+
+SENTENCES = [
+    "Isaac Newton was an English polymath active as a mathematician, physicist and astronomer.",
+    "The Principia formulated the laws of motion and universal gravitation.",
+    "Newton built the first practical reflecting telescope.",
+    "He developed a theory of colour based on the observation that a prism separates white light.",
+    "Newton shares credit with Gottfried Wilhelm Leibniz for developing infinitesimal calculus.",
+    "He was a fellow of Trinity College and the second Lucasian Professor of Mathematics at Cambridge.",
+    "Newton served as Warden and later Master of the Royal Mint.",
+    "His work on the binomial series and the method of fluxions predates publication by decades.",
+    "Opticks was published in 1704 and described experiments on refraction and diffraction.",
+    "Newton was president of the Royal Society from 1703 until his death in 1727.",
+]
+
+def make_documents(count: int, seed: int = 0):
+    """Synthetic passages of varying length, similar to pipeline chunks"""
+    rng = random.Random(seed)
+    return [
+        {'text': " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 12))), 'title': f"doc {i}"}
+        for i in range(count)
+    ]
+
+def baseline_scores(model: CrossEncoder, query: str, docs):
+    """The original path: fp32 torch, 512-character truncation, one predict call"""
+    return model.predict([(query, doc['text'][:512]) for doc in docs], show_progress_bar=False)
+
+def time_call(fn, repeats: int):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 95))
+
+def top_k_overlap(a, b, k: int) -> float:
+    return len(set(np.argsort(-a)[:k]) & set(np.argsort(-b)[:k])) / k
+
+def spearman(a, b) -> float:
+    rank_a, rank_b = np.argsort(np.argsort(a)), np.argsort(np.argsort(b))
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare reranker inference backends")
+    parser.add_argument("--backends", default="torch,torch-int8,onnx")
+    parser.add_argument("--onnx-file", default=None, help="e.g. onnx/model_qint8_avx512_vnni.onnx")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    
+    docs = make_documents(args.docs)
+    baseline = CrossEncoder(MODEL_NAME)
+    reference = {q: np.asarray(baseline_scores(baseline, q, docs)) for q in QUERIES}
+    p50, p95 = time_call(lambda: [baseline_scores(baseline, q, docs) for q in QUERIES], args.repeats)
+    
+    print(f"🔍 Reranking {args.docs} docs for {len(QUERIES)} queries, {args.repeats} repeats")
+    print(f"{'backend':<12} {'p50 ms':>9} {'p95 ms':>9} {'top5 agree':>11} {'spearman':>9}")
+    print(f"{'baseline':<12} {p50:>9.1f} {p95:>9.1f} {1.0:>11.2f} {1.0:>9.3f}")
+    
+    for backend in args.backends.split(","):
+        try:
+            reranker = NewtonReranker(
+                MODEL_NAME, backend=backend, onnx_file=args.onnx_file if backend == "onnx" else None,
+                num_threads=args.threads
+            )
+        except Exception as e:
+            print(f"{backend:<12} unavailable: {e}")
+            continue
+        
+        scores = {q: reranker.predict([(q, doc['text']) for doc in docs]) for q in QUERIES}
+        p50, p95 = time_call(
+            lambda: [reranker.predict([(q, doc['text']) for doc in docs]) for q in QUERIES], args.repeats
+        )
+        agreement = np.mean([top_k_overlap(reference[q], scores[q], 5) for q in QUERIES])
+        correlation = np.mean([spearman(reference[q], scores[q]) for q in QUERIES])
+        print(f"{backend:<12} {p50:>9.1f} {p95:>9.1f} {agreement:>11.2f} {correlation:>9.3f}")
+
+if __name__ == "__main__":
+    main()
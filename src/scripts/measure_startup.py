@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import subprocess
+import json
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODULES = [
+    "openai",
+    "qdrant_client",
+    "torch",
+    "sentence_transformers",
+    "rag.newton_rag",
+    "rag.async_rag",
+    "api.newton_api",
+]
+
+IMPORT_SNIPPET = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start}}))
+"""
+
+STARTUP_SNIPPET = """
+import sys, time, json, asyncio
+sys.path.insert(0, {src!r})
+timings = {{}}
+start = time.perf_counter()
+from rag.async_rag import AsyncNewtonRAG
+timings['import'] = time.perf_counter() - start
+
+start = time.perf_counter()
+rag = AsyncNewtonRAG()
+timings['construct'] = time.perf_counter() - start
+
+async def run():
+    start = time.perf_counter()
+    steps = await rag.warmup()
+    timings['warmup'] = time.perf_counter() - start
+    timings['steps'] = steps
+    for question in ("Who was Isaac Newton?", "What is the Principia Mathematica about?"):
+        start = time.perf_counter()
+        await rag.answer_question(question, evaluate=False)
+        timings.setdefault('first_requests', []).append(time.perf_counter() - start)
+    await rag.aclose()
+
+asyncio.run(run())
+print(json.dumps(timings))
+"""
+
+def run_fresh(code: str) -> dict:
+    """Run a snippet in a new interpreter so nothing is already imported or cached"""
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if output.returncode != 0:
+        return {'error': output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'failed'}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and cold-start times")
+    parser.add_argument("--modules", default=",".join(MODULES))
+    parser.add_argument("--startup", action="store_true",
+                        help="Also build and warm up the RAG system (needs OpenAI and Qdrant credentials)")
+    args = parser.parse_args()
+    
+    print("🔍 Import time, each in a fresh interpreter")
+    for module in args.modules.split(","):
+        result = run_fresh(IMPORT_SNIPPET.format(src=SRC_DIR, module=module))
+        if 'error' in result:
+            print(f"{module:<24} unavailable: {result['error']}")
+        else:
+            print(f"{module:<24} {result['seconds'] * 1000:>9.0f} ms")
+    
+    if args.startup:
+        print("\n🔍 Cold start: construct, warm up, first two requests")
+        result = run_fresh(STARTUP_SNIPPET.format(src=SRC_DIR))
+        if 'error' in result:
+            print(f"failed: {result['error']}")
+            return
+        print(f"{'import':<24} {result['import'] * 1000:>9.0f} ms")
+        print(f"{'construct':<24} {result['construct'] * 1000:>9.0f} ms")
+        print(f"{'warmup':<24} {result['warmup'] * 1000:>9.0f} ms")
+        for step, info in result['steps'].items():
+            print(f"  {step:<22} {info.get('ms', 0):>9.0f} ms ({info['status']})")
+        for i, seconds in enumerate(result['first_requests'], 1):
+            print(f"{f'request {i}':<24} {seconds * 1000:>9.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -31,31 +31,31 @@ def test_newton_rag():
     
     print(f"\n🔍 Testing {len(test_questions)} questions...\n")
     
-    for i, question in enumerate(test_questions, 1):
+    # One batched embedding, search and rerank pass; answers are generated concurrently
+    try:
+        results = rag.answer_questions(test_questions, evaluate=True, defer_evaluation=False)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return
+    
+    for i, (question, result) in enumerate(zip(test_questions, results), 1):
         print(f"Question {i}: {question}")
         
-        try:
-            # Get answer with evaluation
-            result = rag.answer_question(question, evaluate=True)
-            
-            # Print answer
-            print(f"Answer: {result['answer'][:200]}...")
-            print(f"Sources: {', '.join(result['sources'])}")
-            print(f"Documents used: {result['num_docs_used']}")
-            
-            # Print evaluation metrics
-            if 'evaluation' in result:
-                eval_data = result['evaluation']
-                retrieval = eval_data['retrieval_metrics']
-                answer = eval_data['answer_metrics']
-                
-                print(f"📊 Metrics:")
-                print(f"   Retrieval Quality: {retrieval['avg_retrieval_similarity']:.3f}")
-                print(f"   Answer Grounding: {answer['grounding_score']:.3f}")
-                print(f"   Answer Relevance: {answer['answer_relevance']:.3f}")
+        # Print answer
+        print(f"Answer: {result['answer'][:200]}...")
+        print(f"Sources: {', '.join(result['sources'])}")
+        print(f"Documents used: {result['num_docs_used']}")
+        
+        # Print evaluation metrics
+        if 'evaluation' in result:
+            eval_data = result['evaluation']
+            retrieval = eval_data['retrieval_metrics']
+            answer = eval_data['answer_metrics']
             
-        except Exception as e:
-            print(f"❌ Error: {e}")
+            print(f"📊 Metrics:")
+            print(f"   Retrieval Quality: {retrieval['avg_retrieval_similarity']:.3f}")
+            print(f"   Answer Grounding: {answer['grounding_score']:.3f}")
+            print(f"   Answer Relevance: {answer['answer_relevance']:.3f}")
         
         print("-" * 80)
     
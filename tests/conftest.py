@@ -0,0 +1,82 @@
+import sys
+import os
+
+# Tests import the modules the way the app does, with src on the path
+# (and data_ingestion, whose modules import its models package directly)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'data_ingestion')))
+
+# No disk caches or shared services during tests
+os.environ.setdefault('EMBEDDING_CACHE_DISK', 'off')
+os.environ.setdefault('SEMANTIC_CACHE_BACKEND', 'none')
+os.environ.setdefault('RERANK_BATCHING', 'false')
+os.environ.setdefault('RETRIEVAL_MODE', 'dense')
+os.environ.setdefault('EVALUATION_MODE', 'sync')
+
+from types import SimpleNamespace
+import hashlib
+import pytest
+
+@pytest.fixture
+def mongo():
+    """mongomock client; its bulk_write predates current pymongo operation objects"""
+    mongomock = pytest.importorskip('mongomock')
+
+    def bulk_write(self, operations, ordered=True):
+        counts = SimpleNamespace(upserted_count=0, matched_count=0, modified_count=0)
+        for operation in operations:
+            result = self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+            counts.upserted_count += result.upserted_id is not None
+            counts.matched_count += result.matched_count
+            counts.modified_count += result.modified_count
+        return counts
+
+    original = mongomock.collection.Collection.bulk_write
+    mongomock.collection.Collection.bulk_write = bulk_write
+    yield mongomock.MongoClient()
+    mongomock.collection.Collection.bulk_write = original
+
+@pytest.fixture
+def pipeline(mongo):
+    """NewtonDataPipeline over mongomock, in-memory Qdrant and fake embeddings"""
+    from qdrant_client import QdrantClient
+    from benchmarks.fakes import FakeOpenAI
+    from rag.data_pipeline import NewtonDataPipeline
+    return NewtonDataPipeline(mongo_client=mongo, qdrant_client=QdrantClient(":memory:"), openai_client=FakeOpenAI())
+
+def store_page(mongo, title: str, url: str, content: str):
+    """Write a page the way SimpleStorage does"""
+    mongo.newton_ai.newton_content.update_one(
+        {'url': url},
+        {'$set': {'title': title, 'url': url, 'content': content,
+                  'content_hash': hashlib.sha256(content.encode('utf-8')).hexdigest()}},
+        upsert=True
+    )
+
+@pytest.fixture
+def rag(pipeline, mongo):
+    """EnhancedNewtonRAG over a small in-memory index, with fake models and evaluations in mongomock"""
+    from benchmarks.fakes import FakeCrossEncoder
+    from benchmarks.run_benchmarks import build_index, make_pages
+    from rag.vector_store import NewtonVectorStore, QdrantVectorBackend
+    from rag.reranker import NewtonReranker
+    from rag.evaluator import RAGEvaluator
+    from rag.evaluation_queue import EvaluationQueue
+    from rag.newton_rag import EnhancedNewtonRAG
+
+    chunks = [
+        chunk for page in make_pages(5)
+        for chunk in pipeline.chunk_text(pipeline.clean_text(page['content']), page['title'], page['url'])
+    ]
+    client = build_index(pipeline, chunks)
+    llm = pipeline.openai_client
+    evaluator = RAGEvaluator(llm)
+    engine = EnhancedNewtonRAG(
+        vector_store=NewtonVectorStore(backend=QdrantVectorBackend(client, "newton_knowledge"), client=client),
+        reranker=NewtonReranker(cross_encoder=FakeCrossEncoder()),
+        evaluator=evaluator,
+        llm=llm,
+        evaluation_queue=EvaluationQueue(evaluator, collection=mongo.newton_ai.newton_evaluations, workers=1)
+    )
+    yield engine
+    engine.evaluation_queue.close()
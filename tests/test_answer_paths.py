@@ -0,0 +1,64 @@
+from rag.embedding_cache import AsyncCachedEmbedder
+from rag.evaluator import AsyncRAGEvaluator
+from types import SimpleNamespace
+import asyncio
+
+QUESTION = "What did Newton contribute to calculus?"
+
+def stream_result(events):
+    events = list(events)
+    assert [event['event'] for event in events][0] == 'sources'
+    assert events[-1]['event'] == 'done'
+    return {
+        **events[0]['data'],
+        'answer': "".join(event['data'] for event in events if event['event'] == 'token'),
+        'evaluation': next((event['data'] for event in events if event['event'] == 'evaluation'), None),
+        'evaluation_id': events[-1]['data']['evaluation_id']
+    }
+
+def test_single_batch_and_stream_answers_agree(rag):
+    single = rag.answer_question(QUESTION, defer_evaluation=False)
+    batched = rag.answer_questions([QUESTION], defer_evaluation=False)[0]
+    streamed = stream_result(rag.answer_question_stream(QUESTION, defer_evaluation=False))
+
+    assert single['sources'] == batched['sources'] == streamed['sources']
+    assert single['source_urls'] == batched['source_urls'] == streamed['source_urls']
+    assert single['retrieval'] == batched['retrieval'] == streamed['retrieval']
+    assert single['answer'].split() == batched['answer'].split() == streamed['answer'].split()
+    assert single['evaluation'].keys() == batched['evaluation'].keys() == streamed['evaluation'].keys()
+    for result in (single, batched):
+        assert {'search', 'rerank', 'generation', 'evaluation', 'total'} <= result['timings'].keys()
+
+def test_deferred_evaluation_returns_an_id_on_every_path(rag):
+    results = [
+        rag.answer_question(QUESTION, defer_evaluation=True),
+        rag.answer_questions([QUESTION], defer_evaluation=True)[0],
+        stream_result(rag.answer_question_stream(QUESTION, defer_evaluation=True)),
+    ]
+    ids = [result['evaluation_id'] for result in results]
+    assert all(ids) and len(set(ids)) == 3
+    assert all(not result.get('evaluation') for result in results)
+
+def test_without_evaluation_nothing_is_evaluated(rag):
+    result = rag.answer_question(QUESTION, evaluate=False)
+    assert 'evaluation' not in result and 'evaluation_id' not in result
+    assert 'evaluation' not in result['timings']
+
+def test_async_evaluation_matches_sync_without_the_thread_pool(rag):
+    fake = rag.llm
+    async def embeddings_create(**kwargs):
+        return fake.embeddings.create(**kwargs)
+    async def completions_create(**kwargs):
+        return fake.chat.completions.create(**kwargs)
+    async_client = SimpleNamespace(
+        embeddings=SimpleNamespace(create=embeddings_create),
+        chat=SimpleNamespace(completions=SimpleNamespace(create=completions_create))
+    )
+
+    docs, _ = rag.retrieve_documents(QUESTION, rag.create_embedding(QUESTION), with_vectors=True)
+    answer = rag.generate_answer(QUESTION, docs)
+    expected = rag.evaluator.evaluate(QUESTION, answer, docs)
+    rag.evaluator.executor.shutdown()
+
+    evaluator = AsyncRAGEvaluator(rag.evaluator, async_client, AsyncCachedEmbedder(async_client))
+    assert asyncio.run(evaluator.evaluate(QUESTION, answer, docs)) == expected
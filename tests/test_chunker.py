@@ -0,0 +1,78 @@
+from rag.chunker import TokenChunker, clean_text, split_sentences
+from rag.tokenizer import count_tokens
+from rag import tokenizer
+from benchmarks.run_benchmarks import make_pages
+import types
+import sys
+import pytest
+
+TEXT = clean_text(make_pages(1, seed=7)[0]['content'])
+
+def test_clean_text_collapses_whitespace_and_drops_symbols():
+    assert clean_text("  Newton\n\twrote   the <b>Principia</b>.It was 1687 ") == "Newton wrote the bPrincipiab. It was 1687"
+
+def test_sentences_split_on_boundaries_but_not_abbreviations_or_initials():
+    text = "Dr. Hooke disputed it. I. Newton replied in 1672. He was 29, e.g. young. The end"
+    assert list(split_sentences(text)) == [
+        "Dr. Hooke disputed it.", "I. Newton replied in 1672.", "He was 29, e.g. young.", "The end"
+    ]
+
+def test_chunks_respect_the_token_budget_and_cover_the_text():
+    chunks = list(TokenChunker(max_tokens=60, overlap_tokens=0).chunk(TEXT, "Newton", "https://example.org"))
+    assert len(chunks) > 1
+    assert [chunk['chunk_index'] for chunk in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        assert chunk['token_count'] <= 60
+        assert chunk['title'] == "Newton" and chunk['url'] == "https://example.org"
+    assert " ".join(chunk['text'] for chunk in chunks) == " ".join(split_sentences(TEXT))
+
+def test_consecutive_chunks_share_trailing_sentences_up_to_the_overlap():
+    text = " ".join(f"Sentence number {i} is short." for i in range(40))
+    chunks = list(TokenChunker(max_tokens=60, overlap_tokens=20).chunk(text, "Newton", "u"))
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        shared = [s for s in split_sentences(current['text']) if previous['text'].endswith(s)]
+        assert shared
+        assert sum(count_tokens(s) for s in shared) <= 20
+
+def test_oversized_sentence_is_split_on_token_boundaries():
+    sentence = "Gravitation " * 200
+    chunks = list(TokenChunker(max_tokens=50, overlap_tokens=0).chunk(sentence, "t", "u"))
+    assert len(chunks) > 1
+    assert all(chunk['token_count'] <= 50 for chunk in chunks)
+
+def test_overlap_must_be_smaller_than_the_budget():
+    with pytest.raises(ValueError):
+        TokenChunker(max_tokens=10, overlap_tokens=10)
+    assert TokenChunker(10, 0).signature() != TokenChunker(20, 0).signature()
+
+def test_a_failed_tokenizer_load_is_retried(monkeypatch):
+    class Encoding:
+        def encode(self, text, disallowed_special=()):
+            return text.split()
+
+    attempts = []
+    def encoding_for_model(model):
+        attempts.append(model)
+        if len(attempts) == 1:
+            raise ConnectionError("BPE download failed")
+        return Encoding()
+
+    monkeypatch.setitem(sys.modules, 'tiktoken', types.SimpleNamespace(encoding_for_model=encoding_for_model))
+    monkeypatch.setattr(tokenizer, '_encodings', {})
+    monkeypatch.setattr(tokenizer, '_failed_at', {})
+    monkeypatch.setattr(tokenizer, 'RETRY_SECONDS', 60)
+    clock = [1000.0]
+    monkeypatch.setattr(tokenizer.time, 'monotonic', lambda: clock[0])
+
+    chunker = TokenChunker(10, 0, model="test-model")
+    assert count_tokens("one two three", "test-model") == 4  # estimated
+    estimated = chunker.signature()
+    assert estimated.endswith(":estimated")
+    assert len(attempts) == 1
+
+    clock[0] += 61
+    assert count_tokens("one two three", "test-model") == 3
+    assert chunker.signature() != estimated and not chunker.signature().endswith(":estimated")
+    count_tokens("four", "test-model")
+    assert len(attempts) == 2
@@ -0,0 +1,96 @@
+from benchmarks.run_benchmarks import make_pages
+from rag.newton_rag import cited_sources
+from conftest import store_page
+
+ORIGINAL = make_pages(1, seed=3)[0]['content']
+# A mirror with one word changed: every chunk is a near duplicate of the original's
+MIRROR = ORIGINAL.replace("Newton", "Sir Isaac Newton", 1)
+
+def stored_points(pipeline):
+    return pipeline.qdrant_client.scroll(pipeline.qdrant_collection, limit=10000, with_payload=True)[0]
+
+def test_near_duplicate_chunks_are_merged_and_attributed(pipeline, mongo):
+    store_page(mongo, "Original", "https://example.org/original", ORIGINAL)
+    store_page(mongo, "Mirror", "https://example.org/mirror", MIRROR)
+
+    stats = pipeline.process_mongodb_to_qdrant()
+
+    assert stats['chunks_deduplicated'] > 0
+    assert stats['dedup_ratio'] == round(stats['chunks_deduplicated'] / stats['chunks_total'], 4)
+    assert stats['chunks_stored'] == stats['chunks_total'] - stats['chunks_deduplicated']
+    merged = [point for point in stored_points(pipeline) if len(point.payload['urls']) == 2]
+    assert len(merged) == stats['chunks_deduplicated']
+    assert set(merged[0].payload['titles']) == {"Original", "Mirror"}
+
+def test_removing_the_first_source_reattributes_merged_chunks(pipeline, mongo):
+    store_page(mongo, "Original", "https://example.org/original", ORIGINAL)
+    store_page(mongo, "Mirror", "https://example.org/mirror", MIRROR)
+    pipeline.process_mongodb_to_qdrant()
+
+    mongo.newton_ai.newton_content.delete_one({'url': "https://example.org/original"})
+    stats = pipeline.process_mongodb_to_qdrant()
+
+    assert stats['documents_removed'] == 1
+    points = stored_points(pipeline)
+    assert points
+    for point in points:
+        assert point.payload['url'] == "https://example.org/mirror"
+        assert point.payload['title'] == "Mirror"
+        assert point.payload['urls'] == ["https://example.org/mirror"]
+    # Every point is still referenced by the index state
+    state = mongo.newton_ai.newton_index_state.find_one({'url': "https://example.org/mirror"})
+    assert set(state['point_ids']) == {point.id for point in points}
+
+def test_cited_sources_lists_every_page_of_merged_chunks():
+    docs = [
+        {'title': "Original", 'url': "u1", 'titles': ["Original", "Mirror"], 'urls': ["u1", "u2"]},
+        {'title': "Mirror", 'url': "u2"},
+        {'title': "Other", 'url': "u3"},
+    ]
+    assert cited_sources(docs) == {'sources': ["Original", "Mirror", "Other"], 'source_urls': ["u1", "u2", "u3"]}
+
+def assert_consistent(pipeline, mongo):
+    """Qdrant points, chunk_sources and index_state all describe the same chunks"""
+    point_ids = {point.id for point in stored_points(pipeline)}
+    sources = {entry['_id']: entry for entry in mongo.newton_ai.newton_chunk_sources.find()}
+    referenced = {point_id for state in mongo.newton_ai.newton_index_state.find() for point_id in state['point_ids']}
+    assert point_ids == set(sources) == referenced
+    for state in mongo.newton_ai.newton_index_state.find():
+        for point_id in state['point_ids']:
+            assert state['url'] in [source['url'] for source in sources[point_id]['sources']]
+
+def test_duplicate_of_a_chunk_released_in_the_same_run_is_embedded(pipeline, mongo):
+    store_page(mongo, "Original", "https://example.org/original", ORIGINAL)
+    pipeline.process_mongodb_to_qdrant()
+
+    # The original drops its text while a new page copies it; the copy may
+    # match chunks the original releases before the copy is finished
+    store_page(mongo, "Original", "https://example.org/original", "Completely different text about optics and light.")
+    store_page(mongo, "Copy", "https://example.org/copy", MIRROR)
+    pipeline.process_mongodb_to_qdrant()
+
+    assert_consistent(pipeline, mongo)
+    copy_state = mongo.newton_ai.newton_index_state.find_one({'url': "https://example.org/copy"})
+    assert copy_state['point_ids']
+
+def test_signatures_and_bands_are_stored_not_loaded(pipeline, mongo):
+    store_page(mongo, "Original", "https://example.org/original", ORIGINAL)
+    pipeline.process_mongodb_to_qdrant()
+
+    entry = mongo.newton_ai.newton_chunk_sources.find_one()
+    assert len(entry['bands']) == 16 and entry['minhash']
+    # Nothing stays in memory between runs
+    assert pipeline.near_duplicates is None
+
+    store_page(mongo, "Mirror", "https://example.org/mirror", MIRROR)
+    stats = pipeline.process_mongodb_to_qdrant()
+    assert stats['chunks_deduplicated'] > 0
+    assert_consistent(pipeline, mongo)
+
+def test_runs_that_change_the_index_start_a_new_generation(pipeline, mongo):
+    store_page(mongo, "Original", "https://example.org/original", ORIGINAL)
+    assert pipeline.process_mongodb_to_qdrant()['index_generation'] == 1
+
+    unchanged = pipeline.process_mongodb_to_qdrant()
+    assert 'index_generation' not in unchanged
+    assert mongo.newton_ai.newton_index_runs.find_one()['generation'] == 1
@@ -0,0 +1,125 @@
+from benchmarks.fakes import FakeOpenAI
+from rag.embedding_cache import EmbeddingCache, CachedEmbedder, AsyncCachedEmbedder, embedding_key
+import asyncio
+import sqlite3
+
+def test_keys_depend_on_model_and_dimensions():
+    assert embedding_key("a") != embedding_key("a", dimensions=256)
+    assert embedding_key("a") != embedding_key("a", model="text-embedding-3-large")
+
+def test_only_misses_reach_the_client():
+    client = FakeOpenAI(dimensions=8)
+    embedder = CachedEmbedder(client, dimensions=8, cache=EmbeddingCache(path=None))
+    first = embedder.embed(["apple", "pear", "apple"])
+    assert first[0] == first[2]
+    assert embedder.embed(["pear", "apple"]) == [first[1], first[0]]
+    assert client.calls['embeddings'] == 1
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path=path).put_many({'k': [0.5, 0.25]})
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get_many(['k', 'missing']) == {'k': [0.5, 0.25]}
+    assert reopened.stats()['disk_rows'] == 1
+
+def test_disk_tier_prunes_least_recently_used_rows(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"), max_memory_entries=0, max_disk_rows=10)
+    for i in range(10):
+        cache.put_many({f"k{i}": [float(i)]})
+    cache.get_many(["k0"])  # read from disk, so no longer the oldest
+    cache.put_many({"k10": [10.0]})
+
+    stored = {key for (key,) in cache.db.execute("SELECT key FROM embeddings")}
+    assert len(stored) == 9 and cache.stats()['pruned'] == 2
+    assert {"k0", "k10"} <= stored and not {"k1", "k2"} & stored
+
+def test_files_from_before_pruning_are_migrated(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    db.execute("INSERT INTO embeddings VALUES ('old', ?)", (b'\x00\x00\x80\x3f',))
+    db.commit()
+    db.close()
+
+    cache = EmbeddingCache(path=path, max_memory_entries=0, max_disk_rows=2)
+    assert cache.get_many(['old']) == {'old': [1.0]}
+    cache.put_many({'new': [2.0]})
+    cache.put_many({'newer': [3.0]})
+    assert cache.get_many(['old', 'new', 'newer']) == {'newer': [3.0]}
+
+def test_disk_reads_record_recency_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path=path, max_memory_entries=0, touch_batch=3)
+    cache.put_many({f"k{i}": [float(i)] for i in range(3)})
+    written = dict(cache.db.execute("SELECT key, last_used FROM embeddings"))
+
+    def stored_recency():
+        other = sqlite3.connect(path)
+        try:
+            return dict(other.execute("SELECT key, last_used FROM embeddings"))
+        finally:
+            other.close()
+
+    cache.get_many(["k0", "k1"])
+    assert stored_recency() == written
+    cache.get_many(["k2"])
+    assert all(used > written[key] for key, used in stored_recency().items())
+
+def test_replaced_rows_are_not_counted_twice(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    cache.put_many({'a': [1.0], 'b': [2.0]})
+    cache.put_many({'a': [1.5], 'c': [3.0]})
+    assert cache.stats()['disk_rows'] == 3
+
+def test_a_locked_file_degrades_to_misses_and_skipped_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path=path)
+    cache.db.execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    cache.put_many({'k': [1.0]})
+    other.rollback()
+    other.close()
+    assert cache.stats()['disk_rows'] == 0
+    assert cache.get_many(['k']) == {'k': [1.0]}  # still served from memory
+
+    class LockedDatabase:
+        def __getattr__(self, name):
+            return getattr(cache_db, name)
+
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    reader = EmbeddingCache(path=path)
+    cache_db = reader.db
+    reader.db = LockedDatabase()
+    assert reader.get_many(['k']) == {}
+    assert reader.stats()['misses'] == 1
+
+def test_async_embedder_keeps_disk_io_off_the_event_loop(tmp_path, monkeypatch):
+    class AsyncFake:
+        def __init__(self):
+            self.fake = FakeOpenAI(dimensions=8)
+            self.embeddings = self
+
+        async def create(self, **kwargs):
+            return self.fake.embeddings.create(**kwargs)
+
+    offloaded = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(fn, *args):
+        offloaded.append(fn.__name__)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(asyncio, 'to_thread', recording_to_thread)
+    embedder = AsyncCachedEmbedder(AsyncFake(), dimensions=8,
+                                   cache=EmbeddingCache(path=str(tmp_path / "cache.sqlite")))
+    vector = asyncio.run(embedder.embed_one("apple"))
+    assert len(vector) == 8
+    assert offloaded == ['_split', '_merge']
+
+    memory_only = AsyncCachedEmbedder(AsyncFake(), dimensions=8, cache=EmbeddingCache(path=None))
+    offloaded.clear()
+    asyncio.run(memory_only.embed_one("apple"))
+    assert offloaded == []
@@ -0,0 +1,119 @@
+from benchmarks.fakes import FakeCrossEncoder
+from benchmarks.run_benchmarks import make_pages
+from rag.index_generation import IndexGeneration
+from rag.local_vector_index import LocalVectorBackend
+from rag.vector_store import NewtonVectorStore
+from rag.reranker import NewtonReranker
+from rag.newton_rag import EnhancedNewtonRAG
+from rag.async_rag import AsyncNewtonRAG
+from conftest import store_page
+from types import SimpleNamespace
+import threading
+import asyncio
+import pytest
+import time
+
+@pytest.fixture
+def local_index(monkeypatch, tmp_path):
+    monkeypatch.setenv('VECTOR_BACKEND', 'local')
+    monkeypatch.setenv('VECTOR_INDEX_PATH', str(tmp_path))
+    return tmp_path
+
+def build_rag(pipeline, mongo):
+    return EnhancedNewtonRAG(
+        vector_store=NewtonVectorStore(client=pipeline.qdrant_client),
+        reranker=NewtonReranker(cross_encoder=FakeCrossEncoder()),
+        llm=pipeline.openai_client,
+        index_generation=IndexGeneration(mongo.newton_ai.newton_index_runs, poll_seconds=0)
+    )
+
+def point_count(pipeline) -> int:
+    return pipeline.qdrant_client.count(pipeline.qdrant_collection).count
+
+def test_workers_reload_re_exported_snapshots_on_a_new_generation(pipeline, mongo, local_index):
+    first, second = make_pages(2, seed=5)
+    store_page(mongo, first['title'], first['url'], first['content'])
+    pipeline.process_mongodb_to_qdrant()
+    rag = build_rag(pipeline, mongo)
+    rag.get_lexical_index()
+    assert isinstance(rag.vector_store.backend, LocalVectorBackend)
+    old_backend = rag.vector_store.backend
+
+    store_page(mongo, second['title'], second['url'], second['content'])
+    pipeline.process_mongodb_to_qdrant()
+    assert len(rag.vector_store.backend.ids) < point_count(pipeline)
+
+    rag.index_generation.refresh()
+    assert rag.vector_store.backend is not old_backend
+    assert rag.vector_store.backend.version != old_backend.version
+    assert len(rag.vector_store.backend.ids) == point_count(pipeline)
+    assert len(rag.get_lexical_index().ids) == point_count(pipeline)
+
+def test_snapshot_exported_elsewhere_is_pulled_from_qdrant(pipeline, mongo, local_index):
+    first, second = make_pages(2, seed=5)
+    store_page(mongo, first['title'], first['url'], first['content'])
+    pipeline.process_mongodb_to_qdrant()
+    rag = build_rag(pipeline, mongo)
+
+    # The pipeline ran on another host: Qdrant and the generation moved, the local files did not
+    pipeline.export_local_index = lambda path=None: None
+    store_page(mongo, second['title'], second['url'], second['content'])
+    pipeline.process_mongodb_to_qdrant()
+
+    rag.index_generation.refresh()
+    assert len(rag.vector_store.backend.ids) == point_count(pipeline)
+
+def test_first_lexical_request_builds_bm25_once_off_the_event_loop(rag, monkeypatch):
+    builds = []
+    def slow_load(client, collection_name):
+        time.sleep(0.2)
+        builds.append(time.perf_counter())
+        return "bm25"
+    monkeypatch.setattr('rag.newton_rag.load_lexical_index', slow_load)
+    engine = SimpleNamespace(rag=rag)
+
+    async def requests_and_ticks():
+        ticks = []
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+        results = await asyncio.gather(
+            AsyncNewtonRAG.get_lexical_index(engine), AsyncNewtonRAG.get_lexical_index(engine), tick()
+        )
+        return results[:2], ticks
+
+    indexes, ticks = asyncio.run(requests_and_ticks())
+    assert indexes == ["bm25", "bm25"] and len(builds) == 1
+    # The loop kept ticking while the index was being built
+    assert ticks[-1] < builds[0]
+
+def test_generation_polling_is_opt_in_and_needs_mongo(monkeypatch):
+    monkeypatch.delenv('INDEX_GENERATION_POLL_SECONDS', raising=False)
+    assert IndexGeneration.from_env() is None
+    monkeypatch.setenv('INDEX_GENERATION_POLL_SECONDS', '5')
+    monkeypatch.delenv('MONGO_URI', raising=False)
+    assert IndexGeneration.from_env() is None
+
+def test_polling_generation_reads_mongo_off_the_constructor(mongo):
+    release = threading.Event()
+    runs = mongo.newton_ai.newton_index_runs
+    runs.insert_one({'_id': 'mongo_to_qdrant', 'generation': 3})
+
+    class SlowRuns:
+        def find_one(self, *args, **kwargs):
+            release.wait(5)
+            return runs.find_one(*args, **kwargs)
+
+    start = time.perf_counter()
+    generation = IndexGeneration(SlowRuns(), poll_seconds=60)
+    assert time.perf_counter() - start < 1 and generation.value == 0
+    changes = []
+    generation.on_change(changes.append)
+    release.set()
+    deadline = time.time() + 5
+    while generation.value != 3 and time.time() < deadline:
+        time.sleep(0.01)
+    # The first read sets the starting point; it is not a change
+    assert generation.value == 3 and changes == []
+    generation.close()
@@ -0,0 +1,39 @@
+from qdrant_client.models import ScoredPoint
+from rag.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+PAYLOADS = [
+    {'title': "Principia", 'text': "Newton's laws of motion and universal gravitation."},
+    {'title': "Opticks", 'text': "Newton split white light with a prism."},
+    {'title': "Calculus", 'text': "The priority dispute with Leibniz over calculus."},
+]
+
+def point(point_id, score=0.0):
+    return ScoredPoint(id=point_id, version=0, score=score, payload={'text': point_id})
+
+def test_tokenize_lowercases_folds_accents_and_drops_stopwords():
+    assert tokenize("Newton's Principia is the Émile of physics") == ["newton", "principia", "emile", "physics"]
+
+def test_search_ranks_by_term_overlap():
+    index = BM25Index(["a", "b", "c"], PAYLOADS)
+    results = index.search("Newton prism light")
+    assert [result.id for result in results] == ["b", "a"]
+    assert results[0].score > results[1].score
+    assert results[0].payload == PAYLOADS[1]
+    assert index.search("Leibniz", limit=5)[0].id == "c"
+    assert index.search("unknown words") == []
+
+def test_saved_index_loads_with_the_same_results(tmp_path):
+    index = BM25Index(["a", "b", "c"], PAYLOADS, k1=1.2, b=0.5)
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.version is not None and (loaded.k1, loaded.b) == (1.2, 0.5)
+    assert [(r.id, r.score) for r in loaded.search("Newton")] == [(r.id, r.score) for r in index.search("Newton")]
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    dense = [point("a", 0.9), point("b", 0.8), point("c", 0.7)]
+    lexical = [point("c", 12.0), point("a", 3.0), point("d", 1.0)]
+    fused = reciprocal_rank_fusion([dense, lexical], limit=3)
+    assert [result.id for result in fused] == ["a", "c", "b"]
+    assert fused[0].score == 1 / 61 + 1 / 62
+    # The first list's copy of a point is the one returned
+    assert fused[1].payload == dense[2].payload
@@ -0,0 +1,50 @@
+from rag.near_duplicates import MinHasher, NearDuplicateIndex, StoredNearDuplicates, lsh_bands, similarity
+from benchmarks.run_benchmarks import make_pages
+import pytest
+
+TEXT = make_pages(1, seed=5)[0]['content']
+
+@pytest.fixture
+def hasher():
+    return MinHasher()
+
+def test_signature_similarity_tracks_text_overlap(hasher):
+    near = TEXT.replace("Newton", "Sir Isaac Newton", 1)
+    unrelated = "Completely different text about optics and light in the seventeenth century."
+    assert similarity(hasher.signature(TEXT), hasher.signature(TEXT)) == 1.0
+    assert similarity(hasher.signature(TEXT), hasher.signature(near)) >= 0.8
+    assert similarity(hasher.signature(TEXT), hasher.signature(unrelated)) < 0.2
+    assert hasher.signature("  ...  ") is None
+
+def test_lsh_bands_split_the_signature_below_the_threshold():
+    bands, rows = lsh_bands(128, 0.8)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
+
+def test_in_memory_index_finds_and_forgets(hasher):
+    index = NearDuplicateIndex(0.8)
+    index.add("p1", hasher.signature(TEXT))
+    near = hasher.signature(TEXT.replace("Newton", "Sir Isaac Newton", 1))
+    assert index.find(near) == "p1"
+    index.add("p2", None)
+    assert len(index) == 1
+    index.remove("p1")
+    assert index.find(near) is None and len(index) == 0 and not index.buckets
+
+def test_stored_lookup_queries_bands_and_skips_the_page_being_replaced(mongo, hasher):
+    collection = mongo.newton_ai.newton_chunk_sources
+    store = StoredNearDuplicates(collection, 0.8)
+    signature = hasher.signature(TEXT)
+    collection.insert_one({
+        '_id': "p1", 'minhash': signature.tobytes(), 'bands': store.band_keys(signature),
+        'sources': [{'url': "a", 'title': "A"}]
+    })
+    near = hasher.signature(TEXT.replace("Newton", "Sir Isaac Newton", 1))
+    assert store.find(near, "b") == "p1"
+    # Only page 'a' holds p1, and 'a' is being re-chunked
+    assert store.find(near, "a") is None
+
+    store.add_pending("p2", hasher.signature("A pending chunk of text about telescopes and mirrors."), "c")
+    assert store.find(hasher.signature("A pending chunk of text about telescopes and mirrors."), "d") == "p2"
+    store.stored(["p2"])
+    assert len(store) == 0
@@ -0,0 +1,93 @@
+from concurrent.futures import TimeoutError
+from rag.rerank_batcher import RerankBatcher
+from rag.reranker import NewtonReranker
+import threading
+import pytest
+
+class GatedReranker:
+    """Scores pairs by text length; each call blocks until the gate opens"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def predict(self, pairs):
+        self.calls.append(list(pairs))
+        self.started.set()
+        self.gate.wait(5)
+        return [float(len(text)) for _, text in pairs]
+
+    select_top = staticmethod(NewtonReranker.select_top)
+
+@pytest.fixture
+def reranker():
+    return GatedReranker()
+
+def test_scores_are_scattered_back_in_order(reranker):
+    reranker.gate.set()
+    batcher = RerankBatcher(reranker, max_wait_ms=0)
+    assert batcher.predict([("q", "a"), ("q", "abc")]) == [1.0, 3.0]
+    assert batcher.predict([]) == []
+
+def test_rerank_documents_keeps_the_best_scored(reranker):
+    reranker.gate.set()
+    batcher = RerankBatcher(reranker, max_wait_ms=0)
+    documents = [{'text': "ab"}, {'text': "abcd"}, {'text': "a"}]
+    assert [doc['text'] for doc in batcher.rerank_documents("q", documents, top_k=2)] == ["abcd", "ab"]
+
+def test_cancelled_request_is_skipped_and_worker_survives(reranker):
+    batcher = RerankBatcher(reranker, max_wait_ms=0)
+    running = batcher.submit([("q", "first")])
+    assert reranker.started.wait(5)
+
+    # Queued behind the running pass, then abandoned by its caller
+    abandoned = batcher.submit([("q", "abandoned")])
+    assert abandoned.cancel()
+    reranker.gate.set()
+
+    assert running.result(timeout=5) == [5.0]
+    assert batcher.predict([("q", "next")]) == [4.0]
+    assert all(pair != ("q", "abandoned") for call in reranker.calls for pair in call)
+
+def test_model_error_reaches_every_caller_and_worker_survives():
+    class FailingOnce(GatedReranker):
+        def predict(self, pairs):
+            if not self.calls:
+                self.calls.append(pairs)
+                raise RuntimeError("model crashed")
+            return super().predict(pairs)
+
+    failing = FailingOnce()
+    failing.gate.set()
+    batcher = RerankBatcher(failing, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.predict([("q", "a")])
+    assert batcher.predict([("q", "ab")]) == [2.0]
+
+def test_blocking_callers_time_out(reranker, monkeypatch):
+    monkeypatch.setenv('RERANK_BATCH_TIMEOUT_SECONDS', '0.1')
+    batcher = RerankBatcher(reranker, max_wait_ms=0)
+    with pytest.raises(TimeoutError):
+        batcher.predict([("q", "slow")])
+    reranker.gate.set()
+
+def sample(name, **labels):
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_batches_are_exported_to_prometheus(reranker):
+    reranker.gate.set()
+    batcher = RerankBatcher(reranker, max_wait_ms=0)
+    passes = sample('newton_rag_rerank_batch_size_count', unit='pairs')
+    pairs = sample('newton_rag_rerank_batch_size_sum', unit='pairs')
+    scored = sample('newton_rag_rerank_batch_requests_total', outcome='scored')
+    waits = sample('newton_rag_rerank_queue_wait_seconds_count')
+
+    batcher.predict([("q", "a"), ("q", "abc")])
+
+    assert sample('newton_rag_rerank_batch_size_count', unit='pairs') == passes + 1
+    assert sample('newton_rag_rerank_batch_size_sum', unit='pairs') == pairs + 2
+    assert sample('newton_rag_rerank_batch_requests_total', outcome='scored') == scored + 1
+    assert sample('newton_rag_rerank_queue_wait_seconds_count') == waits + 1
+    assert sample('newton_rag_rerank_queue_depth') == 0
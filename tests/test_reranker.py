@@ -0,0 +1,25 @@
+from rag.reranker import NewtonReranker
+import numpy as np
+
+class RecordingCrossEncoder:
+    """Scores a pair by its text length and records the order pairs arrive in"""
+
+    def __init__(self):
+        self.seen = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.seen = list(pairs)
+        return np.array([float(len(text)) for _, text in pairs])
+
+def test_pairs_are_scored_shortest_first_and_returned_in_input_order():
+    model = RecordingCrossEncoder()
+    reranker = NewtonReranker(cross_encoder=model)
+    pairs = [("q", "a" * 30), ("q", "a"), ("q", "a" * 10)]
+    assert reranker.predict(pairs).tolist() == [30.0, 1.0, 10.0]
+    assert [len(text) for _, text in model.seen] == [1, 10, 30]
+    assert reranker.predict([]).size == 0
+
+def test_rerank_documents_keeps_the_best_top_k():
+    reranker = NewtonReranker(cross_encoder=RecordingCrossEncoder())
+    docs = [{'text': "a" * n} for n in (3, 9, 1, 5)]
+    assert [len(doc['text']) for doc in reranker.rerank_documents("q", docs, top_k=2)] == [9, 5]
@@ -0,0 +1,206 @@
+from rag.semantic_cache import SemanticCache, InMemoryCacheBackend, RedisCacheBackend
+from rag.index_generation import IndexGeneration
+import fnmatch
+import threading
+import pytest
+
+QUESTION = "What did Newton contribute to calculus?"
+
+@pytest.fixture
+def generation(mongo):
+    return IndexGeneration(mongo.newton_ai.newton_index_runs, poll_seconds=0)
+
+def test_similar_vectors_hit_and_others_miss():
+    cache = SemanticCache(InMemoryCacheBackend(), threshold=0.95)
+    cache.put([1.0, 0.0], {'answer': "a"})
+    assert cache.get([0.99, 0.05])['answer'] == "a"
+    assert cache.get([0.0, 1.0]) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_entries_are_scoped():
+    cache = SemanticCache(InMemoryCacheBackend())
+    cache.put([1.0, 0.0], {'answer': "dense"}, scope="dense:full")
+    assert cache.get([1.0, 0.0], scope="hybrid:full") is None
+    assert cache.get([1.0, 0.0], scope="dense:full")['answer'] == "dense"
+
+def test_require_evaluation_misses_unevaluated_entries():
+    cache = SemanticCache(InMemoryCacheBackend())
+    cache.put([1.0, 0.0], {'answer': "a"})
+    assert cache.get([1.0, 0.0], require_evaluation=True) is None
+
+def test_evaluation_id_is_not_cached():
+    cache = SemanticCache(InMemoryCacheBackend())
+    cache.put([1.0, 0.0], {'answer': "a", 'evaluation_id': "abc"})
+    assert 'evaluation_id' not in cache.get([1.0, 0.0])
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    backend = InMemoryCacheBackend(max_entries=2, ttl_seconds=60)
+    cache = SemanticCache(backend)
+    cache.put([1.0, 0.0, 0.0], {'answer': "x"})
+    cache.put([0.0, 1.0, 0.0], {'answer': "y"})
+    assert cache.get([1.0, 0.0, 0.0])  # x is now most recently used
+    cache.put([0.0, 0.0, 1.0], {'answer': "z"})
+    assert cache.get([0.0, 1.0, 0.0]) is None
+    assert cache.get([1.0, 0.0, 0.0])['answer'] == "x"
+    assert backend.evictions == 1
+
+    now = __import__('time').time()
+    monkeypatch.setattr('rag.semantic_cache.time.time', lambda: now + 61)
+    assert cache.get([1.0, 0.0, 0.0]) is None
+    assert backend.size() == 0
+
+def test_a_new_index_generation_is_a_miss_for_every_worker(mongo, generation):
+    workers = [SemanticCache(InMemoryCacheBackend(), generation=IndexGeneration(
+        mongo.newton_ai.newton_index_runs, poll_seconds=0
+    )) for _ in range(2)]
+    for cache in workers:
+        cache.put([1.0, 0.0], {'answer': "old"})
+
+    generation.bump()  # the pipeline, in another process
+    for cache in workers:
+        cache.generation.refresh()
+        assert cache.get([1.0, 0.0]) is None
+        assert cache.backend.size() == 0
+        assert cache.stats()['index_generation'] == 1
+
+def test_cache_hit_gets_its_own_deferred_evaluation(rag):
+    rag.cache = SemanticCache(InMemoryCacheBackend())
+    first = rag.answer_question(QUESTION, defer_evaluation=True)
+    second = rag.answer_question(QUESTION, defer_evaluation=True)
+    assert second['cache']['hit']
+    assert first['evaluation_id'] and second['evaluation_id']
+    assert first['evaluation_id'] != second['evaluation_id']
+
+def test_retrieval_mode_is_part_of_the_cache_key(rag):
+    rag.cache = SemanticCache(InMemoryCacheBackend())
+    rag.answer_question(QUESTION, adaptive=False)
+    assert rag.answer_question(QUESTION, adaptive=False).get('cache')
+    assert not rag.answer_question(QUESTION, adaptive=True).get('cache')
+
+def test_evicted_rows_are_reused_and_the_matrix_never_grows():
+    backend = InMemoryCacheBackend(max_entries=3)
+    cache = SemanticCache(backend)
+    vectors = [[float(i == j) for j in range(8)] for i in range(8)]
+    for i, vector in enumerate(vectors):
+        cache.put(vector, {'answer': i})
+    assert backend.matrix.shape == (3, 8) and backend.used_rows == 3
+    assert [cache.get(vector) for vector in vectors[:5]] == [None] * 5
+    assert [cache.get(vector)['answer'] for vector in vectors[5:]] == [5, 6, 7]
+
+    # A different embedding size starts a fresh matrix
+    cache.put([1.0, 0.0], {'answer': "small"})
+    assert backend.matrix.shape == (3, 2) and backend.size() == 1
+    assert cache.get(vectors[5]) is None
+
+class FakeRedis:
+    """The handful of Redis commands RedisCacheBackend uses, counting the values fetched with mget"""
+
+    def __init__(self):
+        self.data = {}
+        self.values_fetched = 0
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.values_fetched += len(keys)
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def expire(self, key, seconds):
+        pass
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update({member.encode(): score for member, score in mapping.items()})
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.data.get(key, {}).pop(member.encode(), None)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrangebyscore(self, key, low, high, withscores=False):
+        members = sorted(self.data.get(key, {}).items(), key=lambda item: item[1])
+        return [(member, score) for member, score in members if score >= low]
+
+    def zpopmin(self, key, count):
+        members = sorted(self.data.get(key, {}).items(), key=lambda item: item[1])[:count]
+        for member, _ in members:
+            del self.data[key][member]
+        return members
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, pattern)]
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                for name, args, kwargs in self.calls:
+                    getattr(redis, name)(*args, **kwargs)
+
+        return Pipeline()
+
+def test_redis_workers_share_entries_and_only_fetch_new_vectors():
+    redis = FakeRedis()
+    first, second = (SemanticCache(RedisCacheBackend("", client=redis)) for _ in range(2))
+    first.put([1.0, 0.0], {'answer': "a"})
+    assert second.get([0.99, 0.05])['answer'] == "a"
+
+    # Already mirrored: later lookups fetch no vectors
+    redis.values_fetched = 0
+    assert second.get([1.0, 0.0])['answer'] == "a"
+    assert second.get([0.0, 1.0]) is None
+    assert redis.values_fetched == 0
+
+    second.put([0.0, 1.0], {'answer': "b"})
+    assert first.get([0.0, 1.0])['answer'] == "b"
+    assert first.backend.size() == 2
+
+def test_redis_entries_gone_from_redis_are_dropped_from_the_mirror():
+    redis = FakeRedis()
+    cache = SemanticCache(RedisCacheBackend("", client=redis, max_entries=1))
+    other = SemanticCache(RedisCacheBackend("", client=redis, max_entries=1))
+    cache.put([1.0, 0.0], {'answer': "a"})
+    assert other.get([1.0, 0.0])['answer'] == "a"
+
+    cache.put([0.0, 1.0], {'answer': "b"})  # evicts "a" in Redis
+    assert other.get([1.0, 0.0]) is None
+    assert "a" not in [value for _, value, _, _ in other.backend.mirror.entries.values()]
+
+    cache.invalidate()
+    assert other.get([0.0, 1.0]) is None
+    assert other.backend.size() == 0
+
+def test_hit_and_miss_counts_are_exact_under_concurrency():
+    cache = SemanticCache(InMemoryCacheBackend())
+    cache.put([1.0, 0.0], {'answer': "a"})
+
+    def lookups():
+        for _ in range(500):
+            cache.get([1.0, 0.0])
+            cache.get([0.0, 1.0])
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (4000, 4000)
@@ -0,0 +1,56 @@
+from rag.stream_stages import StagedStream
+from conftest import store_page
+import pytest
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+def test_stages_run_in_order_over_the_source():
+    stream = StagedStream(range(100), [double, lambda items: (item + 1 for item in items)], maxsize=2)
+    assert list(stream) == [item * 2 + 1 for item in range(100)]
+
+def test_stage_error_reaches_the_consumer():
+    def failing(items):
+        for item in items:
+            if item == 3:
+                raise RuntimeError("stage crashed")
+            yield item
+
+    with pytest.raises(RuntimeError, match="stage crashed"):
+        list(StagedStream(range(10), [failing]))
+
+def test_leaving_early_stops_every_stage():
+    stream = StagedStream(iter(int, 1), [double], maxsize=1)
+    for item in stream:
+        break
+    assert not any(thread.is_alive() for thread in stream.threads)
+
+def test_interrupted_run_resumes_after_the_last_stored_batch(pipeline, mongo):
+    for i in range(3):
+        store_page(mongo, f"Page {i}", f"https://example.org/{i}", f"Page number {i} is about Newton's optics. " * 5)
+    # One document per batch and per embedding group, so each batch checkpoints on its own
+    pipeline.scan_batch_size = 1
+    pipeline.group_max_tokens = 1
+
+    embed_groups = pipeline.embed_groups
+    def crash_after_first_group(groups):
+        for i, group in enumerate(embed_groups(groups)):
+            if i == 2:
+                raise RuntimeError("embedding service down")
+            yield group
+
+    pipeline.embed_groups = crash_after_first_group
+    with pytest.raises(RuntimeError):
+        pipeline.process_mongodb_to_qdrant()
+    run = mongo.newton_ai.newton_index_runs.find_one()
+    first = mongo.newton_ai.newton_content.find_one({'url': "https://example.org/0"})
+    assert run['status'] == 'running' and run['last_id'] == first['_id']
+
+    del pipeline.embed_groups
+    stats = pipeline.process_mongodb_to_qdrant()
+    # Only the documents after the checkpoint are scanned again
+    assert stats['documents_reindexed'] == 2
+    assert stats['documents_unchanged'] == 0
+    assert mongo.newton_ai.newton_index_runs.find_one()['status'] == 'complete'
+    assert mongo.newton_ai.newton_index_state.count_documents({}) == 3
@@ -0,0 +1,75 @@
+from extractors.wikipedia_extractor import SimpleWikipediaExtractor
+from storage.mongodb_manager import SimpleStorage
+from models.wikipedia_models import WikipediaContent
+from datetime import datetime
+
+HTML = """<div class="mw-parser-output"><table class="infobox"><tr><td>Born 1643</td></tr></table>
+<p><b>Sir Isaac Newton</b> (25 December 1642 – 20 March 1726/27) was an English <a href="/wiki/Polymath">polymath</a>.</p>
+<style>.x{}</style><p>He weighed 3 pounds (1.4 kg) at birth.</p></div>"""
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+class FakeSession:
+    """Renders pages for action=parse; "Newton" redirects to "Isaac Newton" """
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params, timeout):
+        self.requests.append(params)
+        page = params['page']
+        if page == "No such page":
+            return FakeResponse({'error': {'code': 'missingtitle', 'info': "The page doesn't exist."}})
+        if page in ("Isaac Newton", "Newton"):
+            return FakeResponse({'parse': {'title': "Isaac Newton", 'pageid': 1, 'text': HTML}})
+        return FakeResponse({'parse': {'title': page, 'pageid': 2, 'text': "<p>On light</p>"}})
+
+def test_rendered_text_keeps_inline_template_output():
+    extractor = SimpleWikipediaExtractor(requests_per_second=1000)
+    extractor.session = FakeSession()
+
+    page = extractor.extract_page("Isaac Newton")
+
+    assert page.title == "Isaac Newton"
+    assert page.url == "https://en.wikipedia.org/wiki/Isaac_Newton"
+    assert page.content == (
+        "Sir Isaac Newton (25 December 1642 – 20 March 1726/27) was an English polymath. "
+        "He weighed 3 pounds (1.4 kg) at birth."
+    )
+    assert extractor.session.requests[0]['action'] == 'parse'
+
+def test_pages_are_fetched_concurrently_without_duplicates():
+    extractor = SimpleWikipediaExtractor(requests_per_second=1000)
+    extractor.session = FakeSession()
+
+    pages = extractor.extract_pages(["Isaac Newton", "No such page", "Newton", "Opticks", "Opticks"])
+
+    assert [(p.title, p.url) for p in pages] == [
+        ("Isaac Newton", "https://en.wikipedia.org/wiki/Isaac_Newton"),
+        ("Opticks", "https://en.wikipedia.org/wiki/Opticks"),
+    ]
+    assert len(extractor.session.requests) == 4
+
+def test_storage_is_keyed_on_url_and_drops_old_title_keyed_copies(mongo, monkeypatch):
+    monkeypatch.setenv('MONGO_DB_NAME', 'newton_ai')
+    collection = mongo.newton_ai.newton_content
+    collection.create_index('title', unique=True)
+    url = "https://en.wikipedia.org/wiki/Isaac_Newton"
+    collection.insert_one({'title': '<span class="mw-page-title-main">Isaac Newton</span>', 'url': url,
+                           'content': "old", 'extracted_at': datetime(2025, 9, 1)})
+    collection.insert_one({'title': "Isaac Newton", 'url': url, 'content': "new", 'extracted_at': datetime(2025, 10, 1)})
+
+    storage = SimpleStorage(client=mongo)
+    assert [doc['content'] for doc in collection.find()] == ["new"]
+
+    counts = storage.store_content([WikipediaContent(title="Isaac Newton", content="newer", url=url)])
+    assert (counts['inserted'], counts['updated']) == (0, 1)
+    assert collection.count_documents({'url': url}) == 1